@@ -1,12 +1,14 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Request, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 import uvicorn
 import os
 import json
 import asyncio
+import anyio
 from datetime import datetime
 import logging
 
@@ -16,6 +18,23 @@ from services.embedding_service import EmbeddingService
 from services.clause_matcher import ClauseMatcher
 from services.database import DatabaseService
 from services.auth_service import AuthService
+from services.reranker import CrossEncoderReranker
+from services.span_extractor import AnswerSpanExtractor
+from services.query_cache import ParsedQueryCache
+from services.rationale_cache import RationaleCache, content_hash
+from services.intent_classifier import LocalIntentClassifier
+from services.tracing import start_trace, trace_stage
+from services.pipeline import StagePipeline
+from services.interaction_logger import InteractionLogger
+from services.heavy_hitters import HeavyHitters
+from services.latency import LatencyRecorder
+from services.retention import RetentionScheduler
+from services.document_store import DocumentStore, StoredDocument
+from services.interaction_export import InteractionExporter, MEDIA_TYPES, EXTENSIONS, check_format
+from services.metering import TokenMeter, tenant_key
+from services.single_flight import get_coalescing_stats
+from services.resilience import get_breaker_stats
+from config import Config
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -41,11 +60,32 @@ security = HTTPBearer()
 
 # Initialize services
 document_processor = DocumentProcessor()
-llm_parser = LLMParser()
 embedding_service = EmbeddingService()
-clause_matcher = ClauseMatcher()
 db_service = DatabaseService()
+heavy_hitters = HeavyHitters(db_service)
+interaction_logger = InteractionLogger(db_service, heavy_hitters=heavy_hitters)
+rationale_cache = RationaleCache(db_service=db_service)
+intent_classifier = (
+    LocalIntentClassifier(embed_fn=embedding_service.embed_queries, db_service=db_service)
+    if Config.LOCAL_PARSE_ENABLED else None
+)
+llm_parser = LLMParser(
+    query_cache=ParsedQueryCache(embed_fn=embedding_service.embed_queries),
+    rationale_cache=rationale_cache,
+    intent_classifier=intent_classifier
+)
+reranker = CrossEncoderReranker() if Config.RERANK_ENABLED else None
+clause_matcher = ClauseMatcher(
+    embedding_service=embedding_service,
+    reranker=reranker,
+    span_extractor=AnswerSpanExtractor(embedding_service=embedding_service)
+)
 auth_service = AuthService()
+token_meter = TokenMeter()
+latency_recorder = LatencyRecorder(db_service)
+retention_scheduler = RetentionScheduler(db_service)
+document_store = DocumentStore(db_service)
+interaction_exporter = InteractionExporter(db_service)
 
 class QueryRequest(BaseModel):
     document_url: str
@@ -57,18 +97,39 @@ class QueryResponse(BaseModel):
     decision_rationale: str
     metadata: Dict[str, Any]
 
+class BatchQueryRequest(BaseModel):
+    documents: str
+    questions: List[str]
+
+class BatchQueryResponse(BaseModel):
+    answers: List[str]
+    matched_clauses: List[Dict[str, Any]]
+    metadata: Dict[str, Any]
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
     await db_service.initialize()
+    await interaction_logger.start()
+    await heavy_hitters.start()
+    await latency_recorder.start()
+    await retention_scheduler.start()
     await embedding_service.initialize()
+    if intent_classifier is not None:
+        await intent_classifier.start()
     logger.info("Application started successfully")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
+    await retention_scheduler.close()
+    await interaction_logger.close()
+    await heavy_hitters.close()
+    await latency_recorder.close()
+    await document_store.close()
     await db_service.close()
     await embedding_service.close()
+    await llm_parser.close()
     logger.info("Application shutdown complete")
 
 async def verify_auth(credentials: HTTPAuthorizationCredentials = Depends(security)):
@@ -78,47 +139,127 @@ async def verify_auth(credentials: HTTPAuthorizationCredentials = Depends(securi
         raise HTTPException(status_code=401, detail="Invalid authentication token")
     return token
 
+def _format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _load_document(document_url: str, stored: Optional[StoredDocument]) -> str:
+    """
+    Download and extract a document unless it is already stored, invalidating cached
+    rationales if its content changed
+    """
+    if stored is not None:
+        await rationale_cache.register_document(document_url, stored.content_hash)
+        return stored.content
+    
+    document_content = await document_processor.process_document(document_url)
+    await rationale_cache.register_document(document_url, content_hash(document_content))
+    return document_content
+
+async def _load_embeddings(
+    document_url: str, 
+    stored: Optional[StoredDocument], 
+    document_content: str, 
+    segments: List[Dict[str, Any]]
+):
+    """Reuse stored embeddings, or embed the segments and store the processed document"""
+    if stored is not None:
+        # ClauseMatcher scores against the matrix directly; no shared index to rebuild
+        return stored.embeddings
+    
+    embeddings = await embedding_service.generate_embeddings(segments)
+    document_store.save_in_background(document_url, document_content, content_hash(document_content), segments, embeddings)
+    return embeddings
+
+def _retrieval_pipeline(name: str, document_url: str, parse_fn) -> StagePipeline:
+    """
+    Stages shared by every endpoint. Query parsing does not depend on the document,
+    so it runs while the document downloads and is segmented and embedded. A document
+    already in the document store skips download, extraction and embedding.
+    """
+    return (
+        StagePipeline(name)
+        .stage("stored", lambda: document_store.load(document_url))
+        .stage("document", lambda stored: _load_document(document_url, stored), depends_on=["stored"])
+        .stage("parse", parse_fn)
+        .stage(
+            "segment", 
+            lambda stored, document_content: stored.segments if stored is not None else document_processor.segment_document(document_content), 
+            depends_on=["stored", "document"]
+        )
+        .stage(
+            "embed", 
+            lambda stored, document_content, segments: _load_embeddings(document_url, stored, document_content, segments), 
+            depends_on=["stored", "document", "segment"]
+        )
+    )
+
+async def _retrieve_clause(document_url: str, user_query: str) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
+    """Process the document, parse the query and match the best clause"""
+    results = await _retrieval_pipeline("retrieve", document_url, lambda: llm_parser.parse_query(user_query)).stage(
+        "match", 
+        clause_matcher.find_best_match, 
+        depends_on=["parse", "segment", "embed"]
+    ).run()
+    
+    return results["document"], results["parse"], results["match"]
+
 @app.post("/hackrx/run", response_model=QueryResponse)
 async def process_query(
     request: QueryRequest,
+    background_tasks: BackgroundTasks,
     token: str = Depends(verify_auth)
 ):
     """
     Main endpoint for processing document queries
     """
+    trace = start_trace("hackrx_run", tenant=tenant_key(token))
+    
     try:
         logger.info(f"Processing query: {request.user_query}")
         
-        # Step 1: Process document
-        document_content = await document_processor.process_document(request.document_url)
+        # Steps 1-5: Download ∥ parse, then segment → embed → match → rationale
+        results = await _retrieval_pipeline(
+            "hackrx_run", 
+            request.document_url, 
+            lambda: llm_parser.parse_query(request.user_query)
+        ).stage(
+            "match", 
+            clause_matcher.find_best_match, 
+            depends_on=["parse", "segment", "embed"]
+        ).stage(
+            "rationale", 
+            lambda document_content, parsed_query, matched_clause: llm_parser.generate_rationale(
+                request.user_query, 
+                matched_clause, 
+                document_content, 
+                parsed_query=parsed_query, 
+                document_url=request.document_url
+            ), 
+            depends_on=["document", "parse", "match"]
+        ).run()
         
-        # Step 2: Parse query using LLM
-        parsed_query = await llm_parser.parse_query(request.user_query)
+        parsed_query = results["parse"]
+        matched_clause = results["match"]
+        rationale = results["rationale"]
         
-        # Step 3: Generate embeddings for document segments
-        document_segments = document_processor.segment_document(document_content)
-        embeddings = await embedding_service.generate_embeddings(document_segments)
+        trace_summary = trace.to_dict()
+        token_meter.record_request(trace, intent=parsed_query.get("intent"))
+        latency_recorder.record_trace(trace)
         
-        # Step 4: Match clauses using semantic search
-        matched_clause = await clause_matcher.find_best_match(
-            parsed_query, 
-            document_segments, 
-            embeddings
-        )
-        
-        # Step 5: Generate decision rationale
-        rationale = await llm_parser.generate_rationale(
-            request.user_query, 
-            matched_clause, 
-            document_content
-        )
-        
-        # Step 6: Log the interaction
-        await db_service.log_interaction(
+        # Step 6: Log the interaction after the response is sent
+        background_tasks.add_task(
+            interaction_logger.log_interaction,
             document_url=request.document_url,
             user_query=request.user_query,
             matched_clause=matched_clause,
-            confidence=matched_clause.get("confidence", 0.0)
+            confidence=matched_clause.get("confidence", 0.0),
+            processing_time_ms=trace_summary["total_wall_ms"],
+            metadata={
+                "trace": trace_summary,
+                "intent": parsed_query.get("intent"),
+                "parse_source": parsed_query.get("parse_source")
+            }
         )
         
         # Step 7: Prepare response
@@ -129,8 +270,9 @@ async def process_query(
             metadata={
                 "source_document": request.document_url,
                 "processed_at": datetime.utcnow().isoformat() + "Z",
-                "token_usage": llm_parser.get_token_usage(),
-                "processing_time_ms": clause_matcher.get_processing_time()
+                "token_usage": trace_summary["token_usage"],
+                "processing_time_ms": trace_summary["total_wall_ms"],
+                "trace": trace_summary
             }
         )
         
@@ -139,7 +281,188 @@ async def process_query(
         
     except Exception as e:
         logger.error(f"Error processing query: {str(e)}")
+        token_meter.record_request(trace, failed=True)
+        raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
+
+@app.post("/hackrx/run/stream")
+async def process_query_stream(
+    request: QueryRequest,
+    http_request: Request,
+    token: str = Depends(verify_auth)
+):
+    """
+    Streaming variant of /hackrx/run: sends the matched clause as soon as it is known,
+    then streams rationale tokens as server-sent events
+    """
+    trace = start_trace("hackrx_run_stream", tenant=tenant_key(token))
+    
+    try:
+        logger.info(f"Processing streaming query: {request.user_query}")
+        document_content, parsed_query, matched_clause = await _retrieve_clause(
+            request.document_url, 
+            request.user_query
+        )
+    except Exception as e:
+        logger.error(f"Error processing query: {str(e)}")
+        token_meter.record_request(trace, failed=True)
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
+    
+    async def event_stream():
+        yield _format_sse("match", {
+            "query": request.user_query,
+            "matched_clause": matched_clause,
+            "metadata": {
+                "source_document": request.document_url,
+                "time_to_match_ms": trace.total_time_ms()
+            }
+        })
+        
+        rationale_stream = llm_parser.stream_rationale(
+            request.user_query, 
+            matched_clause, 
+            document_content, 
+            parsed_query=parsed_query, 
+            document_url=request.document_url
+        )
+        chunks = []
+        cancelled = False
+        
+        try:
+            with trace_stage("rationale"):
+                async for token_text in rationale_stream:
+                    if await http_request.is_disconnected():
+                        cancelled = True
+                        break
+                    chunks.append(token_text)
+                    yield _format_sse("token", {"text": token_text})
+        finally:
+            # Runs on normal completion, early break and task cancellation alike. Record
+            # before awaiting anything: a disconnect can cancel the task again at an await.
+            token_meter.record_request(trace, intent=parsed_query.get("intent"))
+            latency_recorder.record_trace(trace)
+            with anyio.CancelScope(shield=True):
+                await rationale_stream.aclose()
+        
+        if cancelled:
+            logger.info(f"Client disconnected, rationale stream cancelled: {request.user_query}")
+            return
+        
+        trace_summary = trace.to_dict()
+        yield _format_sse("done", {
+            "decision_rationale": "".join(chunks).strip(),
+            "metadata": {
+                "processed_at": datetime.utcnow().isoformat() + "Z",
+                "token_usage": trace_summary["token_usage"],
+                "processing_time_ms": trace_summary["total_wall_ms"],
+                "trace": trace_summary
+            }
+        })
+        
+        # Log once the client has the full answer
+        await interaction_logger.log_interaction(
+            document_url=request.document_url,
+            user_query=request.user_query,
+            matched_clause=matched_clause,
+            confidence=matched_clause.get("confidence", 0.0),
+            processing_time_ms=trace_summary["total_wall_ms"],
+            metadata={
+                "trace": trace_summary,
+                "intent": parsed_query.get("intent"),
+                "parse_source": parsed_query.get("parse_source"),
+                "streamed": True
+            }
+        )
+    
+    return StreamingResponse(
+        event_stream(), 
+        media_type="text/event-stream", 
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _log_batch_interactions(
+    document_url: str, 
+    questions: List[str], 
+    parsed_queries: List[Dict[str, Any]], 
+    matched_clauses: List[Dict[str, Any]], 
+    trace_summary: Dict[str, Any]
+):
+    """Log every question of a batch request"""
+    for question, parsed_query, matched_clause in zip(questions, parsed_queries, matched_clauses):
+        await interaction_logger.log_interaction(
+            document_url=document_url,
+            user_query=question,
+            matched_clause=matched_clause,
+            confidence=matched_clause.get("confidence", 0.0),
+            processing_time_ms=trace_summary["total_wall_ms"],
+            metadata={
+                "trace": trace_summary,
+                "intent": parsed_query.get("intent"),
+                "parse_source": parsed_query.get("parse_source")
+            }
+        )
+
+@app.post("/hackrx/run/batch", response_model=BatchQueryResponse)
+async def process_batch_query(
+    request: BatchQueryRequest,
+    background_tasks: BackgroundTasks,
+    token: str = Depends(verify_auth)
+):
+    """
+    Answer a list of questions against one document in a single matching pass
+    """
+    trace = start_trace("hackrx_run_batch", tenant=tenant_key(token))
+    
+    try:
+        logger.info(f"Processing {len(request.questions)} questions for document: {request.documents}")
+        
+        # Steps 1-4: Download ∥ batched parse, then segment → embed → one batched matching pass
+        results = await _retrieval_pipeline(
+            "hackrx_run_batch", 
+            request.documents, 
+            lambda: llm_parser.parse_queries(request.questions)
+        ).stage(
+            "match", 
+            clause_matcher.find_best_matches, 
+            depends_on=["parse", "segment", "embed"]
+        ).run()
+        
+        parsed_queries = results["parse"]
+        matched_clauses = results["match"]
+        
+        trace_summary = trace.to_dict()
+        token_meter.record_request(trace, intents=[parsed_query.get("intent") for parsed_query in parsed_queries])
+        latency_recorder.record_trace(trace)
+        
+        # Step 5: Log the interactions after the response is sent
+        background_tasks.add_task(
+            _log_batch_interactions, 
+            request.documents, 
+            request.questions, 
+            parsed_queries, 
+            matched_clauses, 
+            trace_summary
+        )
+        
+        response = BatchQueryResponse(
+            answers=[matched_clause.get("text", "") for matched_clause in matched_clauses],
+            matched_clauses=matched_clauses,
+            metadata={
+                "source_document": request.documents,
+                "processed_at": datetime.utcnow().isoformat() + "Z",
+                "question_count": len(request.questions),
+                "token_usage": trace_summary["token_usage"],
+                "processing_time_ms": trace_summary["total_wall_ms"],
+                "trace": trace_summary
+            }
+        )
+        
+        logger.info(f"Successfully processed {len(matched_clauses)} questions")
+        return response
+        
+    except Exception as e:
+        logger.error(f"Error processing batch query: {str(e)}")
+        token_meter.record_request(trace, questions=len(request.questions), failed=True)
+        raise HTTPException(status_code=500, detail=f"Error processing batch query: {str(e)}")
 
 @app.get("/health")
 async def health_check():
@@ -147,15 +470,71 @@ async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
 @app.get("/stats")
-async def get_stats(token: str = Depends(verify_auth)):
-    """Get system statistics"""
+async def get_stats(
+    document_url: Optional[str] = None, 
+    window_seconds: int = 3600, 
+    token: str = Depends(verify_auth)
+):
+    """
+    Get system statistics with latency percentiles over the trailing window, optionally
+    with the statistics and most common queries of one document
+    """
     stats = await db_service.get_statistics()
-    return {
+    response = {
         "total_queries": stats.get("total_queries", 0),
         "average_confidence": stats.get("average_confidence", 0.0),
-        "most_common_queries": stats.get("most_common_queries", []),
+        "average_processing_time_ms": stats.get("average_processing_time_ms", 0.0),
+        "queries_last_hour": stats.get("queries_last_hour", 0),
+        "most_common_queries": await heavy_hitters.top(10),
+        "recent_queries": stats.get("recent_queries", []),
+        "heavy_hitters": heavy_hitters.get_stats(),
+        "latency": await latency_recorder.get_percentiles(window_seconds),
+        "latency_rollups": latency_recorder.get_stats(),
+        "retention": retention_scheduler.get_stats(),
+        "parse_cache": llm_parser.get_cache_stats(),
+        "query_parsing": llm_parser.get_parse_stats(),
+        "rationale_cache": llm_parser.get_rationale_cache_stats(),
+        "token_usage": llm_parser.get_token_usage(),
+        "coalescing": get_coalescing_stats(),
+        "circuit_breakers": get_breaker_stats(),
+        "interaction_log": interaction_logger.get_stats(),
+        "database_pool": db_service.get_pool_status(),
+        "document_store": document_store.get_stats(),
+        "auth_cache": auth_service.get_cache_stats(),
         "system_uptime": "active"
     }
+    if document_url is not None:
+        response["document"] = {
+            **await db_service.get_document_stats(document_url),
+            "most_common_queries": await heavy_hitters.top(10, document_url=document_url)
+        }
+    return response
+
+@app.get("/stats/usage")
+async def get_usage_stats(window_seconds: int = 3600, token: str = Depends(verify_auth)):
+    """Get LLM token usage per tenant and per question intent, with per-model latency/token histograms"""
+    return token_meter.get_usage(window_seconds)
+
+@app.get("/interactions/export")
+async def export_interactions(
+    format: str = "ndjson", 
+    since: Optional[datetime] = None, 
+    until: Optional[datetime] = None, 
+    document_url: Optional[str] = None, 
+    token: str = Depends(verify_auth)
+):
+    """Stream the interaction history as gzip NDJSON, Arrow IPC or Parquet"""
+    try:
+        check_format(format)
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    filename = f"interactions-{datetime.utcnow():%Y%m%dT%H%M%S}.{EXTENSIONS[format]}"
+    return StreamingResponse(
+        interaction_exporter.stream(format, since=since, until=until, document_url=document_url), 
+        media_type=MEDIA_TYPES[format], 
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Token verification under a flood of random invalid bearer tokens: traced memory (the
+token cache plus one window of latency samples), per-call latency and log records, for
+the previous unbounded cache and the bounded LRU in AuthService. The valid token is
+presented every 100 calls throughout.
+"""
+
+import argparse
+import logging
+import os
+import secrets
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from services.auth_service import AuthService
+
+class UnboundedTokenCache:
+    """The previous verify_token: every token presented is cached by value and every miss is logged"""
+
+    def __init__(self, expected_token: str, cache_ttl: float = 300):
+        self.expected_token = expected_token
+        self.token_cache = {}
+        self.cache_ttl = cache_ttl
+        self.logger = logging.getLogger("services.auth_service")
+
+    def verify_token(self, token: str) -> bool:
+        if token in self.token_cache:
+            cached_result = self.token_cache[token]
+            if datetime.utcnow() < cached_result["expires"]:
+                return cached_result["valid"]
+            del self.token_cache[token]
+
+        is_valid = token == self.expected_token
+        self.token_cache[token] = {
+            "valid": is_valid,
+            "expires": datetime.utcnow() + timedelta(seconds=self.cache_ttl)
+        }
+        if is_valid:
+            self.logger.info("Token verification successful")
+        else:
+            self.logger.warning(f"Invalid token provided: {token[:10]}...")
+        return is_valid
+
+class CountingHandler(logging.Handler):
+    """Counts log records without formatting or writing them"""
+
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+def flood(name: str, service, tokens: int, windows: int):
+    """Verify random tokens, reporting memory and latency at the end of each window"""
+    handler = CountingHandler()
+    auth_logger = logging.getLogger("services.auth_service")
+    auth_logger.addHandler(handler)
+    auth_logger.propagate = False
+    auth_logger.setLevel(logging.INFO)
+
+    print(f"\n{name}")
+    print(f"{'tokens':>10} {'cache entries':>14} {'traced MB':>9} {'p50 us':>8} {'p99 us':>8} {'log records':>12}")
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    per_window = tokens // windows
+    valid_rejected = 0
+    try:
+        for window in range(windows):
+            latencies = []
+            for index in range(per_window):
+                token = Config.AUTH_TOKEN if index % 100 == 0 else secrets.token_hex(32)
+                started = time.perf_counter()
+                valid = service.verify_token(token)
+                latencies.append((time.perf_counter() - started) * 1e6)
+                if token == Config.AUTH_TOKEN and not valid:
+                    valid_rejected += 1
+
+            memory = tracemalloc.get_traced_memory()[0] - baseline
+            print(
+                f"{(window + 1) * per_window:>10} {len(service.token_cache):>14} {memory / 1024 / 1024:>9.1f} "
+                f"{percentile(latencies, 0.5):>8.1f} {percentile(latencies, 0.99):>8.1f} {handler.count:>12}"
+            )
+    finally:
+        tracemalloc.stop()
+        auth_logger.removeHandler(handler)
+        auth_logger.propagate = True
+
+    if valid_rejected:
+        print(f"❌ Valid token rejected {valid_rejected} times")
+
+def main():
+    parser = argparse.ArgumentParser(description="Token verification under a flood of invalid tokens")
+    parser.add_argument("--tokens", type=int, default=1_000_000)
+    parser.add_argument("--windows", type=int, default=5)
+    args = parser.parse_args()
+
+    flood("Unbounded cache (previous)", UnboundedTokenCache(Config.AUTH_TOKEN), args.tokens, args.windows)
+    flood(f"Bounded LRU ({Config.AUTH_CACHE_SIZE} entries)", AuthService(), args.tokens, args.windows)
+
+if __name__ == "__main__":
+    main()
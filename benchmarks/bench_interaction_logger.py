@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Compare per-request interaction logging (one session and commit per row, on the event
+loop) with the write-behind InteractionLogger against a SQLite database file
+
+Reports rows written per second and the latency a request spends logging.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.database import DatabaseService
+from services.interaction_logger import InteractionLogger
+
+MATCHED_CLAUSE = {
+    "text": "The policy may be terminated by either party with thirty days written notice.",
+    "location": "Clause 12",
+    "confidence": 0.82
+}
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+async def make_db(path: str) -> DatabaseService:
+    if os.path.exists(path):
+        os.remove(path)
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    db_service = DatabaseService()
+    await db_service.initialize()
+    return db_service
+
+def interaction(index: int) -> dict:
+    return {
+        "document_url": f"https://example.com/policy-{index % 50}.pdf",
+        "user_query": f"What is the notice period for termination? #{index}",
+        "matched_clause": MATCHED_CLAUSE,
+        "confidence": 0.82,
+        "processing_time_ms": 120.0,
+        "metadata": {"intent": "find_termination_clause", "parse_source": "llm"}
+    }
+
+async def bench_direct(path: str, rows: int):
+    db_service = await make_db(path)
+    latencies = []
+    start = time.perf_counter()
+    for index in range(rows):
+        call_start = time.perf_counter()
+        await db_service.log_interaction(**interaction(index))
+        latencies.append((time.perf_counter() - call_start) * 1000)
+    elapsed = time.perf_counter() - start
+    await db_service.close()
+    return elapsed, latencies
+
+async def bench_write_behind(path: str, rows: int, args):
+    db_service = await make_db(path)
+    interaction_logger = InteractionLogger(
+        db_service,
+        max_queue=args.queue_size,
+        batch_size=args.batch_size,
+        flush_interval_ms=args.flush_interval_ms,
+        overflow_policy=args.overflow_policy
+    )
+    await interaction_logger.start()
+
+    latencies = []
+    start = time.perf_counter()
+    for index in range(rows):
+        call_start = time.perf_counter()
+        await interaction_logger.log_interaction(**interaction(index))
+        latencies.append((time.perf_counter() - call_start) * 1000)
+        if index % 100 == 0:
+            # Yield like a real request handler would, letting the writer run
+            await asyncio.sleep(0)
+    await interaction_logger.close()
+    elapsed = time.perf_counter() - start
+
+    stats = interaction_logger.get_stats()
+    await db_service.close()
+    return elapsed, latencies, stats
+
+def report(label: str, rows: int, elapsed: float, latencies: List[float]):
+    print(f"{label:<14} {rows / elapsed:9.0f} rows/s   log call p50 {percentile(latencies, 0.5):.3f}ms  "
+          f"p99 {percentile(latencies, 0.99):.3f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Interaction logging throughput benchmark")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--flush-interval-ms", type=float, default=500)
+    parser.add_argument("--overflow-policy", default="drop_newest")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "interactions.db")
+        print(f"🗄️  {args.rows} interactions into SQLite ({path})")
+
+        elapsed, latencies = asyncio.run(bench_direct(path, args.rows))
+        report("per-row commit", args.rows, elapsed, latencies)
+
+        elapsed, latencies, stats = asyncio.run(bench_write_behind(path, args.rows, args))
+        report("write-behind", args.rows, elapsed, latencies)
+        print(f"{'':<14} {stats['batches']} batches, {stats['written']} written, {stats['dropped']} dropped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Measure LLMParser throughput against the local mock OpenAI server
+
+Compares the old pattern (a synchronous client called inside async code, which
+blocks the event loop) with the pooled async client used by LLMParser.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import uvicorn
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PORT = 8100
+os.environ.setdefault("OPENAI_BASE_URL", f"http://127.0.0.1:{PORT}/v1")
+os.environ.setdefault("OPENAI_API_KEY", "sk-mock")
+
+from openai import OpenAI
+
+from benchmarks import mock_openai_server
+from services.llm_parser import LLMParser
+
+QUERY = "What is the grace period for premium payment?"
+
+def start_mock_server(latency_ms: float) -> uvicorn.Server:
+    """Run the mock server in a background thread"""
+    mock_openai_server.MOCK_LATENCY_MS = latency_ms
+    server = uvicorn.Server(uvicorn.Config(mock_openai_server.app, host="127.0.0.1", port=PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+async def run_blocking(requests: int) -> float:
+    """Old behaviour: synchronous client inside async def"""
+    client = OpenAI(base_url=os.environ["OPENAI_BASE_URL"], api_key=os.environ["OPENAI_API_KEY"])
+
+    async def call():
+        client.chat.completions.create(
+            model="gpt-4",
+            messages=[{"role": "system", "content": "parse"}, {"role": "user", "content": QUERY}]
+        )
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(requests)))
+    return time.perf_counter() - start
+
+async def run_async(requests: int, concurrency: int) -> float:
+    """New behaviour: pooled async client with a concurrency cap"""
+    parser = LLMParser(max_concurrency=concurrency)
+    start = time.perf_counter()
+    # Distinct queries so single-flight coalescing does not collapse the calls
+    await asyncio.gather(*(parser.parse_query(f"{QUERY} (#{index})") for index in range(requests)))
+    elapsed = time.perf_counter() - start
+    await parser.close()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM client concurrency benchmark")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    args = parser.parse_args()
+
+    start_mock_server(args.latency_ms)
+
+    print(f"🚀 {args.requests} parse calls, mock latency {args.latency_ms:.0f}ms, concurrency cap {args.concurrency}")
+
+    blocking = asyncio.run(run_blocking(args.requests))
+    print(f"🐢 Blocking sync client: {blocking:.2f}s ({args.requests / blocking:.1f} calls/s)")
+
+    pooled = asyncio.run(run_async(args.requests, args.concurrency))
+    print(f"⚡ Pooled async client:  {pooled:.2f}s ({args.requests / pooled:.1f} calls/s)")
+
+    print(f"📈 Speed-up: {blocking / pooled:.1f}x, peak upstream concurrency {mock_openai_server.stats['max_in_flight']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Exercise the OpenAI circuit breakers and hedged requests against the fault-injecting
+mock server
+
+Phases: a healthy upstream, a full outage (the breaker should open and parses fall
+back locally within milliseconds), recovery after the open period, and a slow tail
+where hedging past p95 should cut tail latency.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from typing import List
+
+import uvicorn
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PORT = 8101
+os.environ.setdefault("OPENAI_BASE_URL", f"http://127.0.0.1:{PORT}/v1")
+os.environ.setdefault("OPENAI_API_KEY", "sk-mock")
+os.environ.setdefault("OPENAI_MAX_RETRIES", "0")
+
+from benchmarks import mock_openai_server
+from services.llm_parser import LLMParser
+from services.resilience import CircuitBreaker
+
+def start_mock_server(latency_ms: float) -> uvicorn.Server:
+    """Run the mock server in a background thread"""
+    mock_openai_server.MOCK_LATENCY_MS = latency_ms
+    server = uvicorn.Server(uvicorn.Config(mock_openai_server.app, host="127.0.0.1", port=PORT, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+async def run_phase(parser: LLMParser, label: str, requests: int, offset: int) -> List[float]:
+    """Parse distinct queries sequentially, reporting latency and where parses came from"""
+    latencies = []
+    sources = {}
+    for index in range(requests):
+        start = time.perf_counter()
+        parsed = await parser.parse_query(f"What is covered under clause {offset + index}?")
+        latencies.append((time.perf_counter() - start) * 1000)
+        sources[parsed.get("parse_source")] = sources.get(parsed.get("parse_source"), 0) + 1
+
+    breaker = parser.breaker.get_stats()
+    print(f"{label:<10} p50 {percentile(latencies, 0.5):7.1f}ms  p99 {percentile(latencies, 0.99):7.1f}ms  "
+          f"sources {sources}  breaker {breaker['state']} (opened {breaker['opened']}, rejected {breaker['rejected']})")
+    return latencies
+
+async def run_breaker_phases(args):
+    parser = LLMParser()
+    parser.breaker = CircuitBreaker("bench_chat", open_seconds=args.open_seconds, hedge=False)
+
+    print("🔌 Circuit breaker")
+    mock_openai_server.faults.update(error_rate=0.0, slow_rate=0.0)
+    await run_phase(parser, "healthy", args.requests, 0)
+
+    mock_openai_server.faults.update(error_rate=1.0)
+    await run_phase(parser, "outage", args.requests, 1000)
+
+    mock_openai_server.faults.update(error_rate=0.0)
+    await asyncio.sleep(args.open_seconds)
+    await run_phase(parser, "recovered", args.requests, 2000)
+    await parser.close()
+
+async def run_hedge_phases(args):
+    print(f"✂️  Hedging ({args.slow_rate:.0%} of calls take {args.slow_latency_ms:.0f}ms)")
+    mock_openai_server.faults.update(error_rate=0.0, slow_rate=args.slow_rate, slow_latency_ms=args.slow_latency_ms)
+
+    for hedge in (False, True):
+        parser = LLMParser()
+        parser.breaker = CircuitBreaker(
+            f"bench_hedge_{hedge}",
+            slow_call_ms=args.slow_latency_ms * 2,
+            hedge=hedge
+        )
+        await run_phase(parser, "hedged" if hedge else "unhedged", args.requests * 4, 3000 + 1000 * int(hedge))
+        stats = parser.breaker.get_stats()
+        if hedge:
+            print(f"{'':<10} hedged {stats['hedged']} calls, hedge won {stats['hedge_wins']}")
+        await parser.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Circuit breaker and hedging benchmark")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--open-seconds", type=float, default=2.0)
+    parser.add_argument("--slow-rate", type=float, default=0.03, help="Keep below 5%% so p95 stays out of the slow tail")
+    parser.add_argument("--slow-latency-ms", type=float, default=1500)
+    args = parser.parse_args()
+
+    start_mock_server(args.latency_ms)
+    asyncio.run(run_breaker_phases(args))
+    asyncio.run(run_hedge_phases(args))
+    print(f"📊 Mock server: {mock_openai_server.stats}")
+
+if __name__ == "__main__":
+    main()
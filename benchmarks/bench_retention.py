@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Interaction table at scale on SQLite: query latency with and without the composite
+indexes, then a single-transaction purge versus the chunked retention purge while a
+writer keeps logging interactions
+
+Loads --rows interactions (default 10M) spread over 90 days, so each purge removes about
+a third of the table. Needs a few GB of free disk at the default size.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, text
+
+from services.database import DatabaseService, DocumentInteraction
+
+DOCUMENTS = 500
+LOAD_CHUNK = 100000
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+def load_rows(path: str, rows: int):
+    """Bulk load interactions with the sqlite3 module; far faster than going through the ORM"""
+    rng = random.Random(11)
+    now = datetime.utcnow()
+    clause = json.dumps({"text": "Either party may terminate with thirty days notice.", "confidence": 0.8})
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    started = time.perf_counter()
+    for offset in range(0, rows, LOAD_CHUNK):
+        batch = []
+        for index in range(offset, min(offset + LOAD_CHUNK, rows)):
+            created_at = now - timedelta(seconds=rng.uniform(0, 90 * 86400))
+            batch.append((
+                f"https://example.com/policy-{index % DOCUMENTS}.pdf",
+                f"What is the notice period? #{index % 1000}",
+                clause,
+                round(rng.random(), 3),
+                rng.uniform(50, 500),
+                created_at.isoformat(sep=" "),
+                "{}"
+            ))
+        connection.executemany(
+            "INSERT INTO document_interactions "
+            "(document_url, user_query, matched_clause, confidence, processing_time_ms, created_at, metadata) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            batch
+        )
+        connection.commit()
+        print(f"\r   loaded {min(offset + LOAD_CHUNK, rows):,} rows", end="", flush=True)
+    connection.close()
+    print(f"\r   loaded {rows:,} rows in {time.perf_counter() - started:.1f}s")
+
+async def time_queries(db_service: DatabaseService, repeats: int = 5) -> Dict[str, float]:
+    """Median latency of the read paths that filter or sort the interaction table"""
+    cutoff = datetime.utcnow() - timedelta(days=30)
+
+    async def retention_scan():
+        async with db_service.SessionLocal() as db:
+            await db.execute(
+                text("SELECT id FROM document_interactions WHERE created_at < :cutoff ORDER BY created_at LIMIT 5000"),
+                {"cutoff": cutoff}
+            )
+
+    queries = {
+        "document stats": lambda: db_service.get_document_stats("https://example.com/policy-7.pdf"),
+        "recent interactions": lambda: db_service.get_recent_interactions(limit=10),
+        "retention batch scan": retention_scan
+    }
+    timings = {}
+    for name, query in queries.items():
+        samples = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            await query()
+            samples.append((time.perf_counter() - started) * 1000)
+        timings[name] = percentile(samples, 0.5)
+    return timings
+
+async def purge_under_traffic(db_service: DatabaseService, purge) -> Dict[str, float]:
+    """Run a purge while a writer logs an interaction every 10ms; report writer latency"""
+    latencies = []
+    failures = 0
+    stop = asyncio.Event()
+
+    async def writer():
+        nonlocal failures
+        index = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            ok = await db_service.log_interactions([{
+                "document_url": "https://example.com/live.pdf",
+                "user_query": f"Live query {index}",
+                "matched_clause": {},
+                "confidence": 0.5,
+                "processing_time_ms": 100.0,
+                "metadata": {}
+            }])
+            latencies.append((time.perf_counter() - started) * 1000)
+            failures += int(not ok)
+            index += 1
+            await asyncio.sleep(0.01)
+
+    writer_task = asyncio.ensure_future(writer())
+    await asyncio.sleep(0.5)
+    started = time.perf_counter()
+    deleted = await purge()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await writer_task
+
+    return {
+        "deleted": deleted,
+        "elapsed_s": elapsed,
+        "writes": len(latencies),
+        "write_p50_ms": percentile(latencies, 0.5),
+        "write_p99_ms": percentile(latencies, 0.99),
+        "write_max_ms": max(latencies) if latencies else 0.0,
+        "write_failures": failures
+    }
+
+async def run(path: str, args):
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    db_service = DatabaseService()
+    await db_service.initialize()
+
+    # Load without secondary indexes, as an existing deployment would have
+    async with db_service.engine.begin() as connection:
+        for index in DocumentInteraction.__table__.indexes:
+            await connection.run_sync(lambda sync_connection: index.drop(sync_connection, checkfirst=True))
+    load_rows(path, args.rows)
+
+    started = time.perf_counter()
+    await db_service.rebuild_rollups()
+    print(f"   rollups rebuilt in {time.perf_counter() - started:.1f}s")
+
+    unindexed = await time_queries(db_service)
+    started = time.perf_counter()
+    async with db_service.engine.begin() as connection:
+        await connection.run_sync(db_service._ensure_indexes)
+    print(f"   indexes built in {time.perf_counter() - started:.1f}s")
+    indexed = await time_queries(db_service)
+
+    print(f"\n{'query':<22} {'no index':>10} {'indexed':>10}")
+    for name in indexed:
+        print(f"{name:<22} {unindexed[name]:8.1f}ms {indexed[name]:8.1f}ms")
+
+    async def single_transaction_purge():
+        # The previous cleanup: one DELETE for everything past the cutoff
+        async with db_service.SessionLocal() as db:
+            result = await db.execute(
+                delete(DocumentInteraction).where(DocumentInteraction.created_at < datetime.utcnow() - timedelta(days=60))
+            )
+            await db.commit()
+        return result.rowcount
+
+    print("\n🧹 purging under write traffic")
+    results = {
+        "single transaction": await purge_under_traffic(db_service, single_transaction_purge),
+        "chunked": await purge_under_traffic(
+            db_service,
+            lambda: db_service.cleanup_old_interactions(days_old=30, batch_size=args.batch_size, pause_ms=args.pause_ms)
+        )
+    }
+    print(f"{'purge':<20} {'deleted':>10} {'time':>8} {'writes':>7} {'write p50':>10} {'write p99':>10} {'write max':>10} {'failed':>7}")
+    for name, result in results.items():
+        print(f"{name:<20} {result['deleted']:>10,} {result['elapsed_s']:7.1f}s {result['writes']:>7} "
+              f"{result['write_p50_ms']:8.1f}ms {result['write_p99_ms']:8.1f}ms {result['write_max_ms']:8.1f}ms "
+              f"{result['write_failures']:>7}")
+
+    await db_service.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Interaction table index and retention benchmark on SQLite")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--pause-ms", type=float, default=100)
+    parser.add_argument("--dir", default=None, help="Directory for the database file (default: a temp dir)")
+    args = parser.parse_args()
+
+    # Writes failing with "database is locked" are counted in the results instead
+    logging.getLogger("services.database").setLevel(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        path = os.path.join(directory, "interactions.db")
+        print(f"🗄️  {args.rows:,} interactions in SQLite ({path})")
+        asyncio.run(run(path, args))
+
+if __name__ == "__main__":
+    main()
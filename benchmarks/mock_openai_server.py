@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Local mock of the OpenAI chat completions and embeddings APIs for load, concurrency
+and fault-injection testing
+
+Run with: python benchmarks/mock_openai_server.py --port 8100 --latency-ms 800
+and point the app at it with OPENAI_BASE_URL=http://localhost:8100/v1
+
+Faults can be injected at startup (--error-rate, --slow-rate, --slow-latency-ms) or at
+runtime with POST /faults {"error_rate": 0.5, "slow_rate": 0.1, "slow_latency_ms": 5000}
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI(title="Mock OpenAI API")
+
+# Simulated upstream latency per completion
+MOCK_LATENCY_MS = float(os.getenv("MOCK_LATENCY_MS", "500"))
+
+PARSED_QUERY = {
+    "intent": "general_search",
+    "keywords": ["policy", "coverage"],
+    "clause_type": "general",
+    "context": "mock parse"
+}
+
+# Delay between streamed tokens
+MOCK_TOKEN_DELAY_MS = float(os.getenv("MOCK_TOKEN_DELAY_MS", "50"))
+
+RATIONALE = "This clause matches the query because it addresses the requested terms."
+
+EMBEDDING_DIMENSION = 1536
+
+# Injected faults: fraction of requests that fail with a 500, and fraction that take slow_latency_ms
+faults = {
+    "error_rate": float(os.getenv("MOCK_ERROR_RATE", "0")),
+    "slow_rate": float(os.getenv("MOCK_SLOW_RATE", "0")),
+    "slow_latency_ms": float(os.getenv("MOCK_SLOW_LATENCY_MS", "5000"))
+}
+
+stats = {
+    "requests": 0,
+    "in_flight": 0,
+    "max_in_flight": 0,
+    "streams_completed": 0,
+    "streams_aborted": 0,
+    "injected_errors": 0,
+    "injected_slow": 0
+}
+
+async def simulate_upstream():
+    """Wait the configured latency, with injected slow calls; returns an error response for injected failures"""
+    stats["requests"] += 1
+    stats["in_flight"] += 1
+    stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+
+    try:
+        latency_ms = MOCK_LATENCY_MS
+        if random.random() < faults["slow_rate"]:
+            stats["injected_slow"] += 1
+            latency_ms = faults["slow_latency_ms"]
+        await asyncio.sleep(latency_ms / 1000.0)
+    finally:
+        stats["in_flight"] -= 1
+
+    if random.random() < faults["error_rate"]:
+        stats["injected_errors"] += 1
+        return JSONResponse(
+            status_code=500,
+            content={"error": {"message": "Injected upstream failure", "type": "server_error"}}
+        )
+    return None
+
+async def stream_completion(model: str):
+    """Yield the rationale word by word as OpenAI-style SSE chunks"""
+    completed = False
+    try:
+        for word in RATIONALE.split(" "):
+            await asyncio.sleep(MOCK_TOKEN_DELAY_MS / 1000.0)
+            chunk = {
+                "id": f"chatcmpl-mock-{stats['requests']}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+        completed = True
+    finally:
+        stats["streams_completed" if completed else "streams_aborted"] += 1
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    """Return a canned completion after the configured latency"""
+    payload = await request.json()
+    error_response = await simulate_upstream()
+    if error_response is not None:
+        return error_response
+
+    if payload.get("stream"):
+        return StreamingResponse(stream_completion(payload.get("model", "gpt-4")), media_type="text/event-stream")
+
+    system_prompt = payload["messages"][0]["content"] if payload.get("messages") else ""
+    if "parse" in system_prompt.lower():
+        content = json.dumps(PARSED_QUERY)
+    else:
+        content = RATIONALE
+
+    return {
+        "id": f"chatcmpl-mock-{stats['requests']}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": payload.get("model", "gpt-4"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {"prompt_tokens": 50, "completion_tokens": 20, "total_tokens": 70}
+    }
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    """Return deterministic pseudo-embeddings derived from each input's hash"""
+    payload = await request.json()
+    error_response = await simulate_upstream()
+    if error_response is not None:
+        return error_response
+
+    inputs = payload.get("input", [])
+    if isinstance(inputs, str):
+        inputs = [inputs]
+
+    data = []
+    for index, text in enumerate(inputs):
+        seed = int(hashlib.sha256(str(text).encode("utf-8")).hexdigest()[:8], 16)
+        generator = random.Random(seed)
+        data.append({
+            "object": "embedding",
+            "index": index,
+            "embedding": [generator.uniform(-1, 1) for _ in range(EMBEDDING_DIMENSION)]
+        })
+
+    return {
+        "object": "list",
+        "data": data,
+        "model": payload.get("model", "text-embedding-ada-002"),
+        "usage": {"prompt_tokens": 8 * len(inputs), "total_tokens": 8 * len(inputs)}
+    }
+
+@app.post("/faults")
+async def set_faults(request: Request):
+    """Change the injected fault rates at runtime"""
+    faults.update({key: float(value) for key, value in (await request.json()).items() if key in faults})
+    return faults
+
+@app.get("/stats")
+async def get_stats():
+    """Request counters for the benchmark scripts"""
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock OpenAI API server")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=MOCK_LATENCY_MS)
+    parser.add_argument("--error-rate", type=float, default=faults["error_rate"])
+    parser.add_argument("--slow-rate", type=float, default=faults["slow_rate"])
+    parser.add_argument("--slow-latency-ms", type=float, default=faults["slow_latency_ms"])
+    args = parser.parse_args()
+
+    MOCK_LATENCY_MS = args.latency_ms
+    faults.update(error_rate=args.error_rate, slow_rate=args.slow_rate, slow_latency_ms=args.slow_latency_ms)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Replay a query log through the local intent classifier and report how many LLM
+parse calls the confidence-gated fast path would skip and the latency saved
+
+Queries come from --queries-file (plain text, one per line, or JSONL with a
+"user_query"/"query" field) or from the document_interactions table. Logged
+interactions whose parse came from the LLM are used to calibrate the classifier
+and to measure agreement with the LLM intent.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from services.intent_classifier import LocalIntentClassifier, GENERAL_INTENT
+
+def load_queries_file(path: str) -> List[Tuple[str, Optional[str]]]:
+    """Read (query, llm intent) pairs from a text or JSONL file"""
+    queries = []
+    with open(path) as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                query = record.get("user_query") or record.get("query")
+                if query:
+                    queries.append((query, record.get("intent")))
+            else:
+                queries.append((line, None))
+    return queries
+
+async def load_logged_queries(limit: int) -> List[Tuple[str, Optional[str]]]:
+    """Read queries and their logged LLM intents from the interaction store"""
+    from services.database import DatabaseService
+
+    db_service = DatabaseService()
+    await db_service.initialize()
+    interactions = await db_service.get_recent_interactions(limit=limit)
+    await db_service.close()
+
+    queries = []
+    for interaction in interactions:
+        metadata = interaction.get("metadata") or {}
+        intent = metadata.get("intent") if metadata.get("parse_source") == "llm" else None
+        queries.append((interaction["user_query"], intent))
+    return queries
+
+async def replay(queries: List[Tuple[str, Optional[str]]], args) -> None:
+    embed_fn = None
+    if args.with_embeddings:
+        from services.embedding_service import EmbeddingService
+        embed_fn = EmbeddingService().embed_queries
+
+    classifier = LocalIntentClassifier(embed_fn=embed_fn)
+
+    labelled = [(query, intent) for query, intent in queries if intent]
+    if labelled and not args.no_calibrate:
+        await classifier.calibrate([query for query, _ in labelled], [intent for _, intent in labelled])
+
+    local_count = 0
+    agreements = 0
+    agreement_total = 0
+    classify_seconds = 0.0
+
+    for query, llm_intent in queries:
+        start = time.perf_counter()
+        classification = await classifier.classify(query)
+        classify_seconds += time.perf_counter() - start
+
+        is_local = classification["intent"] != GENERAL_INTENT and classification["confidence"] >= args.threshold
+        if is_local:
+            local_count += 1
+            if llm_intent:
+                agreement_total += 1
+                agreements += int(classification["intent"] == llm_intent)
+
+    total = len(queries)
+    llm_calls = total - local_count
+    saved_ms = local_count * args.llm_latency_ms - classify_seconds * 1000
+
+    print("📊 Local fast-path replay")
+    print(f"Queries replayed:        {total}")
+    print(f"Confidence threshold:    {args.threshold}")
+    print(f"Calibrated temperature:  {classifier.temperature:.3f} ({len(labelled)} labelled queries)")
+    print(f"Answered locally:        {local_count}")
+    print(f"LLM calls:               {llm_calls} ({llm_calls / total:.1%} call rate)" if total else "LLM calls:               0")
+    print(f"Local classify time:     {classify_seconds * 1000 / max(total, 1):.2f}ms per query")
+    print(f"Latency saved:           {saved_ms / 1000:.1f}s total, {saved_ms / max(total, 1):.0f}ms per query "
+          f"(at {args.llm_latency_ms:.0f}ms per LLM parse)")
+    if agreement_total:
+        print(f"Agreement with LLM:      {agreements / agreement_total:.1%} of {agreement_total} labelled local answers")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a query log through the local intent classifier")
+    parser.add_argument("--queries-file", help="Text or JSONL file of queries; defaults to the interaction log")
+    parser.add_argument("--limit", type=int, default=10000, help="Interactions to read from the database")
+    parser.add_argument("--threshold", type=float, default=Config.LOCAL_PARSE_THRESHOLD)
+    parser.add_argument("--llm-latency-ms", type=float, default=2000.0, help="Average LLM parse latency")
+    parser.add_argument("--with-embeddings", action="store_true", help="Include the embedding model in the classifier")
+    parser.add_argument("--no-calibrate", action="store_true")
+    args = parser.parse_args()
+
+    if args.queries_file:
+        queries = load_queries_file(args.queries_file)
+    else:
+        queries = asyncio.run(load_logged_queries(args.limit))
+
+    if not queries:
+        print("❌ No queries to replay")
+        sys.exit(1)
+
+    asyncio.run(replay(queries, args))
+
+if __name__ == "__main__":
+    main()
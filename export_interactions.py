@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Export the interaction history from the database configured by DATABASE_URL as Parquet,
+Arrow IPC or gzip-compressed NDJSON
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import datetime
+
+from config import Config
+from services.database import DatabaseService
+from services.interaction_export import EXPORT_FORMATS, EXTENSIONS, InteractionExporter, check_format
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="parquet")
+    parser.add_argument("--output", help="Output file (default interactions-<timestamp>.<ext>)")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="Only interactions at or after this ISO timestamp (UTC)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="Only interactions before this ISO timestamp (UTC)")
+    parser.add_argument("--document-url", help="Only interactions with this document")
+    parser.add_argument("--batch-size", type=int, default=Config.EXPORT_BATCH_SIZE, help="Rows read and encoded per page")
+    return parser.parse_args()
+
+async def main():
+    args = parse_args()
+    try:
+        check_format(args.format)
+    except RuntimeError as e:
+        logger.error(f"❌ {e}")
+        sys.exit(1)
+
+    output = args.output or f"interactions-{datetime.utcnow():%Y%m%dT%H%M%S}.{EXTENSIONS[args.format]}"
+
+    db_service = DatabaseService()
+    try:
+        await db_service.connect()
+    except Exception as e:
+        logger.error(f"❌ Cannot read interactions from the configured database: {e}")
+        sys.exit(1)
+    try:
+        exporter = InteractionExporter(db_service, batch_size=args.batch_size)
+        started = datetime.utcnow()
+        written = await exporter.export_to_file(
+            output,
+            args.format,
+            since=args.since,
+            until=args.until,
+            document_url=args.document_url
+        )
+        elapsed = (datetime.utcnow() - started).total_seconds()
+        logger.info(f"✅ Wrote {written / 1024 / 1024:.1f} MB to {output} in {elapsed:.1f}s")
+    finally:
+        await db_service.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
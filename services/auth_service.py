@@ -1,50 +1,74 @@
 import os
 import logging
+import time
+import hmac
+from collections import OrderedDict
 from typing import Dict, Any
-from datetime import datetime, timedelta
+from datetime import datetime
 import hashlib
 
+from config import Config
+
 logger = logging.getLogger(__name__)
 
 class AuthService:
-    """Handles authentication and authorization"""
+    """
+    Handles authentication and authorization. Verification results are cached in a
+    bounded LRU keyed by the SHA-256 of the token, so the cache never holds raw tokens and
+    a flood of random tokens only recycles its oldest entries. Failed verifications are
+    logged at most once per interval with a count of the failures in between.
+    """
     
-    def __init__(self):
-        # The expected token from the requirements
-        self.expected_token = "15d8d43a4a6736a9d7c238f8fd1b44c29eaac0098c94a7c6ad802075b77bd355"
+    def __init__(
+        self, 
+        expected_token: str = Config.AUTH_TOKEN, 
+        cache_size: int = Config.AUTH_CACHE_SIZE, 
+        cache_ttl: float = Config.AUTH_CACHE_TTL_SECONDS, 
+        failure_log_interval: float = Config.AUTH_FAILURE_LOG_INTERVAL_SECONDS
+    ):
+        self.expected_token = expected_token
+        self._expected_digest = self._digest(expected_token)
+        
+        # token digest -> (valid, monotonic expiry)
+        self.token_cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self.cache_size = max(1, cache_size)
+        self.cache_ttl = cache_ttl
+        
+        self.failure_log_interval = failure_log_interval
+        self._next_failure_log = 0.0
+        self._unlogged_failures = 0
         
-        # Token cache for performance
-        self.token_cache = {}
-        self.cache_ttl = 300  # 5 minutes
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "failures": 0
+        }
     
     def verify_token(self, token: str) -> bool:
         """
         Verify if the provided token is valid
         """
         try:
-            # Check if token is in cache
-            if token in self.token_cache:
-                cached_result = self.token_cache[token]
-                if datetime.utcnow() < cached_result["expires"]:
-                    return cached_result["valid"]
-                else:
-                    # Remove expired cache entry
-                    del self.token_cache[token]
-            
-            # Verify token
-            is_valid = self._validate_token(token)
-            
-            # Cache the result
-            self.token_cache[token] = {
-                "valid": is_valid,
-                "expires": datetime.utcnow() + timedelta(seconds=self.cache_ttl)
-            }
+            digest = self._digest(token)
+            now = time.monotonic()
             
-            if is_valid:
-                logger.info("Token verification successful")
+            cached = self.token_cache.get(digest)
+            if cached is not None and now < cached[1]:
+                self.token_cache.move_to_end(digest)
+                self.stats["hits"] += 1
+                is_valid = cached[0]
             else:
-                logger.warning(f"Invalid token provided: {token[:10]}...")
+                self.stats["misses"] += 1
+                is_valid = self._validate_digest(digest)
+                self.token_cache[digest] = (is_valid, now + self.cache_ttl)
+                self.token_cache.move_to_end(digest)
+                if len(self.token_cache) > self.cache_size:
+                    self.token_cache.popitem(last=False)
+                    self.stats["evictions"] += 1
             
+            if not is_valid:
+                self._log_failure(now)
             return is_valid
             
         except Exception as e:
@@ -56,19 +80,28 @@ class AuthService:
         Validate the token against expected value
         """
         try:
-            # Direct comparison with expected token
-            if token == self.expected_token:
-                return True
-            
-            # Additional validation logic can be added here
-            # For example, checking token format, expiration, etc.
-            
-            return False
-            
+            return self._validate_digest(self._digest(token))
         except Exception as e:
             logger.error(f"Error validating token: {str(e)}")
             return False
     
+    def _validate_digest(self, digest: bytes) -> bool:
+        """Constant-time comparison of fixed-length digests, so timing reveals nothing about the expected token"""
+        return hmac.compare_digest(digest, self._expected_digest)
+    
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+    
+    def _log_failure(self, now: float):
+        """Count a failed verification, logging at most once per interval"""
+        self.stats["failures"] += 1
+        self._unlogged_failures += 1
+        if now >= self._next_failure_log:
+            logger.warning(f"Invalid token provided ({self._unlogged_failures} failed verifications since the last report)")
+            self._unlogged_failures = 0
+            self._next_failure_log = now + self.failure_log_interval
+    
     def generate_token(self, user_id: str, secret: str = None) -> str:
         """
         Generate a new token (for testing purposes)
@@ -93,7 +126,7 @@ class AuthService:
         Get information about a token (for debugging)
         """
         try:
-            if token == self.expected_token:
+            if self._validate_token(token):
                 return {
                     "valid": True,
                     "type": "api_token",
@@ -110,33 +143,15 @@ class AuthService:
             logger.error(f"Error getting token info: {str(e)}")
             return {"valid": False, "error": str(e)}
     
-    def cleanup_expired_cache(self):
-        """
-        Clean up expired cache entries
-        """
-        try:
-            current_time = datetime.utcnow()
-            expired_tokens = [
-                token for token, cache_data in self.token_cache.items()
-                if current_time >= cache_data["expires"]
-            ]
-            
-            for token in expired_tokens:
-                del self.token_cache[token]
-            
-            if expired_tokens:
-                logger.info(f"Cleaned up {len(expired_tokens)} expired cache entries")
-                
-        except Exception as e:
-            logger.error(f"Error cleaning up expired cache: {str(e)}")
-    
     def get_cache_stats(self) -> Dict[str, Any]:
         """
         Get cache statistics
         """
         try:
             return {
+                **self.stats,
                 "cache_size": len(self.token_cache),
+                "cache_capacity": self.cache_size,
                 "cache_ttl_seconds": self.cache_ttl,
                 "expected_token_length": len(self.expected_token)
             }
@@ -1,19 +1,26 @@
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 import time
-from sklearn.metrics.pairwise import cosine_similarity
 import re
 
+from config import Config
+from services.keyword_matcher import KEYWORD_AUTOMATON, INTENT_KEYWORDS, compile_keywords
+from services.span_extractor import score_lexical
+from services.tracing import current_trace, trace_stage
+
 logger = logging.getLogger(__name__)
 
 class ClauseMatcher:
     """Handles semantic clause matching with confidence scoring"""
     
-    def __init__(self):
-        self.processing_time = 0
+    def __init__(self, embedding_service=None, reranker=None, span_extractor=None):
         self.confidence_threshold = 0.7
         self.max_candidates = 10
+        self.embedding_service = embedding_service
+        self.reranker = reranker
+        self.span_extractor = span_extractor
+        self.span_segments = 3
         
     async def find_best_match(
         self, 
@@ -24,151 +31,323 @@ class ClauseMatcher:
         """
         Find the best matching clause using semantic search and logic evaluation
         """
-        start_time = time.time()
+        matches = await self.find_best_matches([parsed_query], document_segments, embeddings)
+        return matches[0] if matches else self._get_fallback_match()
+    
+    async def find_best_matches(
+        self, 
+        parsed_queries: List[Dict[str, Any]], 
+        document_segments: List[Dict[str, Any]], 
+        embeddings: List[np.ndarray]
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the best matching clause for each of several queries against one document.
+        All queries are embedded in one batch and scored with a single Q x N matrix product.
+        """
+        if not parsed_queries:
+            return []
         
+        with trace_stage("match"):
+            return await self._match_queries(parsed_queries, document_segments, embeddings)
+    
+    async def _match_queries(
+        self, 
+        parsed_queries: List[Dict[str, Any]], 
+        document_segments: List[Dict[str, Any]], 
+        embeddings: List[np.ndarray]
+    ) -> List[Dict[str, Any]]:
+        """Run the embed, score, re-rank and select steps for a batch of queries"""
         try:
-            # Step 1: Generate query embedding
-            query_embedding = await self._generate_query_embedding(parsed_query)
+            segment_matrix = self._to_matrix(embeddings)
+            
+            # Step 1: Generate query embeddings in one batch
+            query_matrix = await self._generate_query_embeddings(parsed_queries, segment_matrix.shape[1])
             
-            # Step 2: Find similar segments using FAISS
-            similar_segments = await self._find_similar_segments(query_embedding, embeddings)
+            # Step 2: Score every query against every segment at once, by keywords when the
+            # queries could not be embedded
+            if query_matrix is None:
+                candidate_lists = self._keyword_candidates(parsed_queries, document_segments)
+            else:
+                candidate_lists = await self._find_similar_segments(query_matrix, segment_matrix)
             
             # Step 3: Apply logic evaluation and scoring
-            scored_matches = await self._evaluate_matches(
-                parsed_query, 
-                similar_segments, 
+            scored_lists = await self._evaluate_matches(
+                parsed_queries, 
+                candidate_lists, 
                 document_segments
             )
             
-            # Step 4: Select best match
-            best_match = await self._select_best_match(scored_matches)
-            
-            # Step 5: Format response
-            formatted_match = await self._format_match_result(best_match, parsed_query)
-            
-            self.processing_time = (time.time() - start_time) * 1000  # Convert to milliseconds
-            
-            logger.info(f"Best match found with confidence: {formatted_match.get('confidence', 0.0)}")
-            return formatted_match
+            # Step 4: Optionally re-rank the heuristic order with the cross-encoder
+            rerank_stats = await self._rerank_matches(parsed_queries, scored_lists)
+            
+            # Step 5: Select the best match of every query
+            best_matches = [await self._select_best_match(scored_matches) for scored_matches in scored_lists]
+            
+            # Step 6: Narrow each match to an answer span, embedding all candidate sentences once
+            spans = await self._extract_answer_spans(parsed_queries, scored_lists)
+            
+            # Step 7: Format the results
+            formatted_matches = []
+            for query_index, (parsed_query, scored_matches, best_match, span) in enumerate(
+                zip(parsed_queries, scored_lists, best_matches, spans)
+            ):
+                if span:
+                    best_match = next(
+                        (
+                            match for match in scored_matches 
+                            if match["segment"].get("segment_id") == span["segment_id"]
+                        ), 
+                        best_match
+                    )
+                formatted_match = await self._format_match_result(best_match, parsed_query, span)
+                if rerank_stats is not None:
+                    formatted_match["reranking"] = rerank_stats[query_index]
+                formatted_matches.append(formatted_match)
+            
+            logger.info(f"Matched {len(formatted_matches)} queries against {len(document_segments)} segments")
+            return formatted_matches
             
         except Exception as e:
             logger.error(f"Error in clause matching: {str(e)}")
-            return self._get_fallback_match()
+            return [self._get_fallback_match() for _ in parsed_queries]
+    
+    def _build_query_text(self, parsed_query: Dict[str, Any]) -> str:
+        """Combine query components for embedding"""
+        return f"{parsed_query.get('intent', '')} {' '.join(parsed_query.get('keywords', []) or [])} {parsed_query.get('context', '')}"
+    
+    def _to_matrix(self, embeddings: List[np.ndarray]) -> np.ndarray:
+        """Stack segment embeddings into an N x D float32 matrix"""
+        if isinstance(embeddings, np.ndarray) and embeddings.ndim == 2:
+            return embeddings.astype(np.float32, copy=False)
+        if not len(embeddings):
+            return np.zeros((0, self._embedding_dimension()), dtype=np.float32)
+        return np.vstack([np.asarray(embedding, dtype=np.float32).ravel() for embedding in embeddings])
+    
+    def _embedding_dimension(self) -> int:
+        """Dimension of the embedding model in use, for matrices with no segment rows"""
+        if self.embedding_service is not None:
+            return self.embedding_service.get_embedding_dimension()
+        return Config.EMBEDDING_DIMENSION
     
-    async def _generate_query_embedding(self, parsed_query: Dict[str, Any]) -> np.ndarray:
-        """Generate embedding for the parsed query"""
+    def _normalize_rows(self, matrix: np.ndarray) -> np.ndarray:
+        """L2-normalise rows so a dot product equals cosine similarity"""
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+    
+    async def _generate_query_embeddings(self, parsed_queries: List[Dict[str, Any]], dimension: int) -> Optional[np.ndarray]:
+        """
+        Generate a Q x D embedding matrix for the parsed queries with the model the segments
+        used, or None when that model is unavailable (e.g. its circuit is open)
+        """
+        if self.embedding_service is None:
+            return None
+        
         try:
-            # Combine query components for embedding
-            query_text = f"{parsed_query.get('intent', '')} {' '.join(parsed_query.get('keywords', []))} {parsed_query.get('context', '')}"
-            
-            # Use the same embedding service as document segments
-            from services.embedding_service import EmbeddingService
-            embedding_service = EmbeddingService()
-            
-            # Generate embedding (simplified for this example)
-            # In practice, this would use the same embedding model as document segments
-            query_embedding = np.random.rand(1536)  # Placeholder
-            return query_embedding
+            query_texts = [self._build_query_text(parsed_query) for parsed_query in parsed_queries]
+            return np.asarray(await self.embedding_service.embed_queries(query_texts, dimension), dtype=np.float32)
             
         except Exception as e:
-            logger.error(f"Error generating query embedding: {str(e)}")
-            return np.random.rand(1536)  # Fallback
+            logger.warning(f"Query embeddings unavailable, ranking segments by keywords: {str(e)}")
+            return None
+    
+    def _keyword_candidates(
+        self, 
+        parsed_queries: List[Dict[str, Any]], 
+        document_segments: List[Dict[str, Any]]
+    ) -> List[List[Dict[str, Any]]]:
+        """Rank segments by IDF-weighted coverage of each query's terms, in place of cosine similarity"""
+        segment_texts = [segment.get("text", "") for segment in document_segments]
+        
+        candidate_lists = []
+        for parsed_query in parsed_queries:
+            query_text = f"{' '.join(parsed_query.get('keywords', []) or [])} {parsed_query.get('context', '')}"
+            scores = score_lexical(query_text, segment_texts)
+            
+            ordered = np.argsort(-scores, kind="stable")[:self.max_candidates]
+            candidate_lists.append([
+                {
+                    "index": int(index),
+                    "similarity": float(scores[index]),
+                    "confidence": float(scores[index])
+                }
+                for index in ordered if scores[index] > 0
+            ])
+        
+        return candidate_lists
     
     async def _find_similar_segments(
         self, 
-        query_embedding: np.ndarray, 
-        embeddings: List[np.ndarray]
-    ) -> List[Dict[str, Any]]:
-        """Find similar document segments using cosine similarity"""
+        query_matrix: np.ndarray, 
+        segment_matrix: np.ndarray
+    ) -> List[List[Dict[str, Any]]]:
+        """Find similar document segments for every query using one cosine similarity product"""
         try:
-            similarities = []
-            
-            for i, doc_embedding in enumerate(embeddings):
-                # Calculate cosine similarity
-                similarity = cosine_similarity(
-                    query_embedding.reshape(1, -1), 
-                    doc_embedding.reshape(1, -1)
-                )[0][0]
-                
-                similarities.append({
-                    "index": i,
-                    "similarity": similarity,
-                    "confidence": max(0, similarity)  # Ensure non-negative
-                })
+            if segment_matrix.shape[0] == 0:
+                return [[] for _ in range(len(query_matrix))]
+            
+            similarities = self._normalize_rows(query_matrix) @ self._normalize_rows(segment_matrix).T
+            top_k = min(self.max_candidates, similarities.shape[1])
+            
+            # Partial sort per row, then order only the top candidates
+            top_indices = np.argpartition(-similarities, top_k - 1, axis=1)[:, :top_k]
             
-            # Sort by similarity and take top candidates
-            similarities.sort(key=lambda x: x["similarity"], reverse=True)
-            return similarities[:self.max_candidates]
+            candidate_lists = []
+            for row, indices in zip(similarities, top_indices):
+                ordered = indices[np.argsort(-row[indices])]
+                candidate_lists.append([
+                    {
+                        "index": int(index),
+                        "similarity": float(row[index]),
+                        "confidence": max(0.0, float(row[index]))  # Ensure non-negative
+                    }
+                    for index in ordered
+                ])
+            
+            return candidate_lists
             
         except Exception as e:
             logger.error(f"Error finding similar segments: {str(e)}")
-            return []
+            return [[] for _ in range(len(query_matrix))]
     
     async def _evaluate_matches(
         self, 
-        parsed_query: Dict[str, Any], 
-        similar_segments: List[Dict[str, Any]], 
+        parsed_queries: List[Dict[str, Any]], 
+        candidate_lists: List[List[Dict[str, Any]]], 
         document_segments: List[Dict[str, Any]]
-    ) -> List[Dict[str, Any]]:
-        """Apply logic evaluation to score matches"""
+    ) -> List[List[Dict[str, Any]]]:
+        """Apply logic evaluation to score the candidate matches of every query"""
         try:
-            scored_matches = []
+            candidate_segments = {
+                segment_info["index"]: document_segments[segment_info["index"]]
+                for similar_segments in candidate_lists
+                for segment_info in similar_segments
+                if segment_info["index"] < len(document_segments)
+            }
+            profiles = self._build_segment_profiles(parsed_queries, candidate_segments)
             
-            for segment_info in similar_segments:
-                segment_index = segment_info["index"]
-                if segment_index >= len(document_segments):
-                    continue
+            scored_lists = []
+            for parsed_query, similar_segments in zip(parsed_queries, candidate_lists):
+                scored_matches = []
                 
-                segment = document_segments[segment_index]
-                base_confidence = segment_info["confidence"]
+                for segment_info in similar_segments:
+                    segment_index = segment_info["index"]
+                    if segment_index not in candidate_segments:
+                        continue
+                    
+                    segment = candidate_segments[segment_index]
+                    base_confidence = segment_info["confidence"]
+                    
+                    # Apply additional scoring factors (computed once per segment)
+                    scoring_factors = await self._get_scoring_factors(
+                        parsed_query, 
+                        segment, 
+                        profiles.get(segment_index)
+                    )
+                    final_score = await self._calculate_comprehensive_score(
+                        base_confidence, 
+                        scoring_factors
+                    )
+                    
+                    scored_matches.append({
+                        "segment": segment,
+                        "base_confidence": base_confidence,
+                        "final_confidence": final_score,
+                        "scoring_factors": scoring_factors
+                    })
                 
-                # Apply additional scoring factors
-                final_score = await self._calculate_comprehensive_score(
-                    parsed_query, 
-                    segment, 
-                    base_confidence
-                )
-                
-                scored_match = {
-                    "segment": segment,
-                    "base_confidence": base_confidence,
-                    "final_confidence": final_score,
-                    "scoring_factors": await self._get_scoring_factors(parsed_query, segment)
-                }
-                
-                scored_matches.append(scored_match)
+                scored_lists.append(scored_matches)
             
-            return scored_matches
+            return scored_lists
             
         except Exception as e:
             logger.error(f"Error evaluating matches: {str(e)}")
-            return []
+            return [[] for _ in parsed_queries]
+    
+    async def _rerank_matches(
+        self, 
+        parsed_queries: List[Dict[str, Any]], 
+        scored_lists: List[List[Dict[str, Any]]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Re-rank candidates in heuristic order within the request's latency budget"""
+        if self.reranker is None:
+            return None
+        
+        try:
+            for scored_matches in scored_lists:
+                scored_matches.sort(key=lambda x: x["final_confidence"], reverse=True)
+            
+            query_texts = [
+                parsed_query.get("context") or self._build_query_text(parsed_query)
+                for parsed_query in parsed_queries
+            ]
+            return await self.reranker.rerank(query_texts, scored_lists)
+            
+        except Exception as e:
+            logger.error(f"Error re-ranking matches: {str(e)}")
+            return None
+    
+    async def _extract_answer_spans(
+        self, 
+        parsed_queries: List[Dict[str, Any]], 
+        scored_lists: List[List[Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """Pick the minimal answering sentence span of every query from its top-ranked segments"""
+        if self.span_extractor is None:
+            return [{} for _ in parsed_queries]
+        
+        query_texts = [
+            parsed_query.get("context") or self._build_query_text(parsed_query)
+            for parsed_query in parsed_queries
+        ]
+        return await self.span_extractor.extract_spans(
+            query_texts, 
+            [scored_matches[:self.span_segments] for scored_matches in scored_lists]
+        )
+    
+    def _build_segment_profiles(
+        self, 
+        parsed_queries: List[Dict[str, Any]], 
+        segments: Dict[int, Dict[str, Any]]
+    ) -> Dict[int, Dict[str, set]]:
+        """Scan each candidate segment once for the lexical factors of all queries"""
+        query_keywords = tuple(sorted({
+            keyword.lower()
+            for parsed_query in parsed_queries
+            for keyword in parsed_query.get("keywords", []) or []
+            if keyword
+        }))
+        automaton = compile_keywords(query_keywords) if query_keywords else None
+        
+        profiles = {}
+        for segment_index, segment in segments.items():
+            segment_text = segment.get("text", "")
+            profiles[segment_index] = {
+                "query_keyword_hits": automaton.find_hits(segment_text) if automaton else set(),
+                "words": set(segment_text.lower().split())
+            }
+        return profiles
     
     async def _calculate_comprehensive_score(
         self, 
-        parsed_query: Dict[str, Any], 
-        segment: Dict[str, Any], 
-        base_confidence: float
+        base_confidence: float, 
+        scoring_factors: Dict[str, float]
     ) -> float:
         """Calculate comprehensive confidence score"""
         try:
             score = base_confidence
             
             # Factor 1: Intent matching
-            intent_match = await self._evaluate_intent_match(parsed_query, segment)
-            score *= (0.7 + 0.3 * intent_match)
+            score *= (0.7 + 0.3 * scoring_factors.get("intent_match", 0.5))
             
             # Factor 2: Keyword density
-            keyword_density = await self._calculate_keyword_density(parsed_query, segment)
-            score *= (0.8 + 0.2 * keyword_density)
+            score *= (0.8 + 0.2 * scoring_factors.get("keyword_density", 0.5))
             
             # Factor 3: Clause type matching
-            clause_type_match = await self._evaluate_clause_type_match(parsed_query, segment)
-            score *= (0.6 + 0.4 * clause_type_match)
+            score *= (0.6 + 0.4 * scoring_factors.get("clause_type_match", 0.5))
             
             # Factor 4: Text relevance
-            text_relevance = await self._evaluate_text_relevance(parsed_query, segment)
-            score *= (0.9 + 0.1 * text_relevance)
+            score *= (0.9 + 0.1 * scoring_factors.get("text_relevance", 0.5))
             
             return min(1.0, max(0.0, score))
             
@@ -179,24 +358,12 @@ class ClauseMatcher:
     async def _evaluate_intent_match(self, parsed_query: Dict[str, Any], segment: Dict[str, Any]) -> float:
         """Evaluate how well the segment matches the query intent"""
         try:
-            intent = parsed_query.get("intent", "").lower()
-            segment_text = segment.get("text", "").lower()
-            
-            intent_keywords = {
-                "find_termination_clause": ["termination", "terminate", "end", "cancel"],
-                "find_payment_terms": ["payment", "pay", "fee", "cost", "price"],
-                "find_liability_limits": ["liability", "limit", "damage", "claim"],
-                "find_confidentiality_clause": ["confidential", "secret", "private", "non-disclosure"],
-                "find_non_compete_clause": ["non-compete", "competition", "restrict"],
-                "find_ip_clause": ["intellectual property", "patent", "copyright", "trademark"],
-                "find_governing_law": ["governing law", "jurisdiction", "legal"],
-                "find_dispute_resolution": ["dispute", "arbitration", "mediation", "conflict"],
-                "find_force_majeure": ["force majeure", "act of god", "unforeseen"]
-            }
+            intent = (parsed_query.get("intent") or "").lower()
             
-            if intent in intent_keywords:
-                keywords = intent_keywords[intent]
-                matches = sum(1 for keyword in keywords if keyword in segment_text)
+            if intent in INTENT_KEYWORDS:
+                keywords = INTENT_KEYWORDS[intent]
+                keyword_hits = self._get_segment_keyword_hits(segment)
+                matches = sum(1 for keyword in keywords if keyword in keyword_hits)
                 return min(1.0, matches / len(keywords))
             
             return 0.5  # Default score
@@ -205,22 +372,40 @@ class ClauseMatcher:
             logger.error(f"Error evaluating intent match: {str(e)}")
             return 0.5
     
-    async def _calculate_keyword_density(self, parsed_query: Dict[str, Any], segment: Dict[str, Any]) -> float:
+    async def _calculate_keyword_density(
+        self, 
+        parsed_query: Dict[str, Any], 
+        segment: Dict[str, Any], 
+        profile: Dict[str, set] = None
+    ) -> float:
         """Calculate keyword density in segment"""
         try:
             keywords = parsed_query.get("keywords", [])
-            segment_text = segment.get("text", "").lower()
             
             if not keywords:
                 return 0.5
             
-            keyword_matches = sum(1 for keyword in keywords if keyword.lower() in segment_text)
+            if profile is not None:
+                keyword_hits = profile["query_keyword_hits"]
+            else:
+                # One automaton per query, reused across every candidate segment
+                automaton = compile_keywords(tuple(keyword.lower() for keyword in keywords))
+                keyword_hits = automaton.find_hits(segment.get("text", ""))
+            keyword_matches = sum(1 for keyword in keywords if keyword.lower() in keyword_hits)
             return min(1.0, keyword_matches / len(keywords))
             
         except Exception as e:
             logger.error(f"Error calculating keyword density: {str(e)}")
             return 0.5
     
+    def _get_segment_keyword_hits(self, segment: Dict[str, Any]) -> set:
+        """Return the segment's shared keyword hits, computing them if segmentation did not"""
+        keyword_hits = segment.get("keyword_hits")
+        if keyword_hits is None:
+            keyword_hits = KEYWORD_AUTOMATON.find_hits(segment.get("text", ""))
+            segment["keyword_hits"] = sorted(keyword_hits)
+        return set(keyword_hits)
+    
     async def _evaluate_clause_type_match(self, parsed_query: Dict[str, Any], segment: Dict[str, Any]) -> float:
         """Evaluate clause type matching"""
         try:
@@ -237,15 +422,22 @@ class ClauseMatcher:
             logger.error(f"Error evaluating clause type match: {str(e)}")
             return 0.5
     
-    async def _evaluate_text_relevance(self, parsed_query: Dict[str, Any], segment: Dict[str, Any]) -> float:
+    async def _evaluate_text_relevance(
+        self, 
+        parsed_query: Dict[str, Any], 
+        segment: Dict[str, Any], 
+        profile: Dict[str, set] = None
+    ) -> float:
         """Evaluate general text relevance"""
         try:
-            query_text = parsed_query.get("context", "").lower()
-            segment_text = segment.get("text", "").lower()
+            query_text = (parsed_query.get("context") or "").lower()
             
             # Simple word overlap calculation
             query_words = set(query_text.split())
-            segment_words = set(segment_text.split())
+            if profile is not None:
+                segment_words = profile["words"]
+            else:
+                segment_words = set(segment.get("text", "").lower().split())
             
             if not query_words:
                 return 0.5
@@ -257,14 +449,19 @@ class ClauseMatcher:
             logger.error(f"Error evaluating text relevance: {str(e)}")
             return 0.5
     
-    async def _get_scoring_factors(self, parsed_query: Dict[str, Any], segment: Dict[str, Any]) -> Dict[str, float]:
+    async def _get_scoring_factors(
+        self, 
+        parsed_query: Dict[str, Any], 
+        segment: Dict[str, Any], 
+        profile: Dict[str, set] = None
+    ) -> Dict[str, float]:
         """Get detailed scoring factors for transparency"""
         try:
             return {
                 "intent_match": await self._evaluate_intent_match(parsed_query, segment),
-                "keyword_density": await self._calculate_keyword_density(parsed_query, segment),
+                "keyword_density": await self._calculate_keyword_density(parsed_query, segment, profile),
                 "clause_type_match": await self._evaluate_clause_type_match(parsed_query, segment),
-                "text_relevance": await self._evaluate_text_relevance(parsed_query, segment)
+                "text_relevance": await self._evaluate_text_relevance(parsed_query, segment, profile)
             }
         except Exception as e:
             logger.error(f"Error getting scoring factors: {str(e)}")
@@ -276,8 +473,15 @@ class ClauseMatcher:
             if not scored_matches:
                 return self._get_fallback_match()
             
-            # Sort by final confidence
-            scored_matches.sort(key=lambda x: x["final_confidence"], reverse=True)
+            # Re-ranked candidates first by cross-encoder score, the rest keep heuristic order
+            scored_matches.sort(
+                key=lambda x: (
+                    x.get("rerank_score") is not None, 
+                    x.get("rerank_score") or 0.0, 
+                    x["final_confidence"]
+                ), 
+                reverse=True
+            )
             best_match = scored_matches[0]
             
             # Check if confidence meets threshold
@@ -291,7 +495,12 @@ class ClauseMatcher:
             logger.error(f"Error selecting best match: {str(e)}")
             return self._get_fallback_match()
     
-    async def _format_match_result(self, best_match: Dict[str, Any], parsed_query: Dict[str, Any]) -> Dict[str, Any]:
+    async def _format_match_result(
+        self, 
+        best_match: Dict[str, Any], 
+        parsed_query: Dict[str, Any], 
+        span: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
         """Format the final match result"""
         try:
             segment = best_match["segment"]
@@ -308,7 +517,7 @@ class ClauseMatcher:
             
             location = ", ".join(location_parts) if location_parts else "Document"
             
-            return {
+            result = {
                 "text": segment.get("text", ""),
                 "location": location,
                 "confidence": best_match["final_confidence"],
@@ -316,6 +525,18 @@ class ClauseMatcher:
                 "segment_id": segment.get("segment_id", 0)
             }
             
+            # Return only the answering span instead of the whole segment
+            if span:
+                result["text"] = span["text"]
+                result["span"] = {
+                    "start": span["start"],
+                    "end": span["end"],
+                    "sentence_count": span["sentence_count"],
+                    "score": span["score"]
+                }
+            
+            return result
+            
         except Exception as e:
             logger.error(f"Error formatting match result: {str(e)}")
             return self._get_fallback_match()
@@ -331,5 +552,6 @@ class ClauseMatcher:
         }
     
     def get_processing_time(self) -> float:
-        """Get the processing time in milliseconds"""
-        return self.processing_time 
\ No newline at end of file
+        """Get the current request's matching time in milliseconds"""
+        trace = current_trace()
+        return trace.stage_time_ms("match") if trace else 0.0 
\ No newline at end of file
@@ -1,14 +1,20 @@
 import os
 import asyncio
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
 import logging
-from datetime import datetime, timedelta
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
 import json
-from sqlalchemy import create_engine, Column, Integer, String, Text, Float, DateTime, JSON
+import numpy as np
+from sqlalchemy import insert, select, delete, func, case, Index, ForeignKey, Column, Integer, String, Text, Float, DateTime, JSON, LargeBinary
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
+from config import Config
+
 logger = logging.getLogger(__name__)
 
 Base = declarative_base()
@@ -25,6 +31,99 @@ class DocumentInteraction(Base):
     processing_time_ms = Column(Float, default=0.0)
     created_at = Column(DateTime, default=datetime.utcnow)
     metadata = Column(JSON, nullable=True)
+    
+    __table_args__ = (
+        # Recent queries and retention scans
+        Index("ix_document_interactions_created_at", "created_at"),
+        # Per-document lookups, newest first
+        Index("ix_document_interactions_document_url_created_at", "document_url", "created_at"),
+    )
+
+class RationaleCacheEntry(Base):
+    """Database model for cached decision rationales"""
+    __tablename__ = "rationale_cache"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), nullable=False, unique=True, index=True)
+    document_url = Column(String(500), nullable=False, index=True)
+    document_hash = Column(String(64), nullable=False)
+    model = Column(String(100), nullable=False)
+    rationale = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class InteractionRollup(Base):
+    """
+    Incrementally maintained interaction counters. period is "minute" or "hour" (across all
+    documents) or "total" (per document and across all documents, bucket ROLLUP_EPOCH).
+    An empty document_url means all documents.
+    """
+    __tablename__ = "interaction_rollups"
+    
+    period = Column(String(10), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    document_url = Column(String(500), primary_key=True)
+    query_count = Column(Integer, nullable=False, default=0)
+    confidence_count = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+    processing_time_ms_sum = Column(Float, nullable=False, default=0.0)
+
+class HeavyHitterCheckpoint(Base):
+    """Checkpointed heavy-hitters sketch for all documents ("*") or one document, one row per writing process"""
+    __tablename__ = "heavy_hitter_checkpoints"
+    
+    scope = Column(String(500), primary_key=True)
+    writer_id = Column(String(32), primary_key=True)
+    state = Column(JSON, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class LatencyRollup(Base):
+    """Latency sketch of one endpoint or stage for a minute or hour bucket, one row per writing process"""
+    __tablename__ = "latency_rollups"
+    
+    period = Column(String(10), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    metric = Column(String(200), primary_key=True)
+    writer_id = Column(String(32), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    sketch = Column(JSON, nullable=False)
+
+class Document(Base):
+    """Database model for a processed document and its extraction metadata"""
+    __tablename__ = "documents"
+    
+    id = Column(Integer, primary_key=True)
+    document_url = Column(String(500), nullable=False, unique=True, index=True)
+    content_hash = Column(String(64), nullable=False)
+    content = Column(Text, nullable=False)
+    content_length = Column(Integer, nullable=False)
+    segment_count = Column(Integer, nullable=False)
+    embedding_dimension = Column(Integer, nullable=False)
+    extracted_at = Column(DateTime, default=datetime.utcnow)
+
+class DocumentSegment(Base):
+    """Database model for one segment of a processed document"""
+    __tablename__ = "document_segments"
+    
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    segment_index = Column(Integer, primary_key=True)
+    start_position = Column(Integer, nullable=False)
+    end_position = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+    clause_info = Column(JSON, nullable=True)
+    keyword_hits = Column(JSON, nullable=True)
+
+class SegmentVector(Base):
+    """Embedding of one segment as a float32 blob (4 bytes per dimension)"""
+    __tablename__ = "segment_vectors"
+    
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    segment_index = Column(Integer, primary_key=True)
+    vector = Column(LargeBinary, nullable=False)
+
+ROLLUP_EPOCH = datetime(1970, 1, 1)
+ALL_DOCUMENTS = ""
+ROLLUP_UPSERT_CHUNK = 1000
+ROLLUP_COUNTERS = ("query_count", "confidence_count", "confidence_sum", "processing_time_ms_sum")
 
 class DatabaseService:
     """Handles database operations for the query retrieval system"""
@@ -38,34 +137,92 @@ class DatabaseService:
         )
     
     async def initialize(self):
-        """Initialize database connection and create tables"""
+        """Initialize database connection pool and create tables"""
         try:
-            # Create engine
-            self.engine = create_engine(
-                self.database_url,
-                poolclass=StaticPool,
-                echo=False
-            )
+            # Create async engine with a sized connection pool
+            self.engine = self._create_engine(self.database_url)
             
             # Create session factory
-            self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+            self.SessionLocal = async_sessionmaker(self.engine, expire_on_commit=False, autoflush=False)
             
             # Create tables
-            Base.metadata.create_all(bind=self.engine)
+            async with self.engine.begin() as connection:
+                await connection.run_sync(Base.metadata.create_all)
+                await connection.run_sync(self._ensure_indexes)
             
-            logger.info("Database initialized successfully")
+            await self._backfill_rollups()
+            
+            logger.info(f"Database initialized successfully ({self.engine.url.drivername})")
             
         except Exception as e:
             logger.warning(f"Database initialization failed, using in-memory storage: {e}")
+            if self.engine is not None:
+                await self.engine.dispose()
             # Fallback to in-memory storage
-            self.engine = create_engine(
-                "sqlite:///:memory:",
-                poolclass=StaticPool,
+            self.engine = self._create_engine("sqlite:///:memory:")
+            self.SessionLocal = async_sessionmaker(self.engine, expire_on_commit=False, autoflush=False)
+            async with self.engine.begin() as connection:
+                await connection.run_sync(Base.metadata.create_all)
+            logger.info("Using in-memory SQLite database")
+    
+    async def connect(self):
+        """
+        Connect to an existing database for offline tools. Unlike initialize, no tables are
+        created, no rollups are backfilled and there is no in-memory fallback: an unreachable
+        database or a missing interaction table raises.
+        """
+        self.engine = self._create_engine(self.database_url)
+        self.SessionLocal = async_sessionmaker(self.engine, expire_on_commit=False, autoflush=False)
+        try:
+            async with self.SessionLocal() as db:
+                await db.execute(select(DocumentInteraction.id).limit(1))
+        except Exception:
+            await self.engine.dispose()
+            raise
+        logger.info(f"Connected to database ({self.engine.url.drivername})")
+    
+    def _create_engine(self, database_url: str):
+        """Create an async engine for the URL with pooling, pre-ping and statement timeouts"""
+        url = make_url(self._to_async_url(database_url))
+        
+        if url.get_backend_name() == "sqlite":
+            if url.database in (None, "", ":memory:"):
+                # One shared connection, otherwise every connection gets its own empty database
+                return create_async_engine(url, poolclass=StaticPool, echo=False)
+            return create_async_engine(
+                url,
+                pool_size=Config.DB_POOL_SIZE,
+                max_overflow=Config.DB_MAX_OVERFLOW,
+                pool_timeout=Config.DB_POOL_TIMEOUT,
+                pool_pre_ping=True,
+                # Busy timeout while another connection holds the write lock
+                connect_args={"timeout": Config.DB_STATEMENT_TIMEOUT_MS / 1000.0},
                 echo=False
             )
-            self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
-            Base.metadata.create_all(bind=self.engine)
-            logger.info("Using in-memory SQLite database")
+        
+        return create_async_engine(
+            url,
+            pool_size=Config.DB_POOL_SIZE,
+            max_overflow=Config.DB_MAX_OVERFLOW,
+            pool_timeout=Config.DB_POOL_TIMEOUT,
+            pool_recycle=Config.DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+            connect_args={
+                "server_settings": {"statement_timeout": str(int(Config.DB_STATEMENT_TIMEOUT_MS))},
+                "command_timeout": Config.DB_STATEMENT_TIMEOUT_MS / 1000.0
+            },
+            echo=False
+        )
+    
+    def _to_async_url(self, database_url: str) -> str:
+        """Map a plain database URL onto its async driver"""
+        if database_url.startswith("postgres://"):
+            database_url = "postgresql://" + database_url[len("postgres://"):]
+        if database_url.startswith("postgresql://") or database_url.startswith("postgresql+psycopg2://"):
+            return "postgresql+asyncpg://" + database_url.split("://", 1)[1]
+        if database_url.startswith("sqlite://"):
+            return "sqlite+aiosqlite://" + database_url[len("sqlite://"):]
+        return database_url
     
     async def log_interaction(
         self, 
@@ -78,56 +235,78 @@ class DatabaseService:
     ):
         """Log a document interaction"""
         try:
-            db = self.SessionLocal()
-            
-            interaction = DocumentInteraction(
-                document_url=document_url,
-                user_query=user_query,
-                matched_clause=matched_clause,
-                confidence=confidence,
-                processing_time_ms=processing_time_ms,
-                metadata=metadata or {}
-            )
-            
-            db.add(interaction)
-            db.commit()
-            db.close()
+            async with self.SessionLocal() as db:
+                interaction = DocumentInteraction(
+                    document_url=document_url,
+                    user_query=user_query,
+                    matched_clause=matched_clause,
+                    confidence=confidence,
+                    processing_time_ms=processing_time_ms,
+                    created_at=datetime.utcnow(),
+                    metadata=metadata or {}
+                )
+                
+                db.add(interaction)
+                await self._apply_rollups(db, self._rollup_deltas([{
+                    "document_url": document_url,
+                    "confidence": confidence,
+                    "processing_time_ms": processing_time_ms,
+                    "created_at": interaction.created_at
+                }]))
+                await db.commit()
             
             logger.info(f"Interaction logged for document: {document_url}")
             
         except Exception as e:
             logger.error(f"Error logging interaction: {str(e)}")
-            if db:
-                db.rollback()
-                db.close()
     
-    async def get_statistics(self) -> Dict[str, Any]:
-        """Get system statistics"""
+    async def log_interactions(self, rows: List[Dict[str, Any]]) -> bool:
+        """Bulk insert interaction rows and their rollups in one transaction; returns whether the write succeeded"""
         try:
-            db = self.SessionLocal()
-            
-            # Total queries
-            total_queries = db.query(DocumentInteraction).count()
-            
-            # Average confidence
-            avg_confidence = db.query(DocumentInteraction.confidence).filter(
-                DocumentInteraction.confidence > 0
-            ).all()
-            avg_confidence = sum([c[0] for c in avg_confidence]) / len(avg_confidence) if avg_confidence else 0.0
+            now = datetime.utcnow()
+            rows = [row if row.get("created_at") else {**row, "created_at": now} for row in rows]
+            async with self.SessionLocal() as db:
+                await db.execute(insert(DocumentInteraction.__table__), rows)
+                await self._apply_rollups(db, self._rollup_deltas(rows))
+                await db.commit()
             
-            # Most common queries (simplified)
-            recent_queries = db.query(DocumentInteraction.user_query).order_by(
-                DocumentInteraction.created_at.desc()
-            ).limit(10).all()
+            logger.debug(f"Logged {len(rows)} interactions")
+            return True
             
-            most_common_queries = [q[0] for q in recent_queries]
-            
-            db.close()
+        except Exception as e:
+            logger.error(f"Error bulk logging interactions: {str(e)}")
+            return False
+    
+    async def get_statistics(self) -> Dict[str, Any]:
+        """Get system statistics from the rollup table, independent of history size"""
+        try:
+            async with self.SessionLocal() as db:
+                totals = await self._get_rollup(db, "total", ROLLUP_EPOCH, ALL_DOCUMENTS)
+                
+                # At most 60 minute buckets
+                last_hour = await db.scalar(
+                    select(func.coalesce(func.sum(InteractionRollup.query_count), 0)).where(
+                        InteractionRollup.period == "minute",
+                        InteractionRollup.bucket_start >= self._bucket_start("minute", datetime.utcnow() - timedelta(minutes=59)),
+                        InteractionRollup.document_url == ALL_DOCUMENTS
+                    )
+                )
+                
+                # Most common queries come from the heavy-hitters sketch; this is the latest few
+                recent_queries = (await db.execute(
+                    select(DocumentInteraction.user_query)
+                    .order_by(DocumentInteraction.created_at.desc())
+                    .limit(10)
+                )).all()
+                
+                recent_queries = [q[0] for q in recent_queries]
             
             return {
-                "total_queries": total_queries,
-                "average_confidence": round(avg_confidence, 3),
-                "most_common_queries": most_common_queries
+                "total_queries": totals["query_count"],
+                "average_confidence": round(self._average_confidence(totals), 3),
+                "average_processing_time_ms": round(self._average_processing_time(totals), 3),
+                "queries_last_hour": last_hour,
+                "recent_queries": recent_queries
             }
             
         except Exception as e:
@@ -135,65 +314,126 @@ class DatabaseService:
             return {
                 "total_queries": 0,
                 "average_confidence": 0.0,
-                "most_common_queries": []
+                "average_processing_time_ms": 0.0,
+                "queries_last_hour": 0,
+                "recent_queries": []
             }
     
     async def get_recent_interactions(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recent document interactions"""
         try:
-            db = self.SessionLocal()
+            async with self.SessionLocal() as db:
+                interactions = (await db.execute(
+                    select(DocumentInteraction)
+                    .order_by(DocumentInteraction.created_at.desc())
+                    .limit(limit)
+                )).scalars().all()
+                
+                result = []
+                for interaction in interactions:
+                    result.append({
+                        "id": interaction.id,
+                        "document_url": interaction.document_url,
+                        "user_query": interaction.user_query,
+                        "confidence": interaction.confidence,
+                        "created_at": interaction.created_at.isoformat(),
+                        "processing_time_ms": interaction.processing_time_ms,
+                        "metadata": interaction.metadata
+                    })
             
-            interactions = db.query(DocumentInteraction).order_by(
-                DocumentInteraction.created_at.desc()
-            ).limit(limit).all()
-            
-            result = []
-            for interaction in interactions:
-                result.append({
-                    "id": interaction.id,
-                    "document_url": interaction.document_url,
-                    "user_query": interaction.user_query,
-                    "confidence": interaction.confidence,
-                    "created_at": interaction.created_at.isoformat(),
-                    "processing_time_ms": interaction.processing_time_ms
-                })
-            
-            db.close()
             return result
             
         except Exception as e:
             logger.error(f"Error getting recent interactions: {str(e)}")
             return []
     
-    async def get_document_stats(self, document_url: str) -> Dict[str, Any]:
-        """Get statistics for a specific document"""
+    async def get_llm_parse_labels(self, limit: int = Config.LOCAL_PARSE_CALIBRATION_SAMPLES) -> List[Tuple[str, str]]:
+        """(query, intent) of the most recent interactions whose parse came from the LLM, one per distinct query"""
         try:
-            db = self.SessionLocal()
+            async with self.SessionLocal() as db:
+                rows = (await db.execute(
+                    select(DocumentInteraction.user_query, DocumentInteraction.__table__.c.metadata)
+                    .order_by(DocumentInteraction.created_at.desc())
+                    .limit(limit)
+                )).all()
             
-            # Count interactions for this document
-            total_interactions = db.query(DocumentInteraction).filter(
-                DocumentInteraction.document_url == document_url
-            ).count()
+            labels = {}
+            for user_query, metadata in rows:
+                metadata = metadata or {}
+                if metadata.get("parse_source") == "llm" and metadata.get("intent") and user_query not in labels:
+                    labels[user_query] = metadata["intent"]
+            return list(labels.items())
             
-            # Average confidence for this document
-            confidences = db.query(DocumentInteraction.confidence).filter(
-                DocumentInteraction.document_url == document_url,
-                DocumentInteraction.confidence > 0
-            ).all()
-            
-            avg_confidence = sum([c[0] for c in confidences]) / len(confidences) if confidences else 0.0
-            
-            # Most common queries for this document
-            common_queries = db.query(DocumentInteraction.user_query).filter(
-                DocumentInteraction.document_url == document_url
-            ).limit(5).all()
+        except Exception as e:
+            logger.error(f"Error getting LLM parse labels: {str(e)}")
+            return []
+    
+    async def iter_interactions(
+        self, 
+        batch_size: int = Config.EXPORT_BATCH_SIZE, 
+        since: datetime = None, 
+        until: datetime = None, 
+        document_url: str = None
+    ) -> AsyncIterator[List[Tuple]]:
+        """
+        Page through interactions in id order with keyset pagination (id > last seen id), one
+        short query per page, so memory stays flat and late pages cost the same as early ones.
+        Yields rows as (id, document_url, user_query, matched_clause, confidence,
+        processing_time_ms, created_at, metadata) tuples.
+        """
+        conditions = []
+        if since is not None:
+            conditions.append(DocumentInteraction.created_at >= since)
+        if until is not None:
+            conditions.append(DocumentInteraction.created_at < until)
+        if document_url is not None:
+            conditions.append(DocumentInteraction.document_url == document_url)
+        
+        last_id = 0
+        while True:
+            async with self.SessionLocal() as db:
+                rows = (await db.execute(
+                    select(
+                        DocumentInteraction.id,
+                        DocumentInteraction.document_url,
+                        DocumentInteraction.user_query,
+                        DocumentInteraction.matched_clause,
+                        DocumentInteraction.confidence,
+                        DocumentInteraction.processing_time_ms,
+                        DocumentInteraction.created_at,
+                        DocumentInteraction.__table__.c.metadata
+                    )
+                    .where(DocumentInteraction.id > last_id, *conditions)
+                    .order_by(DocumentInteraction.id)
+                    .limit(batch_size)
+                )).all()
             
-            db.close()
+            if not rows:
+                return
+            yield rows
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+    
+    async def get_document_stats(self, document_url: str) -> Dict[str, Any]:
+        """Get statistics for a specific document"""
+        try:
+            async with self.SessionLocal() as db:
+                totals = await self._get_rollup(db, "total", ROLLUP_EPOCH, document_url)
+                
+                # Latest queries for this document
+                common_queries = (await db.execute(
+                    select(DocumentInteraction.user_query)
+                    .where(DocumentInteraction.document_url == document_url)
+                    .order_by(DocumentInteraction.created_at.desc())
+                    .limit(5)
+                )).all()
             
             return {
                 "document_url": document_url,
-                "total_interactions": total_interactions,
-                "average_confidence": round(avg_confidence, 3),
+                "total_interactions": totals["query_count"],
+                "average_confidence": round(self._average_confidence(totals), 3),
+                "average_processing_time_ms": round(self._average_processing_time(totals), 3),
                 "common_queries": [q[0] for q in common_queries]
             }
             
@@ -203,36 +443,518 @@ class DatabaseService:
                 "document_url": document_url,
                 "total_interactions": 0,
                 "average_confidence": 0.0,
+                "average_processing_time_ms": 0.0,
                 "common_queries": []
             }
     
-    async def cleanup_old_interactions(self, days_old: int = 30):
-        """Clean up old interactions"""
+    async def cleanup_old_interactions(
+        self, 
+        days_old: int = 30, 
+        batch_size: int = Config.RETENTION_BATCH_SIZE, 
+        pause_ms: float = Config.RETENTION_PAUSE_MS
+    ) -> int:
+        """
+        Clean up old interactions in batches of batch_size, one short transaction each with a
+        pause in between so concurrent writes are never locked out for long. Deleted rows are
+        removed from the rollup totals and old time buckets are pruned. Returns the rows deleted.
+        
+        The rollup subtraction is computed from the rows the DELETE itself returned, so when
+        several workers purge at once each row is subtracted only by the worker that removed it.
+        """
+        cutoff_date = datetime.utcnow() - timedelta(days=days_old)
+        deleted_count = 0
+        
         try:
-            db = self.SessionLocal()
+            while True:
+                async with self.SessionLocal() as db:
+                    expired = (
+                        select(DocumentInteraction.id)
+                        .where(DocumentInteraction.created_at < cutoff_date)
+                        .order_by(DocumentInteraction.created_at)
+                        .limit(batch_size)
+                    )
+                    removed = (await db.execute(
+                        delete(DocumentInteraction)
+                        .where(DocumentInteraction.id.in_(expired.scalar_subquery()))
+                        .returning(
+                            DocumentInteraction.document_url,
+                            DocumentInteraction.confidence,
+                            DocumentInteraction.processing_time_ms
+                        )
+                        .execution_options(synchronize_session=False)
+                    )).all()
+                    if not removed:
+                        break
+                    
+                    deltas = defaultdict(self._empty_counters)
+                    for document_url, confidence, processing_time_ms in removed:
+                        confidence = confidence or 0.0
+                        counters = [-1, -int(confidence > 0), -confidence if confidence > 0 else 0.0, -(processing_time_ms or 0.0)]
+                        for url in (document_url, ALL_DOCUMENTS):
+                            self._add_counters(deltas[("total", ROLLUP_EPOCH, url)], counters)
+                    await self._apply_rollups(db, deltas)
+                    await db.commit()
+                
+                deleted_count += len(removed)
+                if len(removed) < batch_size:
+                    break
+                await asyncio.sleep(pause_ms / 1000.0)
             
-            cutoff_date = datetime.utcnow() - timedelta(days=days_old)
+            async with self.SessionLocal() as db:
+                await db.execute(
+                    delete(InteractionRollup).where(
+                        InteractionRollup.period != "total",
+                        InteractionRollup.bucket_start < self._bucket_start("hour", cutoff_date)
+                    )
+                )
+                await db.execute(
+                    delete(LatencyRollup).where(LatencyRollup.bucket_start < self._bucket_start("hour", cutoff_date))
+                )
+                await db.commit()
             
-            deleted_count = db.query(DocumentInteraction).filter(
-                DocumentInteraction.created_at < cutoff_date
-            ).delete()
+            logger.info(f"Cleaned up {deleted_count} old interactions")
             
-            db.commit()
-            db.close()
+        except Exception as e:
+            logger.error(f"Error cleaning up old interactions after {deleted_count} rows: {str(e)}")
+        
+        return deleted_count
+    
+    async def rebuild_rollups(self):
+        """Recompute the rollup table from the interaction log with SQL aggregates"""
+        async with self.SessionLocal() as db:
+            await db.execute(delete(InteractionRollup))
             
-            logger.info(f"Cleaned up {deleted_count} old interactions")
+            deltas = defaultdict(self._empty_counters)
+            for period in ("minute", "hour"):
+                bucket = self._truncate(period, DocumentInteraction.created_at)
+                rows = (await db.execute(
+                    select(bucket, *self._counter_columns()).group_by(bucket)
+                )).all()
+                for bucket_value, *counters in rows:
+                    self._add_counters(deltas[(period, self._as_datetime(bucket_value), ALL_DOCUMENTS)], counters)
+            
+            for document_url, counters in (await self._aggregate_interactions(db)).items():
+                for url in (document_url, ALL_DOCUMENTS):
+                    self._add_counters(deltas[("total", ROLLUP_EPOCH, url)], [counters[name] for name in ROLLUP_COUNTERS])
+            
+            await self._apply_rollups(db, deltas)
+            await db.commit()
+        
+        logger.info(f"Rebuilt {len(deltas)} interaction rollups")
+    
+    async def get_cached_rationale(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Look up a persisted rationale by cache key"""
+        try:
+            async with self.SessionLocal() as db:
+                entry = (await db.execute(
+                    select(RationaleCacheEntry).where(RationaleCacheEntry.cache_key == cache_key)
+                )).scalars().first()
+                
+                if entry is None:
+                    return None
+                return {
+                    "rationale": entry.rationale,
+                    "document_url": entry.document_url,
+                    "document_hash": entry.document_hash
+                }
             
         except Exception as e:
-            logger.error(f"Error cleaning up old interactions: {str(e)}")
-            if db:
-                db.rollback()
-                db.close()
+            logger.error(f"Error reading rationale cache: {str(e)}")
+            return None
+    
+    async def store_rationale(
+        self, 
+        cache_key: str, 
+        document_url: str, 
+        document_hash: str, 
+        model: str, 
+        rationale: str
+    ):
+        """Persist a generated rationale, replacing any previous entry for the key"""
+        try:
+            async with self.SessionLocal() as db:
+                await db.execute(
+                    delete(RationaleCacheEntry).where(RationaleCacheEntry.cache_key == cache_key)
+                )
+                db.add(RationaleCacheEntry(
+                    cache_key=cache_key,
+                    document_url=document_url,
+                    document_hash=document_hash,
+                    model=model,
+                    rationale=rationale
+                ))
+                await db.commit()
+            
+        except Exception as e:
+            logger.error(f"Error storing rationale: {str(e)}")
+    
+    async def invalidate_rationales(self, document_url: str, current_hash: str) -> int:
+        """Delete cached rationales generated from an older version of a document"""
+        try:
+            async with self.SessionLocal() as db:
+                result = await db.execute(
+                    delete(RationaleCacheEntry).where(
+                        RationaleCacheEntry.document_url == document_url,
+                        RationaleCacheEntry.document_hash != current_hash
+                    )
+                )
+                await db.commit()
+            
+            deleted_count = result.rowcount
+            if deleted_count:
+                logger.info(f"Invalidated {deleted_count} cached rationales for document: {document_url}")
+            return deleted_count
+            
+        except Exception as e:
+            logger.error(f"Error invalidating rationales: {str(e)}")
+            return 0
+    
+    async def save_document(
+        self, 
+        document_url: str, 
+        content: str, 
+        content_hash: str, 
+        segments: List[Dict[str, Any]], 
+        embeddings: np.ndarray
+    ) -> bool:
+        """Persist a processed document with its segments and vectors, replacing any previous version"""
+        try:
+            embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+            async with self.SessionLocal() as db:
+                # Children first: SQLite does not enforce ON DELETE CASCADE without a pragma
+                previous_id = select(Document.id).where(Document.document_url == document_url).scalar_subquery()
+                await db.execute(delete(SegmentVector).where(SegmentVector.document_id == previous_id))
+                await db.execute(delete(DocumentSegment).where(DocumentSegment.document_id == previous_id))
+                await db.execute(delete(Document).where(Document.document_url == document_url))
+                
+                document = Document(
+                    document_url=document_url,
+                    content_hash=content_hash,
+                    content=content,
+                    content_length=len(content),
+                    segment_count=len(segments),
+                    embedding_dimension=embeddings.shape[1]
+                )
+                db.add(document)
+                await db.flush()
+                
+                await db.execute(insert(DocumentSegment.__table__), [
+                    {
+                        "document_id": document.id,
+                        "segment_index": index,
+                        "start_position": segment["start_position"],
+                        "end_position": segment["end_position"],
+                        "text": segment["text"],
+                        "clause_info": segment.get("clause_info"),
+                        "keyword_hits": segment.get("keyword_hits")
+                    }
+                    for index, segment in enumerate(segments)
+                ])
+                await db.execute(insert(SegmentVector.__table__), [
+                    {"document_id": document.id, "segment_index": index, "vector": embeddings[index].tobytes()}
+                    for index in range(len(segments))
+                ])
+                await db.commit()
+            
+            logger.info(f"Stored document with {len(segments)} segments: {document_url}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error storing document {document_url}: {str(e)}")
+            return False
+    
+    async def load_document(self, document_url: str) -> Optional[Dict[str, Any]]:
+        """
+        Load a stored document with its segments and embedding matrix in a single query.
+        Returns None if the document has not been stored.
+        """
+        try:
+            async with self.SessionLocal() as db:
+                rows = (await db.execute(
+                    select(
+                        # The document text only on the first row rather than repeated on every segment
+                        case((DocumentSegment.segment_index == 0, Document.content)),
+                        Document.content_hash,
+                        Document.embedding_dimension,
+                        Document.extracted_at,
+                        DocumentSegment.segment_index,
+                        DocumentSegment.start_position,
+                        DocumentSegment.end_position,
+                        DocumentSegment.text,
+                        DocumentSegment.clause_info,
+                        DocumentSegment.keyword_hits,
+                        SegmentVector.vector
+                    )
+                    .join(DocumentSegment, DocumentSegment.document_id == Document.id)
+                    .join(SegmentVector, (SegmentVector.document_id == DocumentSegment.document_id) & (SegmentVector.segment_index == DocumentSegment.segment_index))
+                    .where(Document.document_url == document_url)
+                    .order_by(DocumentSegment.segment_index)
+                )).all()
+            
+            if not rows:
+                return None
+            
+            content, document_hash, dimension, extracted_at = rows[0][:4]
+            segments = [
+                {
+                    "text": row.text,
+                    "start_position": row.start_position,
+                    "end_position": row.end_position,
+                    "clause_info": row.clause_info,
+                    "keyword_hits": row.keyword_hits,
+                    "segment_id": row.segment_index
+                }
+                for row in rows
+            ]
+            embeddings = np.frombuffer(b"".join(row.vector for row in rows), dtype=np.float32).reshape(len(rows), dimension)
+            
+            return {
+                "document_url": document_url,
+                "content": content,
+                "content_hash": document_hash,
+                "segments": segments,
+                "embeddings": embeddings,
+                "stored_at": extracted_at.replace(tzinfo=timezone.utc).timestamp()
+            }
+            
+        except Exception as e:
+            logger.error(f"Error loading stored document {document_url}: {str(e)}")
+            return None
+    
+    async def save_heavy_hitters(self, writer_id: str, states: Dict[str, Dict[str, Any]]) -> bool:
+        """Upsert this writer's heavy-hitters sketches by scope; returns whether the write succeeded"""
+        if not states:
+            return True
+        try:
+            now = datetime.utcnow()
+            statement = self._dialect_insert(HeavyHitterCheckpoint).values([
+                {"scope": scope, "writer_id": writer_id, "state": state, "updated_at": now}
+                for scope, state in sorted(states.items())
+            ])
+            statement = statement.on_conflict_do_update(
+                index_elements=["scope", "writer_id"],
+                set_={"state": statement.excluded.state, "updated_at": statement.excluded.updated_at}
+            )
+            async with self.SessionLocal() as db:
+                await db.execute(statement)
+                await db.commit()
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error checkpointing heavy hitters: {str(e)}")
+            return False
+    
+    async def load_heavy_hitters(self, scope: str, exclude_writer: str = None) -> List[Dict[str, Any]]:
+        """Heavy-hitters sketches of every writer for one scope, optionally leaving out one writer"""
+        try:
+            query = select(HeavyHitterCheckpoint.state).where(HeavyHitterCheckpoint.scope == scope)
+            if exclude_writer is not None:
+                query = query.where(HeavyHitterCheckpoint.writer_id != exclude_writer)
+            async with self.SessionLocal() as db:
+                return list((await db.execute(query)).scalars().all())
+            
+        except Exception as e:
+            logger.error(f"Error loading heavy hitters: {str(e)}")
+            return []
+    
+    async def claim_heavy_hitters(self, writer_id: str, stale_before: datetime) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Delete the sketches of writers whose global sketch was last checkpointed before
+        stale_before and return them by scope. The states come from DELETE ... RETURNING, so
+        when several writers claim at once each sketch goes to exactly one of them.
+        """
+        try:
+            stale_writers = (
+                select(HeavyHitterCheckpoint.writer_id)
+                .where(
+                    HeavyHitterCheckpoint.scope == "*",
+                    HeavyHitterCheckpoint.writer_id != writer_id,
+                    HeavyHitterCheckpoint.updated_at < stale_before
+                )
+            )
+            async with self.SessionLocal() as db:
+                rows = (await db.execute(
+                    delete(HeavyHitterCheckpoint)
+                    .where(HeavyHitterCheckpoint.writer_id.in_(stale_writers.scalar_subquery()))
+                    .returning(HeavyHitterCheckpoint.scope, HeavyHitterCheckpoint.state)
+                    .execution_options(synchronize_session=False)
+                )).all()
+                await db.commit()
+            claimed = defaultdict(list)
+            for scope, state in rows:
+                claimed[scope].append(state)
+            return dict(claimed)
+            
+        except Exception as e:
+            logger.error(f"Error claiming heavy hitters: {str(e)}")
+            return {}
+    
+    async def save_latency_rollups(self, rows: List[Dict[str, Any]]) -> bool:
+        """Upsert latency sketches, replacing this writer's previous copy of each bucket"""
+        if not rows:
+            return True
+        try:
+            statement = self._dialect_insert(LatencyRollup).values(
+                sorted(rows, key=lambda row: (row["period"], row["bucket_start"], row["metric"]))
+            )
+            statement = statement.on_conflict_do_update(
+                index_elements=["period", "bucket_start", "metric", "writer_id"],
+                set_={"count": statement.excluded["count"], "sketch": statement.excluded.sketch}
+            )
+            async with self.SessionLocal() as db:
+                await db.execute(statement)
+                await db.commit()
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error saving latency rollups: {str(e)}")
+            return False
+    
+    async def load_latency_rollups(self, period: str, since: datetime) -> List[Dict[str, Any]]:
+        """Latency sketches of every writer for buckets starting at or after since"""
+        try:
+            async with self.SessionLocal() as db:
+                rows = (await db.execute(
+                    select(LatencyRollup.bucket_start, LatencyRollup.metric, LatencyRollup.writer_id, LatencyRollup.sketch)
+                    .where(LatencyRollup.period == period, LatencyRollup.bucket_start >= since)
+                )).all()
+            return [
+                {"bucket_start": bucket_start, "metric": metric, "writer_id": writer_id, "sketch": sketch}
+                for bucket_start, metric, writer_id, sketch in rows
+            ]
+            
+        except Exception as e:
+            logger.error(f"Error loading latency rollups: {str(e)}")
+            return []
+    
+    def _dialect_insert(self, model):
+        """INSERT supporting ON CONFLICT DO UPDATE for the engine's dialect"""
+        dialect_insert = postgresql.insert if self.engine.dialect.name == "postgresql" else sqlite.insert
+        return dialect_insert(model)
+    
+    def _ensure_indexes(self, connection):
+        """Create indexes added to existing tables since they were created (create_all skips them)"""
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+    
+    async def _backfill_rollups(self):
+        """Build rollups for interactions logged before the rollup table existed"""
+        async with self.SessionLocal() as db:
+            has_rollups = await db.scalar(select(InteractionRollup.period).limit(1))
+            has_interactions = await db.scalar(select(DocumentInteraction.id).limit(1))
+        if has_interactions is not None and has_rollups is None:
+            await self.rebuild_rollups()
+    
+    def _rollup_deltas(self, rows: List[Dict[str, Any]]) -> Dict[tuple, Dict[str, Any]]:
+        """Fold interaction rows into counter increments per (period, bucket_start, document_url)"""
+        deltas = defaultdict(self._empty_counters)
+        for row in rows:
+            created_at = row.get("created_at") or datetime.utcnow()
+            confidence = row.get("confidence") or 0.0
+            counters = [1, int(confidence > 0), confidence if confidence > 0 else 0.0, row.get("processing_time_ms") or 0.0]
+            
+            for key in (
+                ("minute", self._bucket_start("minute", created_at), ALL_DOCUMENTS),
+                ("hour", self._bucket_start("hour", created_at), ALL_DOCUMENTS),
+                ("total", ROLLUP_EPOCH, ALL_DOCUMENTS),
+                ("total", ROLLUP_EPOCH, row["document_url"])
+            ):
+                self._add_counters(deltas[key], counters)
+        return deltas
+    
+    async def _apply_rollups(self, db, deltas: Dict[tuple, Dict[str, Any]]):
+        """Add counter increments to the rollup table with multi-row upserts"""
+        # Sorted so concurrent writers lock rows in the same order
+        values = [
+            {"period": period, "bucket_start": bucket_start, "document_url": document_url, **counters}
+            for (period, bucket_start, document_url), counters in sorted(deltas.items())
+        ]
+        # Chunked to stay under SQLite's bound-parameter limit (a rebuild can produce many buckets)
+        for start in range(0, len(values), ROLLUP_UPSERT_CHUNK):
+            statement = self._dialect_insert(InteractionRollup).values(values[start:start + ROLLUP_UPSERT_CHUNK])
+            statement = statement.on_conflict_do_update(
+                index_elements=["period", "bucket_start", "document_url"],
+                set_={name: getattr(InteractionRollup, name) + statement.excluded[name] for name in ROLLUP_COUNTERS}
+            )
+            await db.execute(statement)
+    
+    async def _get_rollup(self, db, period: str, bucket_start: datetime, document_url: str) -> Dict[str, Any]:
+        """Counters of one rollup row, zero if it does not exist"""
+        row = (await db.execute(
+            select(*[getattr(InteractionRollup, name) for name in ROLLUP_COUNTERS]).where(
+                InteractionRollup.period == period,
+                InteractionRollup.bucket_start == bucket_start,
+                InteractionRollup.document_url == document_url
+            )
+        )).first()
+        return dict(zip(ROLLUP_COUNTERS, row)) if row else self._empty_counters()
+    
+    async def _aggregate_interactions(self, db, *conditions) -> Dict[str, Dict[str, Any]]:
+        """Rollup counters per document for the interactions matching conditions"""
+        rows = (await db.execute(
+            select(DocumentInteraction.document_url, *self._counter_columns())
+            .where(*conditions)
+            .group_by(DocumentInteraction.document_url)
+        )).all()
+        return {document_url: dict(zip(ROLLUP_COUNTERS, counters)) for document_url, *counters in rows}
+    
+    def _counter_columns(self) -> List[Any]:
+        """SQL aggregates matching ROLLUP_COUNTERS"""
+        positive = DocumentInteraction.confidence > 0
+        return [
+            func.count(DocumentInteraction.id),
+            func.coalesce(func.sum(case((positive, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((positive, DocumentInteraction.confidence), else_=0.0)), 0.0),
+            func.coalesce(func.sum(DocumentInteraction.processing_time_ms), 0.0)
+        ]
+    
+    def _truncate(self, period: str, column):
+        """SQL expression truncating a timestamp to the start of its minute or hour"""
+        if self.engine.dialect.name == "postgresql":
+            return func.date_trunc(period, column)
+        return func.strftime("%Y-%m-%d %H:%M:00" if period == "minute" else "%Y-%m-%d %H:00:00", column)
+    
+    def _as_datetime(self, value) -> datetime:
+        return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    
+    def _bucket_start(self, period: str, timestamp: datetime) -> datetime:
+        if period == "minute":
+            return timestamp.replace(second=0, microsecond=0)
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    
+    def _empty_counters(self) -> Dict[str, Any]:
+        return {"query_count": 0, "confidence_count": 0, "confidence_sum": 0.0, "processing_time_ms_sum": 0.0}
+    
+    def _add_counters(self, target: Dict[str, Any], counters: List[Any]):
+        for name, value in zip(ROLLUP_COUNTERS, counters):
+            target[name] += value or 0
+    
+    def _average_confidence(self, counters: Dict[str, Any]) -> float:
+        return counters["confidence_sum"] / counters["confidence_count"] if counters["confidence_count"] else 0.0
+    
+    def _average_processing_time(self, counters: Dict[str, Any]) -> float:
+        return counters["processing_time_ms_sum"] / counters["query_count"] if counters["query_count"] else 0.0
+    
+    def get_pool_status(self) -> Dict[str, Any]:
+        """Connection pool utilisation"""
+        if self.engine is None:
+            return {}
+        pool = self.engine.pool
+        status = {"pool": type(pool).__name__}
+        if hasattr(pool, "size"):
+            status.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow()
+            })
+        return status
     
     async def close(self):
         """Close database connections"""
         try:
             if self.engine:
-                self.engine.dispose()
+                await self.engine.dispose()
             logger.info("Database connections closed")
         except Exception as e:
-            logger.error(f"Error closing database: {str(e)}") 
\ No newline at end of file
+            logger.error(f"Error closing database: {str(e)}")
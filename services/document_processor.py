@@ -2,11 +2,15 @@ import PyPDF2
 import docx
 import requests
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Set
 import logging
 from urllib.parse import urlparse
 import io
 
+from services.keyword_matcher import KEYWORD_AUTOMATON, CLAUSE_TYPES
+from services.tracing import trace_stage
+from services.single_flight import SingleFlight
+
 logger = logging.getLogger(__name__)
 
 class DocumentProcessor:
@@ -16,11 +20,18 @@ class DocumentProcessor:
         self.supported_formats = ['.pdf', '.docx', '.txt']
         self.segment_size = 1000  # characters per segment
         self.segment_overlap = 200  # overlap between segments
+        
+        # Concurrent requests for the same document share one download
+        self._flights = SingleFlight("process_document")
     
     async def process_document(self, document_url: str) -> str:
         """
         Process document from URL and extract text content
         """
+        return await self._flights.do(document_url, lambda: self._process_document(document_url))
+    
+    async def _process_document(self, document_url: str) -> str:
+        """Download, extract and clean one document"""
         try:
             # Determine document type from URL
             parsed_url = urlparse(document_url)
@@ -30,18 +41,21 @@ class DocumentProcessor:
                 raise ValueError(f"Unsupported file format: {file_extension}")
             
             # Download document content
-            content = await self._download_document(document_url)
+            with trace_stage("download"):
+                content = await self._download_document(document_url)
             
             # Extract text based on format
-            if file_extension == '.pdf':
-                text_content = self._extract_pdf_text(content)
-            elif file_extension == '.docx':
-                text_content = self._extract_docx_text(content)
-            else:
-                text_content = content.decode('utf-8')
+            with trace_stage("extract"):
+                if file_extension == '.pdf':
+                    text_content = self._extract_pdf_text(content)
+                elif file_extension == '.docx':
+                    text_content = self._extract_docx_text(content)
+                else:
+                    text_content = content.decode('utf-8')
             
             # Clean and normalize text
-            cleaned_text = self._clean_text(text_content)
+            with trace_stage("clean"):
+                cleaned_text = self._clean_text(text_content)
             
             logger.info(f"Successfully processed document: {document_url}")
             return cleaned_text
@@ -65,14 +79,18 @@ class DocumentProcessor:
             if not segment_text.strip():
                 continue
             
+            # Single keyword pass shared by clause typing and clause matching
+            keyword_hits = KEYWORD_AUTOMATON.find_hits(segment_text)
+            
             # Extract potential clause information
-            clause_info = self._extract_clause_info(segment_text, i)
+            clause_info = self._extract_clause_info(segment_text, i, keyword_hits)
             
             segment = {
                 "text": segment_text,
                 "start_position": i,
                 "end_position": end_pos,
                 "clause_info": clause_info,
+                "keyword_hits": sorted(keyword_hits),
                 "segment_id": len(segments)
             }
             
@@ -144,7 +162,7 @@ class DocumentProcessor:
         
         return text.strip()
     
-    def _extract_clause_info(self, segment_text: str, position: int) -> Dict[str, Any]:
+    def _extract_clause_info(self, segment_text: str, position: int, keyword_hits: Set[str] = None) -> Dict[str, Any]:
         """Extract potential clause information from text segment"""
         clause_info = {
             "page_number": None,
@@ -165,14 +183,11 @@ class DocumentProcessor:
             clause_info["section_number"] = clause_match.group(1)
         
         # Try to identify clause type
-        clause_types = [
-            "termination", "payment", "liability", "confidentiality", 
-            "non-compete", "intellectual property", "governing law",
-            "dispute resolution", "force majeure", "amendment"
-        ]
+        if keyword_hits is None:
+            keyword_hits = KEYWORD_AUTOMATON.find_hits(segment_text)
         
-        for clause_type in clause_types:
-            if clause_type.lower() in segment_text.lower():
+        for clause_type in CLAUSE_TYPES:
+            if clause_type in keyword_hits:
                 clause_info["clause_type"] = clause_type
                 break
         
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class StoredDocument:
+    """A processed document as persisted: extracted text, segments and their embedding matrix"""
+    document_url: str
+    content: str
+    content_hash: str
+    segments: List[Dict[str, Any]]
+    embeddings: np.ndarray
+    stored_at: float
+
+class DocumentStore:
+    """
+    Persists processed documents (text, segments and embedding vectors) so a restarted
+    worker serves a known document without downloading, extracting or embedding it again.
+    Loaded documents are kept in a small in-memory LRU. With a TTL, older documents are
+    processed again so content changed at the same URL is eventually picked up.
+
+    Saves are coalesced per URL: while one is being written, concurrent misses for the same
+    URL only replace the version waiting to be saved, so two requests never write the same
+    document at once.
+    """
+
+    def __init__(
+        self,
+        db_service,
+        cache_size: int = Config.DOCUMENT_STORE_CACHE_SIZE,
+        ttl_seconds: float = Config.DOCUMENT_STORE_TTL_SECONDS
+    ):
+        self.db_service = db_service
+        self.cache_size = cache_size
+        self.ttl_seconds = ttl_seconds
+
+        self._documents: "OrderedDict[str, StoredDocument]" = OrderedDict()
+        # URL -> task writing it, and URL -> latest version waiting for that task
+        self._saves: Dict[str, asyncio.Task] = {}
+        self._pending: Dict[str, StoredDocument] = {}
+
+        self.stats = {
+            "memory_hits": 0,
+            "store_hits": 0,
+            "misses": 0,
+            "saved": 0,
+            "coalesced_saves": 0,
+            "load_ms": 0.0
+        }
+
+    async def load(self, document_url: str) -> Optional[StoredDocument]:
+        """The stored document, from memory or with a single database query, or None"""
+        document = self._documents.get(document_url)
+        if document is not None and not self._expired(document):
+            self._documents.move_to_end(document_url)
+            self.stats["memory_hits"] += 1
+            return document
+
+        started = time.perf_counter()
+        stored = await self.db_service.load_document(document_url)
+        document = StoredDocument(**stored) if stored is not None else None
+        if document is None or self._expired(document):
+            self.stats["misses"] += 1
+            return None
+
+        self.stats["store_hits"] += 1
+        self.stats["load_ms"] += (time.perf_counter() - started) * 1000
+        self._remember(document)
+        return document
+
+    def save_in_background(
+        self,
+        document_url: str,
+        content: str,
+        content_hash: str,
+        segments: List[Dict[str, Any]],
+        embeddings: List[np.ndarray]
+    ):
+        """Persist a freshly processed document without delaying the request"""
+        if not segments:
+            return
+
+        matrix = np.vstack([np.asarray(embedding, dtype=np.float32).ravel() for embedding in embeddings])
+        document = StoredDocument(document_url, content, content_hash, segments, matrix, time.time())
+        self._remember(document)
+
+        self._pending[document_url] = document
+        if document_url in self._saves:
+            self.stats["coalesced_saves"] += 1
+            return
+
+        task = asyncio.ensure_future(self._save_latest(document_url))
+        self._saves[document_url] = task
+        task.add_done_callback(lambda _: self._saves.pop(document_url, None))
+
+    async def close(self):
+        """Wait for pending saves"""
+        if self._saves:
+            await asyncio.gather(*self._saves.values(), return_exceptions=True)
+
+    async def _save_latest(self, document_url: str):
+        """Save the latest version of a URL, then any newer version queued meanwhile"""
+        saved_hash = None
+        while document_url in self._pending:
+            document = self._pending.pop(document_url)
+            if document.content_hash != saved_hash:
+                await self._save(document)
+                saved_hash = document.content_hash
+
+    async def _save(self, document: StoredDocument):
+        if await self.db_service.save_document(
+            document.document_url,
+            document.content,
+            document.content_hash,
+            document.segments,
+            document.embeddings
+        ):
+            self.stats["saved"] += 1
+
+    def _expired(self, document: StoredDocument) -> bool:
+        """Whether the document is older than the TTL and should be processed again"""
+        return bool(self.ttl_seconds) and time.time() - document.stored_at > self.ttl_seconds
+
+    def _remember(self, document: StoredDocument):
+        """Insert into the in-memory LRU, evicting the least recently used document when full"""
+        self._documents[document.document_url] = document
+        self._documents.move_to_end(document.document_url)
+        while len(self._documents) > self.cache_size:
+            self._documents.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit counters and average load time from the database"""
+        return {
+            "memory_hits": self.stats["memory_hits"],
+            "store_hits": self.stats["store_hits"],
+            "misses": self.stats["misses"],
+            "saved": self.stats["saved"],
+            "coalesced_saves": self.stats["coalesced_saves"],
+            "cached_documents": len(self._documents),
+            "avg_load_ms": round(self.stats["load_ms"] / self.stats["store_hits"], 3) if self.stats["store_hits"] else 0.0
+        }
@@ -1,4 +1,4 @@
-import openai
+import asyncio
 import os
 import numpy as np
 import faiss
@@ -6,7 +6,13 @@ from typing import List, Dict, Any
 import logging
 import pickle
 from sentence_transformers import SentenceTransformer
-import time
+
+from config import Config
+from services.tracing import trace_stage
+from services.single_flight import SingleFlight
+from services.rationale_cache import content_hash
+from services.openai_client import get_async_client
+from services.resilience import CircuitBreaker, CircuitOpenError
 
 logger = logging.getLogger(__name__)
 
@@ -20,8 +26,12 @@ class EmbeddingService:
         self.document_segments = []
         self.embeddings_cache = {}
         
-        # Initialize OpenAI client
-        openai.api_key = self.api_key
+        # Concurrent requests embedding the same segments share one call
+        self._flights = SingleFlight("generate_embeddings")
+        
+        # Trips to sentence transformers when the OpenAI embeddings API errors or slows down
+        self.breaker = CircuitBreaker("openai_embeddings")
+        self._probe_task = None
         
         # Fallback to sentence transformers if OpenAI is not available
         try:
@@ -31,33 +41,37 @@ class EmbeddingService:
             self.sentence_transformer = None
     
     async def initialize(self):
-        """Initialize the embedding service"""
-        try:
-            # Test OpenAI connection
-            await self._test_openai_connection()
+        """Initialize the embedding service without waiting on the OpenAI API"""
+        if self._use_openai():
+            # Probe in the background; a failed probe counts against the circuit breaker
+            self._probe_task = asyncio.ensure_future(self._test_openai_connection())
             logger.info("Embedding service initialized with OpenAI")
-        except Exception as e:
-            logger.warning(f"OpenAI not available, using sentence transformers: {e}")
+        else:
+            logger.info("Embedding service initialized with sentence transformers")
     
     async def generate_embeddings(self, document_segments: List[Dict[str, Any]]) -> List[np.ndarray]:
         """
         Generate embeddings for document segments
         """
+        segments_key = content_hash("\x1f".join(segment["text"] for segment in document_segments))
+        return await self._flights.do(segments_key, lambda: self._generate_embeddings(document_segments))
+    
+    async def _generate_embeddings(self, document_segments: List[Dict[str, Any]]) -> List[np.ndarray]:
+        """Embed and index one set of document segments"""
         try:
             embeddings = []
             texts = [segment["text"] for segment in document_segments]
             
             # Generate embeddings
-            if self.api_key != "your-openai-api-key":
-                embeddings = await self._generate_openai_embeddings(texts)
-            else:
-                embeddings = self._generate_sentence_transformer_embeddings(texts)
+            with trace_stage("embed"):
+                embeddings = await self._embed_texts(texts)
             
             # Store segments for later retrieval
             self.document_segments = document_segments
             
             # Create FAISS index
-            await self._create_faiss_index(embeddings)
+            with trace_stage("index"):
+                await self._create_faiss_index(embeddings)
             
             logger.info(f"Generated {len(embeddings)} embeddings")
             return embeddings
@@ -66,6 +80,34 @@ class EmbeddingService:
             logger.error(f"Error generating embeddings: {str(e)}")
             raise
     
+    async def embed_queries(self, texts: List[str], dimension: int = None) -> np.ndarray:
+        """
+        Embed query texts in one batch with the same model as document segments.
+        Pass the segment embedding dimension so queries use the model the segments did.
+        """
+        try:
+            if not texts:
+                return np.zeros((0, dimension or self.get_embedding_dimension()), dtype='float32')
+
+            embeddings = await self._embed_texts(texts, dimension)
+            return np.vstack(embeddings).astype('float32')
+
+        except Exception as e:
+            logger.error(f"Error embedding queries: {str(e)}")
+            raise
+
+    async def embed_local(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts with the local sentence transformer only, for vectors that are compared
+        among themselves and never with document segments, so no API call is made
+        """
+        if not texts:
+            return np.zeros((0, self._sentence_transformer_dimension() or 0), dtype='float32')
+        
+        loop = asyncio.get_event_loop()
+        embeddings = await loop.run_in_executor(None, self._generate_sentence_transformer_embeddings, texts)
+        return np.vstack(embeddings).astype('float32')
+    
     async def find_similar_segments(self, query_embedding: np.ndarray, top_k: int = 5) -> List[Dict[str, Any]]:
         """
         Find most similar document segments using FAISS
@@ -98,29 +140,62 @@ class EmbeddingService:
             logger.error(f"Error finding similar segments: {str(e)}")
             return []
     
+    async def _embed_texts(self, texts: List[str], dimension: int = None) -> List[np.ndarray]:
+        """
+        Embed with OpenAI when configured and its circuit is closed, otherwise with
+        sentence transformers. A fixed dimension pins the model so vectors stay comparable.
+        """
+        local_dimension = self._sentence_transformer_dimension()
+        wants_local = dimension is not None and dimension == local_dimension and dimension != Config.EMBEDDING_DIMENSION
+        
+        if self._use_openai() and not wants_local:
+            try:
+                return await self._generate_openai_embeddings(texts)
+            except Exception as e:
+                if dimension is not None or self.sentence_transformer is None:
+                    raise
+                logger.warning(f"OpenAI embeddings unavailable, falling back to sentence transformers: {e}")
+        
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self._generate_sentence_transformer_embeddings, texts)
+    
+    def _use_openai(self) -> bool:
+        """Whether an OpenAI API key is configured"""
+        return self.api_key != "your-openai-api-key"
+    
+    def _sentence_transformer_dimension(self) -> int:
+        """Output dimension of the local model, if loaded"""
+        if self.sentence_transformer is None:
+            return None
+        return self.sentence_transformer.get_sentence_embedding_dimension()
+    
     async def _generate_openai_embeddings(self, texts: List[str]) -> List[np.ndarray]:
         """Generate embeddings using OpenAI API"""
         try:
             embeddings = []
+            client = get_async_client()
             
             # Process in batches to avoid rate limits
             batch_size = 10
             for i in range(0, len(texts), batch_size):
                 batch = texts[i:i + batch_size]
                 
-                response = openai.Embedding.create(
-                    input=batch,
-                    model=self.embedding_model
+                response = await self.breaker.call(
+                    lambda: client.embeddings.create(input=batch, model=self.embedding_model)
                 )
                 
                 batch_embeddings = [np.array(embedding.embedding) for embedding in response.data]
                 embeddings.extend(batch_embeddings)
                 
                 # Small delay to avoid rate limits
-                time.sleep(0.1)
+                if i + batch_size < len(texts):
+                    await asyncio.sleep(0.1)
             
             return embeddings
             
+        except CircuitOpenError:
+            raise
+            
         except Exception as e:
             logger.error(f"Error generating OpenAI embeddings: {str(e)}")
             raise
@@ -161,23 +236,22 @@ class EmbeddingService:
     async def _test_openai_connection(self):
         """Test OpenAI API connection"""
         try:
-            test_response = openai.Embedding.create(
-                input=["test"],
-                model=self.embedding_model
-            )
+            await self._generate_openai_embeddings(["test"])
             return True
         except Exception as e:
             logger.warning(f"OpenAI connection test failed: {e}")
             return False
     
     def get_embedding_dimension(self) -> int:
-        """Get the dimension of embeddings"""
-        if self.faiss_index:
-            return self.faiss_index.d
-        return 1536  # Default OpenAI embedding dimension
+        """Get the dimension of embeddings from the model in use"""
+        if self._use_openai() or self.sentence_transformer is None:
+            return Config.EMBEDDING_DIMENSION
+        return self._sentence_transformer_dimension()
     
     async def close(self):
         """Cleanup resources"""
+        if self._probe_task is not None and not self._probe_task.done():
+            self._probe_task.cancel()
         self.faiss_index = None
         self.document_segments = []
         self.embeddings_cache = {}
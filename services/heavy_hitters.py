@@ -0,0 +1,233 @@
+import asyncio
+import heapq
+import logging
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import Config
+from services.query_cache import ParsedQueryCache
+
+logger = logging.getLogger(__name__)
+
+# Checkpoint scope of the global sketch; per-document sketches use the document URL
+GLOBAL_SCOPE = "*"
+# Missed checkpoint intervals after which a writer's sketches are claimed by another writer
+STALE_CHECKPOINTS = 3
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitters sketch: tracks at most `capacity` items. An untracked item
+    replaces the item with the smallest count and inherits that count as its error, so
+    every reported count overestimates the true frequency by at most `error`.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.total = 0
+        # Min-heap of (count, item); entries go stale when counts change and are skipped lazily
+        self._heap: List[Tuple[int, str]] = []
+
+    def offer(self, item: str, count: int = 1):
+        """Count one or more occurrences of an item"""
+        self.total += count
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+        else:
+            minimum, evicted = self._pop_minimum()
+            del self.counts[evicted]
+            del self.errors[evicted]
+            self.counts[item] = minimum + count
+            self.errors[item] = minimum
+
+        heapq.heappush(self._heap, (self.counts[item], item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(item_count, tracked) for tracked, item_count in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def merge(self, other: "SpaceSaving"):
+        """Fold another sketch's counts into this one; errors of both sketches add up"""
+        for item, count in other.counts.items():
+            self.offer(item, count)
+            self.errors[item] += other.errors.get(item, 0)
+        # Occurrences the other sketch saw but no longer tracks
+        self.total += other.total - sum(other.counts.values())
+
+    def top(self, k: int) -> List[Dict[str, Any]]:
+        """The k most frequent items with their estimated counts and maximum overestimate"""
+        return [
+            {"query": item, "count": count, "error": self.errors[item]}
+            for item, count in heapq.nlargest(k, self.counts.items(), key=lambda entry: entry[1])
+        ]
+
+    def to_state(self) -> Dict[str, Any]:
+        return {"capacity": self.capacity, "total": self.total, "counts": self.counts, "errors": self.errors}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], capacity: int = None) -> "SpaceSaving":
+        """Restore a sketch, keeping the largest items if the capacity shrank"""
+        sketch = cls(capacity or state.get("capacity", 1))
+        kept = heapq.nlargest(sketch.capacity, state.get("counts", {}).items(), key=lambda entry: entry[1])
+        sketch.counts = dict(kept)
+        sketch.errors = {item: state.get("errors", {}).get(item, 0) for item in sketch.counts}
+        sketch.total = state.get("total", sum(sketch.counts.values()))
+        sketch._heap = [(count, item) for item, count in sketch.counts.items()]
+        heapq.heapify(sketch._heap)
+        return sketch
+
+    def _pop_minimum(self) -> Tuple[int, str]:
+        """Remove and return the current (count, item) minimum, discarding stale heap entries"""
+        while True:
+            count, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                return count, item
+
+class HeavyHitters:
+    """
+    Most frequent normalised queries, globally and per document, kept in Space-Saving
+    sketches. Per-document sketches are bounded in number (least recently queried
+    documents are evicted). Each process counts only its own queries and checkpoints them
+    under its own writer id, like LatencyRecorder; reads merge the stored sketches of every
+    writer with the unflushed ones. Sketches of writers that stopped checkpointing are
+    claimed by a live writer so their counts survive restarts without piling up rows.
+    """
+
+    def __init__(
+        self,
+        db_service=None,
+        capacity: int = Config.HEAVY_HITTERS_CAPACITY,
+        document_capacity: int = Config.HEAVY_HITTERS_DOCUMENT_CAPACITY,
+        max_documents: int = Config.HEAVY_HITTERS_MAX_DOCUMENTS,
+        checkpoint_seconds: float = Config.HEAVY_HITTERS_CHECKPOINT_SECONDS
+    ):
+        self.db_service = db_service
+        self.document_capacity = document_capacity
+        self.max_documents = max_documents
+        self.checkpoint_seconds = checkpoint_seconds
+        self.writer_id = uuid.uuid4().hex[:16]
+
+        self.global_sketch = SpaceSaving(capacity)
+        self._documents: "OrderedDict[str, SpaceSaving]" = OrderedDict()
+        # Scopes changed since the last checkpoint
+        self._dirty = set()
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats = {
+            "checkpoints": 0,
+            "checkpoint_failures": 0,
+            "writers_claimed": 0,
+            "documents_evicted": 0
+        }
+
+    def record(self, document_url: str, query: str):
+        """Count one query against the global and the document's sketch"""
+        normalized = ParsedQueryCache.normalize(query)
+        if not normalized:
+            return
+
+        self.global_sketch.offer(normalized)
+        self._document_sketch(document_url).offer(normalized)
+        self._dirty.update((GLOBAL_SCOPE, document_url))
+
+    async def top(self, k: int = 10, document_url: str = None) -> List[Dict[str, Any]]:
+        """Most frequent queries overall, or for one document, across every writer"""
+        scope = GLOBAL_SCOPE if document_url is None else document_url
+        local = self.global_sketch if document_url is None else self._documents.get(document_url)
+        stored = []
+        if self.db_service is not None:
+            stored = await self.db_service.load_heavy_hitters(scope, exclude_writer=self.writer_id)
+        if not stored:
+            return local.top(k) if local is not None else []
+
+        capacity = self.global_sketch.capacity if document_url is None else self.document_capacity
+        merged = SpaceSaving(capacity)
+        for state in stored:
+            merged.merge(SpaceSaving.from_state(state, capacity))
+        if local is not None:
+            merged.merge(local)
+        return merged.top(k)
+
+    async def start(self):
+        """Start periodic checkpointing"""
+        if self.db_service is None or self._task is not None:
+            return
+        self._task = asyncio.ensure_future(self._run())
+        logger.info(f"Heavy hitters checkpointing as writer {self.writer_id}")
+
+    async def checkpoint(self):
+        """
+        Claim the sketches of writers that stopped checkpointing, then write the sketches
+        changed since the last checkpoint. The global sketch is always written so other
+        writers can tell this one is alive.
+        """
+        if self.db_service is None:
+            return
+
+        stale_before = datetime.utcnow() - timedelta(seconds=STALE_CHECKPOINTS * self.checkpoint_seconds)
+        claimed = await self.db_service.claim_heavy_hitters(self.writer_id, stale_before)
+        for scope, states in claimed.items():
+            sketch = self.global_sketch if scope == GLOBAL_SCOPE else self._document_sketch(scope)
+            for state in states:
+                sketch.merge(SpaceSaving.from_state(state, sketch.capacity))
+            self._dirty.add(scope)
+        if claimed:
+            self.stats["writers_claimed"] += 1
+
+        dirty, self._dirty = self._dirty | {GLOBAL_SCOPE}, set()
+        states = {}
+        for scope in dirty:
+            sketch = self.global_sketch if scope == GLOBAL_SCOPE else self._documents.get(scope)
+            if sketch is not None:
+                states[scope] = sketch.to_state()
+
+        if await self.db_service.save_heavy_hitters(self.writer_id, states):
+            self.stats["checkpoints"] += 1
+        else:
+            self.stats["checkpoint_failures"] += 1
+            self._dirty |= dirty
+
+    async def close(self):
+        """Stop checkpointing and write a final checkpoint"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.checkpoint()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.checkpoint_seconds)
+            await self.checkpoint()
+
+    def _document_sketch(self, document_url: str) -> SpaceSaving:
+        """The document's sketch, creating it and evicting the least recently queried document if needed"""
+        sketch = self._documents.get(document_url)
+        if sketch is not None:
+            self._documents.move_to_end(document_url)
+            return sketch
+
+        sketch = SpaceSaving(self.document_capacity)
+        self._documents[document_url] = sketch
+        if len(self._documents) > self.max_documents:
+            self._documents.popitem(last=False)
+            self.stats["documents_evicted"] += 1
+        return sketch
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Sketch sizes and checkpoint counters"""
+        return {
+            **self.stats,
+            "queries_seen": self.global_sketch.total,
+            "distinct_tracked": len(self.global_sketch.counts),
+            "documents_tracked": len(self._documents),
+            "writer_id": self.writer_id
+        }
@@ -0,0 +1,174 @@
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from config import Config
+from services.keyword_matcher import KEYWORD_AUTOMATON, INTENT_KEYWORDS, QUERY_INTENT_MAPPING
+
+logger = logging.getLogger(__name__)
+
+GENERAL_INTENT = "general_search"
+
+# Weight of an explicit query-intent keyword (e.g. "termination") over incidental keyword hits
+MAPPING_KEYWORD_BONUS = 1.0
+
+class LocalIntentClassifier:
+    """Classifies query intent locally from keyword hits and query embeddings with a calibrated confidence"""
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], Awaitable[np.ndarray]] = None,
+        temperature: float = Config.LOCAL_PARSE_TEMPERATURE,
+        dense_weight: float = 2.0,
+        general_bias: float = 0.6,
+        db_service=None,
+        calibration_samples: int = Config.LOCAL_PARSE_CALIBRATION_SAMPLES,
+        calibration_min: int = Config.LOCAL_PARSE_CALIBRATION_MIN
+    ):
+        self.embed_fn = embed_fn
+        self.temperature = temperature
+        self.dense_weight = dense_weight
+        self.general_bias = general_bias
+        self.db_service = db_service
+        self.calibration_samples = calibration_samples
+        self.calibration_min = calibration_min
+        # Labelled queries the current temperature was fitted on (0: the configured default)
+        self.calibrated_on = 0
+
+        # Index 0 is the "none of the known intents" class
+        self.intents = [GENERAL_INTENT] + list(INTENT_KEYWORDS)
+        self._prototypes: Optional[np.ndarray] = None
+
+    async def start(self):
+        """Calibrate the temperature on recent LLM parses from the interaction log"""
+        if self.db_service is None:
+            return
+
+        try:
+            labelled = await self.db_service.get_llm_parse_labels(self.calibration_samples)
+            if len(labelled) < self.calibration_min:
+                logger.info(
+                    f"Intent classifier keeps temperature {self.temperature:.3f}: "
+                    f"{len(labelled)} logged LLM parses, {self.calibration_min} needed to calibrate"
+                )
+                return
+            await self.calibrate([query for query, _ in labelled], [intent for _, intent in labelled])
+        except Exception as e:
+            logger.warning(f"Intent classifier calibration failed, keeping temperature {self.temperature:.3f}: {e}")
+
+    async def classify(self, user_query: str, query_embedding: np.ndarray = None) -> Dict[str, Any]:
+        """
+        Return the most likely intent with its calibrated probability. query_embedding, if
+        the caller already embedded the query (e.g. for the parse cache), is reused.
+        """
+        logits = await self.compute_logits(user_query, query_embedding)
+        probabilities = self._softmax(logits / self.temperature)
+        best = int(np.argmax(probabilities))
+
+        return {
+            "intent": self.intents[best],
+            "confidence": float(probabilities[best]),
+            "probabilities": {
+                intent: round(float(probability), 4)
+                for intent, probability in zip(self.intents, probabilities)
+            }
+        }
+
+    async def compute_logits(self, user_query: str, query_embedding: np.ndarray = None) -> np.ndarray:
+        """Uncalibrated per-intent scores combining keyword evidence and embedding similarity"""
+        logits = np.zeros(len(self.intents), dtype=np.float64)
+        logits[0] = self.general_bias
+
+        # Keyword evidence from a single automaton pass over the query
+        keyword_hits = KEYWORD_AUTOMATON.find_hits(user_query)
+        for index, intent in enumerate(self.intents[1:], start=1):
+            keywords = INTENT_KEYWORDS[intent]
+            logits[index] += sum(1 for keyword in keywords if keyword in keyword_hits) / len(keywords)
+        for keyword, intent in QUERY_INTENT_MAPPING.items():
+            if keyword in keyword_hits:
+                logits[self.intents.index(intent)] += MAPPING_KEYWORD_BONUS
+
+        # Embedding similarity to each intent's keyword prototype
+        dense_scores = await self._dense_scores(user_query, query_embedding)
+        if dense_scores is not None:
+            logits[1:] += self.dense_weight * dense_scores
+
+        return logits
+
+    async def calibrate(self, user_queries: List[str], labels: List[str]) -> float:
+        """
+        Fit the softmax temperature to labelled queries (e.g. past LLM parses) by minimising
+        negative log-likelihood. Labels outside the known intents count as general_search.
+        """
+        if not user_queries:
+            return self.temperature
+
+        # One embedding call for every labelled query
+        embeddings = [None] * len(user_queries)
+        if self.embed_fn is not None:
+            try:
+                embeddings = list(np.asarray(await self.embed_fn(user_queries), dtype=np.float32))
+            except Exception as e:
+                logger.warning(f"Could not embed calibration queries: {e}")
+
+        logit_rows = np.vstack([
+            await self.compute_logits(user_query, embedding)
+            for user_query, embedding in zip(user_queries, embeddings)
+        ])
+        targets = np.array([
+            self.intents.index(label) if label in self.intents else 0
+            for label in labels
+        ])
+
+        best_temperature, best_loss = self.temperature, float("inf")
+        for temperature in np.geomspace(0.05, 5.0, 60):
+            scaled = logit_rows / temperature
+            scaled -= scaled.max(axis=1, keepdims=True)
+            log_probabilities = scaled - np.log(np.exp(scaled).sum(axis=1, keepdims=True))
+            loss = -log_probabilities[np.arange(len(targets)), targets].mean()
+            if loss < best_loss:
+                best_temperature, best_loss = float(temperature), float(loss)
+
+        self.temperature = best_temperature
+        self.calibrated_on = len(targets)
+        logger.info(f"Intent classifier calibrated on {len(targets)} queries: temperature={best_temperature:.3f}, nll={best_loss:.3f}")
+        return best_temperature
+
+    async def _dense_scores(self, user_query: str, query_embedding: np.ndarray = None) -> Optional[np.ndarray]:
+        """Cosine similarity between the query and every intent prototype"""
+        if self.embed_fn is None:
+            return None
+
+        try:
+            if self._prototypes is None:
+                descriptions = [
+                    f"{intent.replace('_', ' ')} {' '.join(INTENT_KEYWORDS[intent])}"
+                    for intent in self.intents[1:]
+                ]
+                self._prototypes = self._normalize(np.asarray(await self.embed_fn(descriptions), dtype=np.float32))
+
+            # An embedding from another model (e.g. during an embeddings fallback) is not comparable
+            if query_embedding is None or np.shape(query_embedding) != self._prototypes.shape[1:]:
+                query_embedding = np.asarray(await self.embed_fn([user_query]), dtype=np.float32)[0]
+            query_vector = self._normalize(np.asarray(query_embedding, dtype=np.float32)[np.newaxis, :])[0]
+            return self._prototypes @ query_vector
+
+        except Exception as e:
+            logger.warning(f"Dense intent scoring unavailable: {e}")
+            return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Current temperature and the number of labelled queries it was fitted on"""
+        return {"temperature": round(self.temperature, 4), "calibrated_on": self.calibrated_on}
+
+    def _normalize(self, matrix: np.ndarray) -> np.ndarray:
+        """L2-normalise rows"""
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _softmax(self, logits: np.ndarray) -> np.ndarray:
+        """Numerically stable softmax"""
+        shifted = np.exp(logits - logits.max())
+        return shifted / shifted.sum()
@@ -0,0 +1,150 @@
+import io
+import json
+import logging
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+EXPORT_FORMATS = ("parquet", "arrow", "ndjson")
+
+COLUMNS = ["id", "document_url", "user_query", "matched_clause", "confidence", "processing_time_ms", "created_at", "metadata"]
+
+# Content types and file extensions per export format
+MEDIA_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "ndjson": "application/gzip"
+}
+EXTENSIONS = {"parquet": "parquet", "arrow": "arrows", "ndjson": "ndjson.gz"}
+
+def arrow_schema():
+    """Arrow schema of exported interactions; JSON columns are kept as JSON text"""
+    return pa.schema([
+        ("id", pa.int64()),
+        ("document_url", pa.string()),
+        ("user_query", pa.string()),
+        ("matched_clause", pa.string()),
+        ("confidence", pa.float64()),
+        ("processing_time_ms", pa.float64()),
+        ("created_at", pa.timestamp("us")),
+        ("metadata", pa.string())
+    ])
+
+def check_format(export_format: str):
+    """Raise if the format is unknown or needs pyarrow and pyarrow is not installed"""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{export_format}', expected one of {EXPORT_FORMATS}")
+    if export_format != "ndjson" and pa is None:
+        raise RuntimeError("pyarrow is required for Parquet and Arrow exports; use ndjson or install pyarrow")
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back in chunks, for streaming writers"""
+
+    def __init__(self):
+        self._buffer = io.BytesIO()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        return self._buffer.write(data)
+
+    def take(self) -> bytes:
+        """Bytes written since the last call"""
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+class InteractionExporter:
+    """
+    Streams the interaction log as Parquet, Arrow IPC or gzip-compressed NDJSON. Rows are
+    read with keyset pagination and encoded one page at a time, so memory use depends
+    on the batch size, not on how many rows are exported.
+    """
+
+    def __init__(self, db_service, batch_size: int = Config.EXPORT_BATCH_SIZE):
+        self.db_service = db_service
+        self.batch_size = batch_size
+
+    async def stream(
+        self,
+        export_format: str,
+        since: datetime = None,
+        until: datetime = None,
+        document_url: str = None
+    ) -> AsyncIterator[bytes]:
+        """Encoded export in chunks of roughly one page each"""
+        check_format(export_format)
+
+        pages = self.db_service.iter_interactions(self.batch_size, since=since, until=until, document_url=document_url)
+        if export_format == "ndjson":
+            encoder = self._ndjson_chunks(pages)
+        else:
+            encoder = self._arrow_chunks(pages, export_format)
+
+        rows = 0
+        async for chunk, page_rows in encoder:
+            rows += page_rows
+            if chunk:
+                yield chunk
+        logger.info(f"Exported {rows} interactions as {export_format}")
+
+    async def export_to_file(self, path: str, export_format: str, **filters) -> int:
+        """Write an export to a file; returns the number of bytes written"""
+        written = 0
+        with open(path, "wb") as output:
+            async for chunk in self.stream(export_format, **filters):
+                output.write(chunk)
+                written += len(chunk)
+        return written
+
+    async def _ndjson_chunks(self, pages: AsyncIterator[List[Tuple]]) -> AsyncIterator[Tuple[bytes, int]]:
+        # gzip container so the output is a regular .ndjson.gz file
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        async for rows in pages:
+            lines = "".join(json.dumps(self._to_record(row), default=str) + "\n" for row in rows)
+            yield compressor.compress(lines.encode("utf-8")), len(rows)
+        yield compressor.flush(), 0
+
+    async def _arrow_chunks(self, pages: AsyncIterator[List[Tuple]], export_format: str) -> AsyncIterator[Tuple[bytes, int]]:
+        schema = arrow_schema()
+        sink = _ChunkSink()
+        if export_format == "parquet":
+            # One row group per page
+            writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        else:
+            writer = pa.ipc.new_stream(sink, schema)
+
+        try:
+            async for rows in pages:
+                writer.write_batch(self._to_record_batch(rows, schema))
+                yield sink.take(), len(rows)
+        finally:
+            writer.close()
+        yield sink.take(), 0
+
+    def _to_record(self, row: Tuple) -> Dict[str, Any]:
+        record = dict(zip(COLUMNS, row))
+        record["created_at"] = record["created_at"].isoformat() if record["created_at"] else None
+        return record
+
+    def _to_record_batch(self, rows: List[Tuple], schema) -> "pa.RecordBatch":
+        columns = list(zip(*rows))
+        arrays = []
+        for name, values in zip(COLUMNS, columns):
+            if name in ("matched_clause", "metadata"):
+                values = [json.dumps(value, default=str) if value is not None else None for value in values]
+            arrays.append(pa.array(values, type=schema.field(name).type))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
@@ -0,0 +1,215 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_newest", "drop_oldest", "block")
+
+def _json_default(value: Any) -> Any:
+    """Convert numpy scalars and arrays, then anything else, to JSON-safe values"""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+class InteractionLogger:
+    """
+    Write-behind interaction log: requests enqueue rows into a bounded in-memory queue and
+    a background task bulk-inserts them when a batch fills or the flush interval passes.
+
+    When the queue is full the overflow policy applies:
+    - drop_newest: discard the incoming row (requests never wait on the database)
+    - drop_oldest: discard the oldest queued row to make room
+    - block: wait up to block_timeout_ms for room, then discard the incoming row
+    Rows are serialised when queued, so one bad row is rejected on its own instead of
+    failing the bulk insert of its whole batch. Rows still queued at shutdown are flushed by
+    close(). Every interaction, including dropped ones, is counted by the heavy-hitters
+    sketch when one is given.
+    """
+
+    def __init__(
+        self,
+        db_service,
+        max_queue: int = Config.LOG_QUEUE_SIZE,
+        batch_size: int = Config.LOG_BATCH_SIZE,
+        flush_interval_ms: float = Config.LOG_FLUSH_INTERVAL_MS,
+        overflow_policy: str = Config.LOG_OVERFLOW_POLICY,
+        block_timeout_ms: float = Config.LOG_BLOCK_TIMEOUT_MS,
+        max_retries: int = 3,
+        heavy_hitters=None
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow_policy}', expected one of {OVERFLOW_POLICIES}")
+
+        self.db_service = db_service
+        self.max_queue = max_queue
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout_ms / 1000.0
+        self.max_retries = max_retries
+        self.heavy_hitters = heavy_hitters
+
+        self._queue: asyncio.Queue = None
+        self._worker: asyncio.Task = None
+        self._getter: asyncio.Future = None
+        self._closing = False
+        self._next_drop_warning = 1
+
+        self.stats = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "dropped": 0,
+            "rejected": 0,
+            "write_failures": 0
+        }
+
+    async def start(self):
+        """Start the background writer"""
+        if self._worker is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._closing = False
+            self._worker = asyncio.ensure_future(self._run())
+            logger.info(
+                f"Interaction logger started (queue {self.max_queue}, batch {self.batch_size}, "
+                f"flush every {self.flush_interval * 1000:.0f}ms, overflow {self.overflow_policy})"
+            )
+
+    async def log_interaction(
+        self,
+        document_url: str,
+        user_query: str,
+        matched_clause: Dict[str, Any],
+        confidence: float,
+        processing_time_ms: float = 0.0,
+        metadata: Dict[str, Any] = None
+    ):
+        """Queue an interaction for the next bulk insert; same arguments as DatabaseService.log_interaction"""
+        if self.heavy_hitters is not None:
+            self.heavy_hitters.record(document_url, user_query)
+
+        try:
+            row = {
+                "document_url": document_url,
+                "user_query": user_query,
+                "matched_clause": json.loads(json.dumps(matched_clause, default=_json_default)),
+                "confidence": None if confidence is None else float(confidence),
+                "processing_time_ms": None if processing_time_ms is None else float(processing_time_ms),
+                "created_at": datetime.utcnow(),
+                "metadata": json.loads(json.dumps(metadata or {}, default=_json_default))
+            }
+        except (TypeError, ValueError) as e:
+            self.stats["rejected"] += 1
+            logger.warning(f"Rejected interaction that cannot be stored: {e}")
+            return
+
+        if self._worker is None or self._closing:
+            # Not running (e.g. scripts and tests): write through
+            await self.db_service.log_interactions([row])
+            return
+
+        if self._queue.full():
+            if self.overflow_policy == "drop_newest":
+                self._drop(1)
+                return
+            if self.overflow_policy == "drop_oldest":
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self._drop(1)
+            else:
+                try:
+                    await asyncio.wait_for(self._queue.put(row), timeout=self.block_timeout)
+                    self.stats["enqueued"] += 1
+                except asyncio.TimeoutError:
+                    self._drop(1)
+                return
+
+        self._queue.put_nowait(row)
+        self.stats["enqueued"] += 1
+
+    async def flush(self):
+        """Wait until every queued row has been written or dropped"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        """Flush the queue and stop the background writer"""
+        if self._worker is None:
+            return
+
+        # Rows logged from now on are written through; the last batch is written without
+        # waiting out the flush interval
+        self._closing = True
+        if self._getter is not None:
+            self._getter.cancel()
+        await self.flush()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        logger.info(f"Interaction logger stopped: {self.get_stats()}")
+
+    async def _run(self):
+        """Collect rows into batches by size or time window and write them"""
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._closing:
+                    break
+
+                self._getter = asyncio.ensure_future(self._queue.get())
+                done, _ = await asyncio.wait({self._getter}, timeout=remaining)
+                getter, self._getter = self._getter, None
+                if (not done and getter.cancel()) or getter.cancelled():
+                    break
+                # The getter may have completed just as it timed out; keep that row
+                batch.append(getter.result())
+
+            try:
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write(self, batch: List[Dict[str, Any]]):
+        """Bulk insert one batch, retrying with backoff before dropping it"""
+        for attempt in range(self.max_retries):
+            if await self.db_service.log_interactions(batch):
+                self.stats["written"] += len(batch)
+                self.stats["batches"] += 1
+                return
+            self.stats["write_failures"] += 1
+            await asyncio.sleep(0.1 * 2 ** attempt)
+
+        logger.error(f"Dropping {len(batch)} interactions after {self.max_retries} failed writes")
+        self._drop(len(batch))
+
+    def _drop(self, count: int):
+        """Count discarded rows, warning on the first and then once per thousand more"""
+        self.stats["dropped"] += count
+        if self.stats["dropped"] >= self._next_drop_warning:
+            logger.warning(f"Interaction log overflow ({self.overflow_policy}), dropped {self.stats['dropped']} rows so far")
+            self._next_drop_warning = (self.stats["dropped"] // 1000 + 1) * 1000
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth and write/drop counters"""
+        return {
+            **self.stats,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "overflow_policy": self.overflow_policy
+        }
@@ -0,0 +1,118 @@
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Keywords that signal each search intent in a document segment
+INTENT_KEYWORDS = {
+    "find_termination_clause": ["termination", "terminate", "end", "cancel"],
+    "find_payment_terms": ["payment", "pay", "fee", "cost", "price"],
+    "find_liability_limits": ["liability", "limit", "damage", "claim"],
+    "find_confidentiality_clause": ["confidential", "secret", "private", "non-disclosure"],
+    "find_non_compete_clause": ["non-compete", "competition", "restrict"],
+    "find_ip_clause": ["intellectual property", "patent", "copyright", "trademark"],
+    "find_governing_law": ["governing law", "jurisdiction", "legal"],
+    "find_dispute_resolution": ["dispute", "arbitration", "mediation", "conflict"],
+    "find_force_majeure": ["force majeure", "act of god", "unforeseen"]
+}
+
+# Query keyword to intent mapping used by the fallback parser (first hit wins)
+QUERY_INTENT_MAPPING = {
+    "termination": "find_termination_clause",
+    "payment": "find_payment_terms",
+    "liability": "find_liability_limits",
+    "confidentiality": "find_confidentiality_clause",
+    "non-compete": "find_non_compete_clause",
+    "intellectual property": "find_ip_clause",
+    "governing law": "find_governing_law",
+    "dispute": "find_dispute_resolution",
+    "force majeure": "find_force_majeure"
+}
+
+# Clause types recognised in document segments (first hit wins)
+CLAUSE_TYPES = [
+    "termination", "payment", "liability", "confidentiality",
+    "non-compete", "intellectual property", "governing law",
+    "dispute resolution", "force majeure", "amendment"
+]
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton that finds every keyword occurrence in one pass"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = sorted({pattern.lower() for pattern in patterns if pattern})
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        self._build()
+
+    def _build(self):
+        """Build the trie and failure links"""
+        for pattern_index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(pattern_index)
+
+        # Breadth-first pass so every failure target is resolved before its children
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state].extend(self._output[self._fail[next_state]])
+
+    def find_all(self, text: str) -> List[Tuple[int, str]]:
+        """Return (start offset, keyword) for every keyword occurrence in the text"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        patterns = self.patterns
+
+        matches = []
+        state = 0
+        for position, char in enumerate(text.lower()):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_index in output[state]:
+                pattern = patterns[pattern_index]
+                matches.append((position - len(pattern) + 1, pattern))
+        return matches
+
+    def find_hits(self, text: str) -> Set[str]:
+        """Return the set of distinct keywords present in the text"""
+        return {pattern for _, pattern in self.find_all(text)}
+
+
+def _build_shared_automaton() -> KeywordAutomaton:
+    """Compile one automaton over every intent keyword table"""
+    patterns = set(CLAUSE_TYPES) | set(QUERY_INTENT_MAPPING)
+    for keywords in INTENT_KEYWORDS.values():
+        patterns.update(keywords)
+    automaton = KeywordAutomaton(patterns)
+    logger.info(f"Keyword automaton compiled with {len(automaton.patterns)} patterns")
+    return automaton
+
+
+KEYWORD_AUTOMATON = _build_shared_automaton()
+
+
+@lru_cache(maxsize=256)
+def compile_keywords(keywords: Tuple[str, ...]) -> KeywordAutomaton:
+    """Compile (and memoise) an automaton for an ad-hoc keyword list such as query keywords"""
+    return KeywordAutomaton(keywords)
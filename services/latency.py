@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import math
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from config import Config
+from services.tracing import RequestTrace
+
+logger = logging.getLogger(__name__)
+
+# Windows up to this long are answered from minute buckets, longer ones from hour buckets
+MINUTE_WINDOW_LIMIT_SECONDS = 6 * 3600
+PERCENTILES = {"p50": 0.5, "p95": 0.95, "p99": 0.99}
+
+class LogHistogram:
+    """
+    Mergeable latency sketch with logarithmic buckets (HDR-style): every value lands in
+    the bucket (gamma^(i-1), gamma^i], so any reported percentile is within the relative
+    accuracy of a real observation. Merging two sketches adds their bucket counts.
+    """
+
+    # Values at or below this many milliseconds are counted in the zero bucket
+    MIN_VALUE_MS = 0.001
+
+    def __init__(self, relative_accuracy: float = Config.LATENCY_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, value_ms: float):
+        """Record one latency"""
+        self.count += 1
+        self.max = max(self.max, value_ms)
+        if value_ms <= self.MIN_VALUE_MS:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value_ms) / self._log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + 1
+
+    def merge(self, other: "LogHistogram"):
+        """Add another sketch with the same accuracy into this one"""
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge latency sketches with different accuracies")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Estimated latency at the given fraction of observations"""
+        if not self.count:
+            return None
+        rank = fraction * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                # Midpoint of the bucket in relative terms
+                return min(2 * self.gamma ** index / (self.gamma + 1), self.max)
+        return self.max
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "bins": {str(index): count for index, count in self.bins.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "max": self.max
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "LogHistogram":
+        sketch = cls(state["relative_accuracy"])
+        sketch.bins = {int(index): count for index, count in state["bins"].items()}
+        sketch.zero_count = state["zero_count"]
+        sketch.count = state["count"]
+        sketch.max = state["max"]
+        return sketch
+
+class LatencyRecorder:
+    """
+    Latency sketches per endpoint and per stage, bucketed by minute and by hour. The
+    current buckets live in memory and are flushed to the database periodically; each
+    process writes its own rows, so no read-modify-write is needed. Window percentiles
+    merge the stored buckets with the unflushed ones instead of scanning interactions.
+    """
+
+    def __init__(
+        self,
+        db_service,
+        relative_accuracy: float = Config.LATENCY_RELATIVE_ACCURACY,
+        flush_seconds: float = Config.LATENCY_FLUSH_SECONDS
+    ):
+        self.db_service = db_service
+        self.relative_accuracy = relative_accuracy
+        self.flush_seconds = flush_seconds
+        self.writer_id = uuid.uuid4().hex[:16]
+
+        # (period, bucket_start) -> metric -> sketch
+        self._buckets: Dict[Tuple[str, datetime], Dict[str, LogHistogram]] = {}
+        self._dirty = set()
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats = {
+            "flushes": 0,
+            "flush_failures": 0
+        }
+
+    def record_trace(self, trace: RequestTrace):
+        """Record a finished request's total latency and the latency of each of its stages"""
+        now = datetime.utcnow()
+        samples = [(f"endpoint:{trace.name}", trace.total_time_ms())]
+        samples += [(f"stage:{stage['stage']}", stage["wall_ms"]) for stage in trace.stages]
+
+        for period in ("minute", "hour"):
+            key = (period, self._bucket_start(period, now))
+            sketches = self._buckets.setdefault(key, {})
+            for metric, value_ms in samples:
+                sketch = sketches.get(metric)
+                if sketch is None:
+                    sketch = sketches[metric] = LogHistogram(self.relative_accuracy)
+                sketch.add(value_ms)
+                self._dirty.add((key, metric))
+
+    async def get_percentiles(self, window_seconds: int = 3600) -> Dict[str, Any]:
+        """p50/p95/p99 per endpoint and stage over the trailing window"""
+        period = "minute" if window_seconds <= MINUTE_WINDOW_LIMIT_SECONDS else "hour"
+        since = self._bucket_start(period, datetime.utcnow() - timedelta(seconds=window_seconds))
+
+        merged: Dict[str, LogHistogram] = {}
+
+        def merge(metric: str, sketch: LogHistogram):
+            if metric in merged:
+                merged[metric].merge(sketch)
+            else:
+                merged[metric] = LogHistogram.from_state(sketch.to_state())
+
+        # This process's buckets still in memory are newer than their stored copies
+        for row in await self.db_service.load_latency_rollups(period, since):
+            if row["writer_id"] == self.writer_id and (period, row["bucket_start"]) in self._buckets:
+                continue
+            merge(row["metric"], LogHistogram.from_state(row["sketch"]))
+        for (bucket_period, bucket_start), sketches in self._buckets.items():
+            if bucket_period == period and bucket_start >= since:
+                for metric, sketch in sketches.items():
+                    merge(metric, sketch)
+
+        return {
+            "window_seconds": window_seconds,
+            "resolution": period,
+            "metrics": {
+                metric: {
+                    "count": sketch.count,
+                    **{
+                        name: round(value, 3) if value is not None else None
+                        for name, value in ((name, sketch.percentile(fraction)) for name, fraction in PERCENTILES.items())
+                    },
+                    "max": round(sketch.max, 3)
+                }
+                for metric, sketch in sorted(merged.items())
+            }
+        }
+
+    async def start(self):
+        """Start periodic flushing"""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def flush(self):
+        """Write changed buckets and forget completed buckets once stored"""
+        if self._dirty:
+            dirty, self._dirty = self._dirty, set()
+            rows = [
+                {
+                    "period": period,
+                    "bucket_start": bucket_start,
+                    "metric": metric,
+                    "writer_id": self.writer_id,
+                    "count": self._buckets[(period, bucket_start)][metric].count,
+                    "sketch": self._buckets[(period, bucket_start)][metric].to_state()
+                }
+                for (period, bucket_start), metric in dirty
+            ]
+            if await self.db_service.save_latency_rollups(rows):
+                self.stats["flushes"] += 1
+            else:
+                self.stats["flush_failures"] += 1
+                self._dirty |= dirty
+                return
+
+        now = datetime.utcnow()
+        pending = {key for key, _ in self._dirty}
+        for key in list(self._buckets):
+            period, bucket_start = key
+            if bucket_start < self._bucket_start(period, now) and key not in pending:
+                del self._buckets[key]
+
+    async def close(self):
+        """Stop flushing and write what is left"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            started = time.perf_counter()
+            await self.flush()
+            logger.debug(f"Flushed latency rollups in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    def _bucket_start(self, period: str, timestamp: datetime) -> datetime:
+        if period == "minute":
+            return timestamp.replace(second=0, microsecond=0)
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Flush counters and buckets held in memory"""
+        return {
+            **self.stats,
+            "buckets_in_memory": len(self._buckets),
+            "pending_rows": len(self._dirty)
+        }
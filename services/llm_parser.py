@@ -1,31 +1,106 @@
-import openai
+import asyncio
+import copy
 import os
-from typing import Dict, Any, List
+import time
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 import logging
 import json
 from datetime import datetime
 
+from config import Config
+from services.keyword_matcher import KEYWORD_AUTOMATON, QUERY_INTENT_MAPPING
+from services.openai_client import get_async_client, close_async_client
+from services.rationale_cache import content_hash
+from services.intent_classifier import GENERAL_INTENT
+from services.prompt_builder import PromptBuilder
+from services.tracing import record_llm_call, record_prompt_tokens_saved
+from services.single_flight import SingleFlight
+from services.resilience import CircuitBreaker, CircuitOpenError
+
 logger = logging.getLogger(__name__)
 
+# Per-item token allowances used when packing several queries into one parse call
+PARSE_BATCH_ITEM_OVERHEAD_TOKENS = 12
+PARSE_BATCH_COMPLETION_TOKENS_PER_ITEM = 80
+
 class LLMParser:
     """Handles LLM-based query parsing and response generation"""
     
-    def __init__(self):
+    def __init__(
+        self, 
+        client=None, 
+        max_concurrency: int = Config.LLM_MAX_CONCURRENCY, 
+        query_cache=None, 
+        rationale_cache=None, 
+        intent_classifier=None,
+        prompt_builder=None
+    ):
         self.api_key = os.getenv("OPENAI_API_KEY", "your-openai-api-key")
-        self.model = "gpt-4"
+        self.model = Config.LLM_MODEL
+        self.max_tokens = Config.LLM_MAX_TOKENS
+        self.temperature = Config.LLM_TEMPERATURE
         self.token_usage = {
             "prompt_tokens": 0,
             "completion_tokens": 0,
-            "total_tokens": 0
+            "total_tokens": 0,
+            "prompt_tokens_saved": 0
+        }
+        
+        # Token-budgeted prompt assembly with local token counting
+        self.prompt_builder = prompt_builder or PromptBuilder(model=self.model)
+        
+        # Async OpenAI client sharing one pooled HTTP connection pool
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.request_timeout = Config.PROCESSING_TIMEOUT
+        self._semaphore = None
+        
+        # Trips to the local fallbacks when OpenAI errors or slows down
+        self.breaker = CircuitBreaker("openai_chat")
+        
+        # Optional exact + semantic cache of parsed queries
+        self.query_cache = query_cache
+        
+        # Optional persistent cache of rationales keyed on intent and clause content
+        self.rationale_cache = rationale_cache
+        
+        # Optional local classifier that answers confident queries without the LLM
+        self.intent_classifier = intent_classifier
+        self.local_confidence_threshold = Config.LOCAL_PARSE_THRESHOLD
+        # Questions answered locally or sent to the LLM, and the LLM calls they took (a batch is one call)
+        self.parse_stats = {
+            "local": 0,
+            "llm_questions": 0,
+            "llm_calls": 0,
+            "fallback": 0
         }
         
-        # Initialize OpenAI client
-        openai.api_key = self.api_key
+        # Identical concurrent parse and rationale requests share one LLM call
+        self._parse_flights = SingleFlight("parse_query")
+        self._rationale_flights = SingleFlight("generate_rationale")
     
     async def parse_query(self, user_query: str) -> Dict[str, Any]:
         """
         Parse user query to extract structured search intent
         """
+        return await self._parse_flights.do(
+            user_query, 
+            lambda: self._parse_query(user_query), 
+            copy_result=copy.deepcopy
+        )
+    
+    async def _parse_query(self, user_query: str) -> Dict[str, Any]:
+        """Parse one query through the cache, the local classifier or the LLM"""
+        query_embedding = None
+        if self.query_cache is not None:
+            cached_result, query_embedding = await self.query_cache.lookup(user_query)
+            if cached_result is not None:
+                return cached_result
+        
+        local_result = await self._try_local_parse(user_query, query_embedding)
+        if local_result is not None:
+            return local_result
+        
         try:
             system_prompt = """
             You are an expert legal and business document analyzer. Your task is to parse user queries and extract structured search intent.
@@ -41,114 +116,548 @@ class LLMParser:
             
             user_prompt = f"Parse this query: '{user_query}'"
             
-            response = await self._call_openai(system_prompt, user_prompt)
+            self.parse_stats["llm_questions"] += 1
+            self.parse_stats["llm_calls"] += 1
+            response = await self._call_openai(system_prompt, user_prompt, purpose="parse")
             
             # Parse the response
             try:
                 parsed_result = json.loads(response)
             except json.JSONDecodeError:
+                parsed_result = None
+            
+            if isinstance(parsed_result, dict):
+                parsed_result = self._validate_parse(parsed_result)
+            else:
+                parsed_result = None
+            
+            if parsed_result is None:
                 # Fallback parsing if JSON is malformed
                 parsed_result = self._fallback_parse(user_query)
+            elif self.query_cache is not None:
+                # Only cache genuine LLM parses, never fallbacks
+                await self.query_cache.store(user_query, parsed_result, query_embedding)
             
             logger.info(f"Query parsed successfully: {parsed_result}")
             return parsed_result
             
+        except CircuitOpenError:
+            return self._fallback_parse(user_query)
+            
         except Exception as e:
             logger.error(f"Error parsing query: {str(e)}")
             return self._fallback_parse(user_query)
     
-    async def generate_rationale(self, user_query: str, matched_clause: Dict[str, Any], document_content: str) -> str:
+    async def parse_queries(self, user_queries: List[str]) -> List[Dict[str, Any]]:
         """
-        Generate explainable rationale for the matched clause
+        Parse many queries with as few LLM calls as fit the token budget.
+        Each returned item is validated; only invalid or missing items use the fallback parser.
         """
+        results: List[Dict[str, Any]] = [None] * len(user_queries)
+        
+        # Resolve cache hits and collapse duplicate questions
+        pending: Dict[str, Dict[str, Any]] = {}
+        for index, user_query in enumerate(user_queries):
+            if user_query in pending:
+                pending[user_query]["indices"].append(index)
+                continue
+            
+            query_embedding = None
+            if self.query_cache is not None:
+                cached_result, query_embedding = await self.query_cache.lookup(user_query)
+                if cached_result is not None:
+                    results[index] = cached_result
+                    continue
+            
+            local_result = await self._try_local_parse(user_query, query_embedding)
+            if local_result is not None:
+                results[index] = local_result
+                pending[user_query] = {"indices": [], "embedding": None, "result": local_result}
+                continue
+            
+            pending[user_query] = {"indices": [index], "embedding": query_embedding}
+        
+        # Duplicates of a locally parsed question reuse its result
+        for user_query, entry in list(pending.items()):
+            if "result" in entry:
+                for index in entry["indices"]:
+                    results[index] = copy.deepcopy(entry["result"])
+                del pending[user_query]
+        
+        self.parse_stats["llm_questions"] += len(pending)
+        batches = self._pack_parse_batches(list(pending))
+        batch_results = await asyncio.gather(*(self._parse_batch(batch) for batch in batches))
+        
+        fallback_count = 0
+        for batch, parsed_items in zip(batches, batch_results):
+            for batch_index, user_query in enumerate(batch):
+                parsed_result = parsed_items.get(batch_index)
+                if parsed_result is None:
+                    parsed_result = self._fallback_parse(user_query)
+                    fallback_count += 1
+                elif self.query_cache is not None:
+                    await self.query_cache.store(user_query, parsed_result, pending[user_query]["embedding"])
+                
+                for index in pending[user_query]["indices"]:
+                    results[index] = copy.deepcopy(parsed_result)
+        
+        logger.info(
+            f"Parsed {len(user_queries)} queries with {len(batches)} LLM calls "
+            f"({fallback_count} fallbacks)"
+        )
+        return results
+    
+    def _pack_parse_batches(self, user_queries: List[str]) -> List[List[str]]:
+        """Greedily pack queries into batches that fit the prompt and completion token budgets"""
+        batches = []
+        current_batch = []
+        current_tokens = 0
+        
+        for user_query in user_queries:
+            query_tokens = self._estimate_tokens(user_query) + PARSE_BATCH_ITEM_OVERHEAD_TOKENS
+            prompt_full = current_tokens + query_tokens > Config.PARSE_BATCH_PROMPT_TOKENS
+            completion_full = (len(current_batch) + 1) * PARSE_BATCH_COMPLETION_TOKENS_PER_ITEM > Config.PARSE_BATCH_COMPLETION_TOKENS
+            
+            if current_batch and (prompt_full or completion_full):
+                batches.append(current_batch)
+                current_batch = []
+                current_tokens = 0
+            
+            current_batch.append(user_query)
+            current_tokens += query_tokens
+        
+        if current_batch:
+            batches.append(current_batch)
+        return batches
+    
+    async def _parse_batch(self, user_queries: List[str]) -> Dict[int, Dict[str, Any]]:
+        """Parse one batch with a single structured-output call; returns valid items by position"""
         try:
             system_prompt = """
-            You are an expert legal analyst. Explain why a specific clause matches a user's query.
-            Provide clear, concise reasoning that connects the user's question to the matched clause.
-            Focus on legal relevance and practical implications.
+            You are an expert legal and business document analyzer. Your task is to parse user queries and extract structured search intent.
+            
+            You will receive a JSON array of objects with "id" and "query". Return only a JSON object of the form
+            {"results": [{"id": <id>, "intent": ..., "keywords": [...], "clause_type": ..., "context": ...}]}
+            with exactly one result per query, where:
+            - intent: The main search intent (e.g., "find_termination_clause", "find_payment_terms", "find_liability_limits")
+            - keywords: List of important keywords for semantic search
+            - clause_type: Type of clause being sought
+            - context: Additional context that might help in matching
+            
+            Focus on legal, insurance, HR, and compliance domains.
             """
             
-            user_prompt = f"""
-            User Query: {user_query}
+            user_prompt = json.dumps([
+                {"id": index, "query": user_query}
+                for index, user_query in enumerate(user_queries)
+            ])
             
-            Matched Clause: {matched_clause.get('text', '')}
-            Clause Location: {matched_clause.get('location', '')}
-            Confidence Score: {matched_clause.get('confidence', 0.0)}
+            self.parse_stats["llm_calls"] += 1
+            response = await self._call_openai(
+                system_prompt, 
+                user_prompt, 
+                max_tokens=len(user_queries) * PARSE_BATCH_COMPLETION_TOKENS_PER_ITEM,
+                purpose="parse_batch",
+                response_format={"type": "json_object"}
+            )
             
-            Explain why this clause is the best match for the user's query.
-            """
+            parsed_items = {}
+            for item in self._extract_batch_items(response):
+                if not isinstance(item, dict) or not isinstance(item.get("id"), int):
+                    continue
+                if not 0 <= item["id"] < len(user_queries):
+                    continue
+                parsed_result = self._validate_parse(item)
+                if parsed_result is not None:
+                    parsed_items[item["id"]] = parsed_result
             
-            response = await self._call_openai(system_prompt, user_prompt)
-            return response.strip()
+            return parsed_items
+            
+        except Exception as e:
+            logger.error(f"Error parsing query batch: {str(e)}")
+            return {}
+    
+    def _extract_batch_items(self, response: str) -> List[Any]:
+        """Pull the results array out of a batch response, tolerating surrounding prose"""
+        try:
+            payload = json.loads(response)
+        except json.JSONDecodeError:
+            start, end = response.find("{"), response.rfind("}")
+            if start == -1 or end <= start:
+                return []
+            try:
+                payload = json.loads(response[start:end + 1])
+            except json.JSONDecodeError:
+                return []
+        
+        if isinstance(payload, dict):
+            payload = payload.get("results", [])
+        return payload if isinstance(payload, list) else []
+    
+    def _validate_parse(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Check a parsed item has the fields the matcher relies on, with the right types"""
+        intent = item.get("intent")
+        keywords = item.get("keywords")
+        clause_type = item.get("clause_type")
+        context = item.get("context")
+        
+        if not isinstance(intent, str) or not intent.strip():
+            return None
+        if not isinstance(keywords, list) or not all(isinstance(keyword, str) for keyword in keywords):
+            return None
+        if clause_type is not None and not isinstance(clause_type, str):
+            return None
+        if context is not None and not isinstance(context, str):
+            return None
+        
+        return {
+            "intent": intent.strip(),
+            "keywords": keywords,
+            "clause_type": clause_type,
+            "context": context or "",
+            "parse_source": "llm"
+        }
+    
+    def _estimate_tokens(self, text: str) -> int:
+        """Count tokens locally with the prompt builder's tokenizer"""
+        return self.prompt_builder.counter.count(text)
+    
+    async def generate_rationale(
+        self, 
+        user_query: str, 
+        matched_clause: Dict[str, Any], 
+        document_content: str, 
+        parsed_query: Dict[str, Any] = None, 
+        document_url: str = "", 
+        prompt_budget: int = None
+    ) -> str:
+        """
+        Generate explainable rationale for the matched clause
+        """
+        flight_key = (
+            self.model, 
+            user_query, 
+            matched_clause.get('text', ''), 
+            matched_clause.get('location', ''), 
+            matched_clause.get('confidence', 0.0), 
+            content_hash(document_content), 
+            prompt_budget
+        )
+        return await self._rationale_flights.do(
+            flight_key, 
+            lambda: self._generate_rationale(
+                user_query, matched_clause, document_content, parsed_query, document_url, prompt_budget
+            )
+        )
+    
+    async def _generate_rationale(
+        self, 
+        user_query: str, 
+        matched_clause: Dict[str, Any], 
+        document_content: str, 
+        parsed_query: Dict[str, Any], 
+        document_url: str, 
+        prompt_budget: int
+    ) -> str:
+        """Generate one rationale through the rationale cache or the LLM"""
+        cache_key = None
+        if self.rationale_cache is not None:
+            document_hash = content_hash(document_content)
+            cache_key = self.rationale_cache.build_key(
+                user_query, 
+                parsed_query, 
+                matched_clause.get('text', ''), 
+                self.model
+            )
+            cached_rationale = await self.rationale_cache.get(cache_key, document_hash)
+            if cached_rationale is not None:
+                return cached_rationale
+        
+        try:
+            system_prompt, user_prompt = self._build_rationale_prompts(
+                user_query, matched_clause, parsed_query, prompt_budget
+            )
+            
+            response = await self._call_openai(system_prompt, user_prompt, purpose="rationale")
+            rationale = response.strip()
+            
+            if cache_key is not None:
+                await self.rationale_cache.put(cache_key, document_url, document_hash, self.model, rationale)
+            
+            return rationale
             
         except Exception as e:
             logger.error(f"Error generating rationale: {str(e)}")
             return f"Clause matched based on semantic similarity with confidence {matched_clause.get('confidence', 0.0)}"
     
-    async def _call_openai(self, system_prompt: str, user_prompt: str) -> str:
+    async def stream_rationale(
+        self, 
+        user_query: str, 
+        matched_clause: Dict[str, Any], 
+        document_content: str, 
+        parsed_query: Dict[str, Any] = None, 
+        document_url: str = "", 
+        prompt_budget: int = None
+    ) -> AsyncIterator[str]:
         """
-        Make OpenAI API call with token tracking
+        Stream the rationale as it is generated. Closing the generator (for example when
+        the client disconnects) closes the upstream HTTP stream and aborts the LLM call.
         """
+        cache_key = None
+        if self.rationale_cache is not None:
+            document_hash = content_hash(document_content)
+            cache_key = self.rationale_cache.build_key(
+                user_query, 
+                parsed_query, 
+                matched_clause.get('text', ''), 
+                self.model
+            )
+            cached_rationale = await self.rationale_cache.get(cache_key, document_hash)
+            if cached_rationale is not None:
+                yield cached_rationale
+                return
+        
+        system_prompt, user_prompt = self._build_rationale_prompts(
+            user_query, matched_clause, parsed_query, prompt_budget
+        )
+        chunks = []
+        stream = None
+        completed = False
+        started = time.perf_counter()
+        
         try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=500,
-                temperature=0.3
+            async with self._get_semaphore():
+                probe = self.breaker.check()
+                try:
+                    stream = await self._get_client().chat.completions.create(
+                        model=self.model,
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": user_prompt}
+                        ],
+                        max_tokens=self.max_tokens,
+                        temperature=self.temperature,
+                        timeout=self.request_timeout,
+                        stream=True
+                    )
+                except asyncio.CancelledError:
+                    self.breaker.release_probe(probe)
+                    raise
+                except Exception:
+                    self.breaker.record((time.perf_counter() - started) * 1000, failed=True, probe=probe)
+                    raise
+                
+                # Time to the response headers is what the breaker tracks for streams
+                self.breaker.record((time.perf_counter() - started) * 1000, failed=False, probe=probe)
+                
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    token = chunk.choices[0].delta.content
+                    if token:
+                        chunks.append(token)
+                        yield token
+                
+                completed = True
+            
+        except Exception as e:
+            if not isinstance(e, CircuitOpenError):
+                logger.error(f"Error streaming rationale: {str(e)}")
+            if not chunks:
+                yield f"Clause matched based on semantic similarity with confidence {matched_clause.get('confidence', 0.0)}"
+            
+        finally:
+            if stream is not None and not completed:
+                # Abort the upstream completion instead of draining it
+                await stream.response.aclose()
+                logger.info("Rationale stream closed before completion, upstream request aborted")
+            
+            # Streamed responses carry no usage block, so record an estimate
+            if stream is not None:
+                prompt_tokens = self.prompt_builder.counter.count_messages(system_prompt, user_prompt)
+                completion_tokens = self._estimate_tokens("".join(chunks))
+                self.token_usage["prompt_tokens"] += prompt_tokens
+                self.token_usage["completion_tokens"] += completion_tokens
+                self.token_usage["total_tokens"] += prompt_tokens + completion_tokens
+                record_llm_call(
+                    self.model, 
+                    "rationale_stream", 
+                    prompt_tokens, 
+                    completion_tokens, 
+                    (time.perf_counter() - started) * 1000, 
+                    estimated=True
+                )
+        
+        if completed and cache_key is not None:
+            await self.rationale_cache.put(cache_key, document_url, document_hash, self.model, "".join(chunks).strip())
+    
+    def _build_rationale_prompts(
+        self, 
+        user_query: str, 
+        matched_clause: Dict[str, Any], 
+        parsed_query: Dict[str, Any] = None, 
+        prompt_budget: int = None
+    ) -> Tuple[str, str]:
+        """Build the system and user prompts for a rationale within the prompt token budget"""
+        prompt = self.prompt_builder.build_rationale_prompt(user_query, matched_clause, parsed_query, prompt_budget)
+        
+        self.token_usage["prompt_tokens_saved"] += prompt["prompt_tokens_saved"]
+        record_prompt_tokens_saved(prompt["prompt_tokens_saved"])
+        if prompt["clause_trimmed"]:
+            logger.info(
+                f"Rationale prompt trimmed to {prompt['prompt_tokens']} tokens "
+                f"({prompt['prompt_tokens_saved']} saved)"
             )
+        
+        return prompt["system_prompt"], prompt["user_prompt"]
+    
+    async def _call_openai(
+        self, 
+        system_prompt: str, 
+        user_prompt: str, 
+        max_tokens: int = None, 
+        purpose: str = "completion",
+        response_format: Dict[str, str] = None
+    ) -> str:
+        """
+        Make OpenAI API call with token tracking
+        """
+        # JSON mode only when asked for, so free-text completions are unaffected
+        extra_arguments = {"response_format": response_format} if response_format is not None else {}
+        try:
+            # Cap in-flight LLM calls so a burst cannot exhaust the pool or rate limits
+            async with self._get_semaphore():
+                started = time.perf_counter()
+                # The client's own timeout covers the HTTP request; wait_for also bounds retries,
+                # so a hung call cannot hold its concurrency slot
+                response = await self.breaker.call(
+                    lambda: asyncio.wait_for(
+                        self._get_client().chat.completions.create(
+                            model=self.model,
+                            messages=[
+                                {"role": "system", "content": system_prompt},
+                                {"role": "user", "content": user_prompt}
+                            ],
+                            max_tokens=max_tokens or self.max_tokens,
+                            temperature=self.temperature,
+                            timeout=self.request_timeout,
+                            **extra_arguments
+                        ),
+                        timeout=self.request_timeout
+                    )
+                )
+                latency_ms = (time.perf_counter() - started) * 1000
             
-            # Track token usage
+            # Track process-wide token usage and attribute the call to the current request
             usage = response.usage
             self.token_usage["prompt_tokens"] += usage.prompt_tokens
             self.token_usage["completion_tokens"] += usage.completion_tokens
             self.token_usage["total_tokens"] += usage.total_tokens
+            record_llm_call(self.model, purpose, usage.prompt_tokens, usage.completion_tokens, latency_ms)
             
             return response.choices[0].message.content
             
+        except CircuitOpenError:
+            logger.warning("OpenAI circuit open, skipping LLM call")
+            raise
+            
         except Exception as e:
             logger.error(f"OpenAI API error: {str(e)}")
             raise
     
+    def _get_client(self):
+        """Get the async client, creating the shared pooled client on first use"""
+        if self.client is None:
+            self.client = get_async_client()
+        return self.client
+    
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Create the concurrency cap lazily so it binds to the running event loop"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+    
+    async def _try_local_parse(self, user_query: str, query_embedding=None) -> Optional[Dict[str, Any]]:
+        """
+        Parse locally when the classifier is confident enough to skip the LLM, reusing the
+        parse cache's embedding of the query so it is embedded once
+        """
+        if self.intent_classifier is None:
+            return None
+        
+        try:
+            classification = await self.intent_classifier.classify(user_query, query_embedding)
+        except Exception as e:
+            logger.warning(f"Local intent classification failed: {e}")
+            return None
+        
+        if classification["intent"] == GENERAL_INTENT or classification["confidence"] < self.local_confidence_threshold:
+            return None
+        
+        self.parse_stats["local"] += 1
+        clause_type = next(
+            (keyword for keyword, intent in QUERY_INTENT_MAPPING.items() if intent == classification["intent"]),
+            None
+        )
+        return {
+            "intent": classification["intent"],
+            "keywords": user_query.split(),
+            "clause_type": clause_type,
+            "context": user_query,
+            "parse_source": "local",
+            "local_confidence": round(classification["confidence"], 4)
+        }
+    
     def _fallback_parse(self, user_query: str) -> Dict[str, Any]:
         """
         Fallback parsing when LLM fails
         """
-        # Simple keyword-based parsing
-        query_lower = user_query.lower()
-        
-        intent_mapping = {
-            "termination": "find_termination_clause",
-            "payment": "find_payment_terms",
-            "liability": "find_liability_limits",
-            "confidentiality": "find_confidentiality_clause",
-            "non-compete": "find_non_compete_clause",
-            "intellectual property": "find_ip_clause",
-            "governing law": "find_governing_law",
-            "dispute": "find_dispute_resolution",
-            "force majeure": "find_force_majeure"
-        }
+        # Simple keyword-based parsing over a single automaton pass
+        keyword_hits = KEYWORD_AUTOMATON.find_hits(user_query)
         
         intent = "general_search"
         clause_type = None
         
-        for keyword, mapped_intent in intent_mapping.items():
-            if keyword in query_lower:
+        for keyword, mapped_intent in QUERY_INTENT_MAPPING.items():
+            if keyword in keyword_hits:
                 intent = mapped_intent
                 clause_type = keyword
                 break
         
+        self.parse_stats["fallback"] += 1
         return {
             "intent": intent,
             "keywords": user_query.split(),
             "clause_type": clause_type,
-            "context": user_query
+            "context": user_query,
+            "parse_source": "fallback"
+        }
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get parse cache hit-rate metrics"""
+        return self.query_cache.get_stats() if self.query_cache is not None else {}
+    
+    def get_rationale_cache_stats(self) -> Dict[str, Any]:
+        """Get rationale cache hit-rate metrics"""
+        return self.rationale_cache.get_stats() if self.rationale_cache is not None else {}
+    
+    def get_parse_stats(self) -> Dict[str, Any]:
+        """
+        Get how many parses were answered locally versus sent to the LLM. llm_question_rate is
+        the share of questions the LLM parsed; llm_call_rate is LLM calls per question, which
+        batching brings below llm_question_rate.
+        """
+        attempted = self.parse_stats["local"] + self.parse_stats["llm_questions"]
+        return {
+            **self.parse_stats,
+            "llm_question_rate": round(self.parse_stats["llm_questions"] / attempted, 4) if attempted else 0.0,
+            "llm_call_rate": round(self.parse_stats["llm_calls"] / attempted, 4) if attempted else 0.0,
+            "local_confidence_threshold": self.local_confidence_threshold,
+            "local_classifier": self.intent_classifier.get_stats() if self.intent_classifier is not None else None
         }
     
     def get_token_usage(self) -> Dict[str, int]:
-        """Get current token usage statistics"""
+        """Get process-wide token usage since startup (per-request usage lives on the request trace)"""
         return self.token_usage.copy()
     
     def reset_token_usage(self):
@@ -156,5 +665,11 @@ class LLMParser:
         self.token_usage = {
             "prompt_tokens": 0,
             "completion_tokens": 0,
-            "total_tokens": 0
-        } 
\ No newline at end of file
+            "total_tokens": 0,
+            "prompt_tokens_saved": 0
+        }
+    
+    async def close(self):
+        """Release the shared HTTP connection pool"""
+        await close_async_client()
+        self.client = None
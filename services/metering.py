@@ -0,0 +1,207 @@
+import hashlib
+import logging
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from config import Config
+from services.tracing import RequestTrace
+
+logger = logging.getLogger(__name__)
+
+# Upper bucket bounds for the per-model histograms; the last bucket is open-ended
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+TOKEN_BUCKETS = [64, 128, 256, 512, 1024, 2048, 4096, 8192]
+
+def tenant_key(token: str) -> str:
+    """Stable, non-reversible tenant identifier derived from an auth token"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+class Histogram:
+    """Fixed-bucket histogram with approximate percentiles"""
+
+    def __init__(self, bounds: List[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        """Add one observation"""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """
+        Upper bound of the bucket holding the given fraction of observations; in the
+        open-ended top bucket, the largest observation (always finite, so JSON-safe)
+        """
+        if not self.total:
+            return None
+        rank = fraction * self.total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.bounds[index] if index < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Bucket counts keyed by upper bound plus summary statistics"""
+        labels = [f"le_{bound}" for bound in self.bounds] + ["gt_" + str(self.bounds[-1])]
+        return {
+            "count": self.total,
+            "mean": round(self.sum / self.total, 3) if self.total else 0.0,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "max": self.max,
+            "overflow": self.counts[-1],
+            "buckets": dict(zip(labels, self.counts))
+        }
+
+class TokenMeter:
+    """
+    Aggregates per-request LLM usage by tenant and by question intent over rolling
+    time windows, and keeps latency/token histograms per model
+    """
+
+    def __init__(
+        self,
+        bucket_seconds: int = Config.METERING_BUCKET_SECONDS,
+        retention_seconds: int = Config.METERING_RETENTION_SECONDS
+    ):
+        self.bucket_seconds = max(1, bucket_seconds)
+        self.retention_seconds = max(self.bucket_seconds, retention_seconds)
+
+        # Time-ordered (bucket_start, {(tenant, intent): usage}) pairs
+        self._buckets: Deque[List[Any]] = deque()
+
+        self._latency_histograms: Dict[str, Histogram] = defaultdict(lambda: Histogram(LATENCY_BUCKETS_MS))
+        self._token_histograms: Dict[str, Histogram] = defaultdict(lambda: Histogram(TOKEN_BUCKETS))
+
+    def record_request(
+        self,
+        trace: RequestTrace,
+        intent: str = None,
+        questions: int = 1,
+        intents: List[str] = None,
+        failed: bool = False
+    ):
+        """
+        Fold a finished request's LLM calls into the tenant, intent and model aggregates.
+        A batch passes the intent of every question; its LLM usage is split across those
+        intents in proportion to their number of questions. Failed requests are metered
+        too, since their LLM tokens were spent. A trace is only ever metered once.
+        """
+        if trace.metered:
+            return
+        trace.metered = True
+
+        tenant = trace.tenant or "anonymous"
+        if intents:
+            question_counts = Counter(question_intent or "unknown" for question_intent in intents)
+        else:
+            question_counts = {intent or "unknown": questions}
+        total_questions = sum(question_counts.values())
+
+        entries = self._current_bucket()[1]
+        for question_intent, count in question_counts.items():
+            share = count / total_questions if total_questions else 1.0
+            usage = entries.setdefault((tenant, question_intent), self._empty_usage())
+
+            usage["requests"] += share
+            usage["questions"] += count
+            if failed:
+                usage["failed_requests"] += share
+            for call in trace.llm_calls:
+                usage["llm_calls"] += share
+                usage["prompt_tokens"] += call["prompt_tokens"] * share
+                usage["completion_tokens"] += call["completion_tokens"] * share
+                usage["total_tokens"] += call["total_tokens"] * share
+                usage["llm_latency_ms"] += call["latency_ms"] * share
+
+        for call in trace.llm_calls:
+            self._latency_histograms[call["model"]].observe(call["latency_ms"])
+            self._token_histograms[call["model"]].observe(call["total_tokens"])
+
+    def get_usage(self, window_seconds: int = None) -> Dict[str, Any]:
+        """Usage per tenant and per intent over the trailing window, plus per-model histograms since startup"""
+        window_seconds = self.retention_seconds if window_seconds is None else min(window_seconds, self.retention_seconds)
+        self._expire()
+
+        cutoff = self._bucket_start(time.time() - window_seconds)
+        tenants: Dict[str, Dict[str, Any]] = {}
+        intents: Dict[str, Dict[str, Any]] = {}
+
+        for bucket_start, entries in self._buckets:
+            if bucket_start < cutoff:
+                continue
+            for (tenant, intent), usage in entries.items():
+                tenant_usage = tenants.setdefault(tenant, {**self._empty_usage(), "intents": {}})
+                self._add_usage(tenant_usage, usage)
+                self._add_usage(tenant_usage["intents"].setdefault(intent, self._empty_usage()), usage)
+                self._add_usage(intents.setdefault(intent, self._empty_usage()), usage)
+
+        for tenant_usage in tenants.values():
+            self._round_usage(tenant_usage)
+            for usage in tenant_usage["intents"].values():
+                self._round_usage(usage)
+        for usage in intents.values():
+            self._round_usage(usage)
+
+        return {
+            "window_seconds": window_seconds,
+            "tenants": tenants,
+            "intents": intents,
+            "models": {
+                model: {
+                    "latency_ms": self._latency_histograms[model].to_dict(),
+                    "total_tokens": self._token_histograms[model].to_dict()
+                }
+                for model in self._latency_histograms
+            }
+        }
+
+    def _current_bucket(self) -> List[Any]:
+        """The bucket for the current time, opening a new one when the period rolls over"""
+        bucket_start = self._bucket_start(time.time())
+        if not self._buckets or self._buckets[-1][0] != bucket_start:
+            self._buckets.append([bucket_start, {}])
+            self._expire()
+        return self._buckets[-1]
+
+    def _expire(self):
+        """Drop buckets older than the retention period"""
+        cutoff = self._bucket_start(time.time() - self.retention_seconds)
+        while self._buckets and self._buckets[0][0] < cutoff:
+            self._buckets.popleft()
+
+    def _bucket_start(self, timestamp: float) -> int:
+        """Start of the bucket containing a timestamp"""
+        return int(timestamp // self.bucket_seconds) * self.bucket_seconds
+
+    def _empty_usage(self) -> Dict[str, Any]:
+        return {
+            "requests": 0,
+            "failed_requests": 0,
+            "questions": 0,
+            "llm_calls": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "total_tokens": 0,
+            "llm_latency_ms": 0.0
+        }
+
+    def _add_usage(self, target: Dict[str, Any], usage: Dict[str, Any]):
+        for field in self._empty_usage():
+            target[field] += usage[field]
+
+    def _round_usage(self, usage: Dict[str, Any]):
+        """Batch shares are fractional; report whole numbers where they add up to one"""
+        for field in self._empty_usage():
+            value = round(usage[field], 3)
+            usage[field] = int(value) if field != "llm_latency_ms" and float(value).is_integer() else value
@@ -0,0 +1,40 @@
+import logging
+from typing import Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[AsyncOpenAI] = None
+
+def get_async_client() -> AsyncOpenAI:
+    """Get the process-wide async OpenAI client backed by one pooled HTTP client"""
+    global _client
+    if _client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=Config.OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.OPENAI_MAX_CONNECTIONS
+            ),
+            timeout=Config.PROCESSING_TIMEOUT
+        )
+        _client = AsyncOpenAI(
+            api_key=Config.OPENAI_API_KEY,
+            base_url=Config.OPENAI_BASE_URL or None,
+            http_client=http_client,
+            timeout=Config.PROCESSING_TIMEOUT,
+            max_retries=Config.OPENAI_MAX_RETRIES
+        )
+        logger.info(f"Async OpenAI client created with a pool of {Config.OPENAI_MAX_CONNECTIONS} connections")
+    return _client
+
+async def close_async_client():
+    """Close the shared client and its connection pool"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+        logger.info("Async OpenAI client closed")
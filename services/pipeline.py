@@ -0,0 +1,58 @@
+import asyncio
+import inspect
+import logging
+from typing import Any, Callable, Dict, Sequence, Tuple
+
+from services.tracing import trace_stage
+
+logger = logging.getLogger(__name__)
+
+class StagePipeline:
+    """
+    A small dependency graph of request stages executed with asyncio. Every stage starts
+    as soon as the stages it depends on have finished, so independent stages overlap.
+    Each stage's start and end are recorded on the current request trace.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._stages: Dict[str, Tuple[Callable[..., Any], Tuple[str, ...]]] = {}
+
+    def stage(self, name: str, fn: Callable[..., Any], depends_on: Sequence[str] = ()) -> "StagePipeline":
+        """
+        Add a stage. fn receives the results of depends_on as positional arguments, in order,
+        and may be sync or async. Dependencies must be added first, which keeps the graph acyclic.
+        """
+        if name in self._stages:
+            raise ValueError(f"Duplicate pipeline stage: {name}")
+        missing = [dependency for dependency in depends_on if dependency not in self._stages]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on unknown stages: {missing}")
+
+        self._stages[name] = (fn, tuple(depends_on))
+        return self
+
+    async def run(self) -> Dict[str, Any]:
+        """Run every stage and return their results by name; the first failure cancels the rest"""
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(name: str, fn: Callable[..., Any], depends_on: Tuple[str, ...]) -> Any:
+            inputs = [await tasks[dependency] for dependency in depends_on]
+            with trace_stage(name):
+                result = fn(*inputs)
+                if inspect.isawaitable(result):
+                    result = await result
+            return result
+
+        for name, (fn, depends_on) in self._stages.items():
+            tasks[name] = asyncio.ensure_future(run_stage(name, fn, depends_on))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        return {name: task.result() for name, task in tasks.items()}
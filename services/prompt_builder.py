@@ -0,0 +1,167 @@
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from config import Config
+from services.span_extractor import TOKEN_PATTERN, STOPWORDS, sentence_bounds
+
+logger = logging.getLogger(__name__)
+
+# Marker placed where sentences were dropped from the clause
+ELISION = "…"
+
+RATIONALE_SYSTEM_PROMPT = (
+    "You are an expert legal analyst. Explain why a specific clause matches a user's query. "
+    "Provide clear, concise reasoning that connects the user's question to the matched clause. "
+    "Focus on legal relevance and practical implications."
+)
+
+class TokenCounter:
+    """Counts tokens with the model's tiktoken encoding, or a character heuristic when tiktoken is not installed"""
+
+    def __init__(self, model: str = Config.LLM_MODEL):
+        self.model = model
+
+        try:
+            import tiktoken
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning(f"tiktoken unavailable, estimating token counts: {e}")
+            self.encoding = None
+
+    def count(self, text: str) -> int:
+        """Number of tokens in a text"""
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        # About four characters per token for English prose
+        return len(text) // 4 + 1
+
+    def count_messages(self, system_prompt: str, user_prompt: str) -> int:
+        """Prompt tokens for a system + user chat request, including per-message framing"""
+        return self.count(system_prompt) + self.count(user_prompt) + 8
+
+class PromptBuilder:
+    """Assembles LLM prompts within a token budget, trimming the matched clause to its most relevant sentences"""
+
+    def __init__(
+        self,
+        model: str = Config.LLM_MODEL,
+        prompt_budget: int = Config.RATIONALE_PROMPT_TOKENS,
+        counter: TokenCounter = None
+    ):
+        self.model = model
+        self.prompt_budget = prompt_budget
+        self.counter = counter or TokenCounter(model)
+
+    def build_rationale_prompt(
+        self,
+        user_query: str,
+        matched_clause: Dict[str, Any],
+        parsed_query: Optional[Dict[str, Any]] = None,
+        prompt_budget: int = None
+    ) -> Dict[str, Any]:
+        """
+        Build the rationale prompts within the prompt token budget. Returns the system and
+        user prompts, their token count and the tokens saved against the untrimmed prompt.
+        """
+        prompt_budget = self.prompt_budget if prompt_budget is None else prompt_budget
+        clause_text = matched_clause.get('text', '')
+
+        untrimmed_tokens = self.counter.count_messages(
+            RATIONALE_SYSTEM_PROMPT,
+            self._rationale_user_prompt(user_query, clause_text, matched_clause)
+        )
+
+        # Everything but the clause is fixed; the clause gets whatever budget is left
+        frame = self._rationale_user_prompt(user_query, "", matched_clause)
+        frame_tokens = self.counter.count_messages(RATIONALE_SYSTEM_PROMPT, frame)
+        clause_budget = max(prompt_budget - frame_tokens, 0)
+
+        keywords = list((parsed_query or {}).get("keywords") or [])
+        trimmed_clause = self.trim_to_budget(clause_text, clause_budget, user_query, keywords)
+
+        user_prompt = self._rationale_user_prompt(user_query, trimmed_clause, matched_clause)
+        prompt_tokens = self.counter.count_messages(RATIONALE_SYSTEM_PROMPT, user_prompt)
+
+        return {
+            "system_prompt": RATIONALE_SYSTEM_PROMPT,
+            "user_prompt": user_prompt,
+            "prompt_tokens": prompt_tokens,
+            "prompt_tokens_saved": max(untrimmed_tokens - prompt_tokens, 0),
+            "clause_trimmed": trimmed_clause != self._collapse_whitespace(clause_text)
+        }
+
+    def trim_to_budget(self, text: str, token_budget: int, user_query: str, keywords: List[str] = None) -> str:
+        """
+        Keep the sentences most relevant to the query, in document order, until the token
+        budget is spent. Dropped runs of sentences are marked with an ellipsis.
+        """
+        text = self._collapse_whitespace(text)
+        if self.counter.count(text) <= token_budget:
+            return text
+
+        sentences = [text[start:end] for start, end, _ in sentence_bounds(text)]
+        if not sentences:
+            return ""
+
+        query_terms = self._terms(" ".join([user_query] + list(keywords or [])))
+        relevance = [
+            (len(query_terms & self._terms(sentence)), -position)
+            for position, sentence in enumerate(sentences)
+        ]
+        ranked = sorted(range(len(sentences)), key=lambda position: relevance[position], reverse=True)
+
+        kept = set()
+        used_tokens = 0
+        elision_tokens = self.counter.count(ELISION)
+        for position in ranked:
+            sentence_tokens = self.counter.count(sentences[position]) + elision_tokens
+            if used_tokens + sentence_tokens > token_budget:
+                continue
+            kept.add(position)
+            used_tokens += sentence_tokens
+
+        if ranked[0] not in kept:
+            # The most relevant sentence does not fit on its own: hard-truncate it by words
+            words = sentences[ranked[0]].split()
+            while words and self.counter.count(" ".join(words)) > token_budget:
+                words = words[:min(len(words) * 3 // 4, len(words) - 1)]
+            return " ".join(words)
+
+        parts = []
+        previous = -1
+        for position in sorted(kept):
+            if position != previous + 1:
+                parts.append(ELISION)
+            parts.append(sentences[position])
+            previous = position
+        if previous != len(sentences) - 1:
+            parts.append(ELISION)
+
+        return " ".join(parts)
+
+    def _rationale_user_prompt(self, user_query: str, clause_text: str, matched_clause: Dict[str, Any]) -> str:
+        """User prompt for a rationale with the given clause text"""
+        return (
+            f"User Query: {user_query}\n"
+            f"Matched Clause: {clause_text}\n"
+            f"Clause Location: {matched_clause.get('location', '')}\n"
+            f"Confidence Score: {matched_clause.get('confidence', 0.0)}\n"
+            "Explain why this clause is the best match for the user's query."
+        )
+
+    def _collapse_whitespace(self, text: str) -> str:
+        """Collapse runs of whitespace left over from PDF extraction"""
+        return re.sub(r'\s+', ' ', text or "").strip()
+
+    def _terms(self, text: str) -> set:
+        """Content words of a text"""
+        return {
+            token for token in TOKEN_PATTERN.findall(text.lower())
+            if token not in STOPWORDS and len(token) > 2
+        }
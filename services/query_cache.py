@@ -0,0 +1,165 @@
+import copy
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class ParsedQueryCache:
+    """Caches parsed queries by exact normalised text, then by embedding near-duplicates"""
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], Awaitable[np.ndarray]] = None,
+        max_entries: int = Config.PARSE_CACHE_SIZE,
+        ttl_seconds: float = Config.PARSE_CACHE_TTL_SECONDS,
+        similarity_threshold: float = Config.PARSE_CACHE_SIMILARITY
+    ):
+        self.embed_fn = embed_fn
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+
+        # Normalised query -> {"parsed", "expires", "embedding"}, least recently used first
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._matrix = None
+        self._matrix_keys: List[str] = []
+
+        self.stats = {
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0
+        }
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Normalise case, whitespace and trailing punctuation"""
+        return re.sub(r'\s+', ' ', query.lower()).strip().rstrip('?.!')
+
+    async def lookup(self, query: str) -> Tuple[Optional[Dict[str, Any]], Optional[np.ndarray]]:
+        """
+        Find a cached parse for the query. Returns (parse, query embedding); the embedding
+        is computed for the semantic tier and can be handed back to store() on a miss.
+        """
+        key = self.normalize(query)
+        now = time.monotonic()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry["expires"] > now:
+                self._entries.move_to_end(key)
+                self.stats["exact_hits"] += 1
+                return copy.deepcopy(entry["parsed"]), entry["embedding"]
+            self._remove(key)
+            self.stats["expirations"] += 1
+
+        embedding = None
+        if self.embed_fn is not None:
+            try:
+                embedding = await self._embed(key)
+                match_key = self._find_semantic_match(embedding, now)
+                if match_key is not None:
+                    self._entries.move_to_end(match_key)
+                    self.stats["semantic_hits"] += 1
+                    logger.info(f"Semantic parse cache hit: '{key}' ~ '{match_key}'")
+                    return self._adapt_parse(query, self._entries[match_key]["parsed"]), embedding
+            except Exception as e:
+                logger.warning(f"Semantic parse cache lookup failed: {e}")
+
+        self.stats["misses"] += 1
+        return None, embedding
+
+    @staticmethod
+    def _adapt_parse(query: str, cached: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Reuse only the intent and clause type of a near-duplicate's parse; keywords and
+        context describe the other question, so they are rebuilt from this one
+        """
+        return {
+            "intent": cached.get("intent"),
+            "keywords": query.split(),
+            "clause_type": cached.get("clause_type"),
+            "context": query,
+            "parse_source": "cache"
+        }
+
+    async def store(self, query: str, parsed_query: Dict[str, Any], embedding: Optional[np.ndarray] = None):
+        """Cache a parse, evicting the least recently used entry when full"""
+        key = self.normalize(query)
+
+        if embedding is None and self.embed_fn is not None:
+            try:
+                embedding = await self._embed(key)
+            except Exception as e:
+                logger.warning(f"Could not embed query for parse cache: {e}")
+
+        if key in self._entries:
+            self._remove(key)
+
+        while len(self._entries) >= self.max_entries:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.stats["evictions"] += 1
+
+        self._entries[key] = {
+            "parsed": copy.deepcopy(parsed_query),
+            "expires": time.monotonic() + self.ttl_seconds,
+            "embedding": embedding
+        }
+        self._matrix = None
+
+    async def _embed(self, text: str) -> np.ndarray:
+        """Embed and L2-normalise a single normalised query"""
+        vector = np.asarray(await self.embed_fn([text]), dtype=np.float32)[0]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _find_semantic_match(self, embedding: np.ndarray, now: float) -> Optional[str]:
+        """Return the most similar live entry above the similarity threshold"""
+        if self._matrix is None or self._matrix.shape[1] != embedding.shape[0]:
+            # Only entries embedded by the same model (e.g. not during an embeddings fallback) are comparable
+            self._matrix_keys = [
+                key for key, entry in self._entries.items()
+                if entry["embedding"] is not None and entry["embedding"].shape == embedding.shape
+            ]
+            if not self._matrix_keys:
+                self._matrix = None
+                return None
+            self._matrix = np.vstack([self._entries[key]["embedding"] for key in self._matrix_keys])
+
+        similarities = self._matrix @ embedding
+        for index in np.argsort(-similarities):
+            if similarities[index] < self.similarity_threshold:
+                return None
+            key = self._matrix_keys[index]
+            if self._entries[key]["expires"] > now:
+                return key
+            self._remove(key)
+            self.stats["expirations"] += 1
+            return None
+        return None
+
+    def _remove(self, key: str):
+        """Drop an entry and invalidate the similarity matrix"""
+        self._entries.pop(key, None)
+        self._matrix = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit-rate metrics for the exact and semantic tiers"""
+        lookups = self.stats["exact_hits"] + self.stats["semantic_hits"] + self.stats["misses"]
+        hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+        return {
+            **self.stats,
+            "size": len(self._entries),
+            "lookups": lookups,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "semantic_hit_rate": round(self.stats["semantic_hits"] / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,116 @@
+import hashlib
+import logging
+import re
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+def content_hash(text: str) -> str:
+    """SHA-256 hex digest of a text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class RationaleCache:
+    """In-memory LRU of decision rationales backed by the database so entries survive restarts"""
+
+    def __init__(self, db_service=None, max_entries: int = Config.RATIONALE_CACHE_SIZE):
+        self.db_service = db_service
+        self.max_entries = max_entries
+
+        # Cache key -> {"rationale", "document_url", "document_hash"}
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Document URL -> latest content hash, least recently registered first; a forgotten
+        # URL is simply re-checked against the store the next time it is registered
+        self._document_hashes: "OrderedDict[str, str]" = OrderedDict()
+
+        self.stats = {
+            "memory_hits": 0,
+            "store_hits": 0,
+            "misses": 0,
+            "invalidations": 0
+        }
+
+    def build_key(self, user_query: str, parsed_query: Optional[Dict[str, Any]], clause_text: str, model: str) -> str:
+        """Key on the parsed intent (or normalised query), the matched clause content and the model"""
+        intent = (parsed_query or {}).get("intent")
+        if intent and intent != "general_search":
+            query_key = f"intent:{intent}"
+        else:
+            query_key = "query:" + re.sub(r'\s+', ' ', user_query.lower()).strip().rstrip('?.!')
+
+        return content_hash(f"{model}|{query_key}|{content_hash(clause_text)}")
+
+    async def register_document(self, document_url: str, document_hash: str):
+        """Record a document's content hash, invalidating rationales from older versions"""
+        previous_hash = self._document_hashes.get(document_url)
+        self._document_hashes[document_url] = document_hash
+        self._document_hashes.move_to_end(document_url)
+        while len(self._document_hashes) > self.max_entries:
+            self._document_hashes.popitem(last=False)
+
+        if previous_hash == document_hash:
+            return
+
+        stale_keys = [
+            key for key, entry in self._entries.items()
+            if entry["document_url"] == document_url and entry["document_hash"] != document_hash
+        ]
+        for key in stale_keys:
+            del self._entries[key]
+
+        invalidated = len(stale_keys)
+        if self.db_service is not None:
+            invalidated += await self.db_service.invalidate_rationales(document_url, document_hash)
+
+        if invalidated:
+            self.stats["invalidations"] += invalidated
+            logger.info(f"Document content changed, invalidated rationales for: {document_url}")
+
+    async def get(self, cache_key: str, document_hash: str) -> Optional[str]:
+        """Return a cached rationale for the current document version, if any"""
+        entry = self._entries.get(cache_key)
+        if entry is not None and entry["document_hash"] == document_hash:
+            self._entries.move_to_end(cache_key)
+            self.stats["memory_hits"] += 1
+            return entry["rationale"]
+
+        if self.db_service is not None:
+            stored = await self.db_service.get_cached_rationale(cache_key)
+            if stored is not None and stored["document_hash"] == document_hash:
+                self._remember(cache_key, stored)
+                self.stats["store_hits"] += 1
+                return stored["rationale"]
+
+        self.stats["misses"] += 1
+        return None
+
+    async def put(self, cache_key: str, document_url: str, document_hash: str, model: str, rationale: str):
+        """Cache a rationale in memory and in the backing store"""
+        self._remember(cache_key, {
+            "rationale": rationale,
+            "document_url": document_url,
+            "document_hash": document_hash
+        })
+
+        if self.db_service is not None:
+            await self.db_service.store_rationale(cache_key, document_url, document_hash, model, rationale)
+
+    def _remember(self, cache_key: str, entry: Dict[str, Any]):
+        """Insert into the in-memory LRU, evicting the oldest entry when full"""
+        self._entries[cache_key] = entry
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit-rate metrics for the rationale cache"""
+        lookups = self.stats["memory_hits"] + self.stats["store_hits"] + self.stats["misses"]
+        hits = self.stats["memory_hits"] + self.stats["store_hits"]
+        return {
+            **self.stats,
+            "size": len(self._entries),
+            "documents": len(self._document_hashes),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+        }
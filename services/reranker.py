@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import math
+import time
+from typing import List, Dict, Any, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class CrossEncoderReranker:
+    """Re-ranks retrieval candidates with a small local cross-encoder under a latency budget"""
+
+    def __init__(
+        self,
+        model_name: str = Config.RERANK_MODEL,
+        batch_size: int = Config.RERANK_BATCH_SIZE,
+        budget_ms: float = Config.RERANK_BUDGET_MS
+    ):
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.budget_ms = budget_ms
+
+        try:
+            from sentence_transformers import CrossEncoder
+            self.model = CrossEncoder(model_name, device="cpu", max_length=512)
+        except Exception as e:
+            logger.warning(f"Could not load cross-encoder, re-ranking disabled: {e}")
+            self.model = None
+
+    def is_available(self) -> bool:
+        """Check whether the cross-encoder model loaded"""
+        return self.model is not None
+
+    async def rerank(
+        self,
+        query_texts: List[str],
+        candidate_lists: List[List[Dict[str, Any]]],
+        budget_ms: float = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Score (query, segment) pairs with the cross-encoder until the budget runs out.
+        Candidates must be in heuristic order; each scored candidate gets a rerank_score
+        and unscored candidates keep their position. Returns per-query re-ranking stats.
+        """
+        budget_ms = self.budget_ms if budget_ms is None else budget_ms
+
+        if not self.is_available():
+            return [self._build_stats(len(candidates), 0, budget_ms, 0.0, False) for candidates in candidate_lists]
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None,
+            self._rerank_within_budget,
+            query_texts,
+            candidate_lists,
+            budget_ms
+        )
+
+    def _rerank_within_budget(
+        self,
+        query_texts: List[str],
+        candidate_lists: List[List[Dict[str, Any]]],
+        budget_ms: float
+    ) -> List[Dict[str, Any]]:
+        """Run batched CPU inference, stopping before a batch would overrun the budget"""
+        start_time = time.perf_counter()
+        deadline = start_time + budget_ms / 1000.0
+
+        # Interleave by rank so every query gets its top candidates scored first
+        pairs: List[Tuple[int, Dict[str, Any]]] = []
+        max_depth = max((len(candidates) for candidates in candidate_lists), default=0)
+        for rank in range(max_depth):
+            for query_index, candidates in enumerate(candidate_lists):
+                if rank < len(candidates):
+                    pairs.append((query_index, candidates[rank]))
+
+        reranked_counts = [0] * len(candidate_lists)
+        budget_exhausted = False
+        last_batch_seconds = 0.0
+
+        for batch_start in range(0, len(pairs), self.batch_size):
+            now = time.perf_counter()
+            if now + last_batch_seconds > deadline:
+                budget_exhausted = True
+                break
+
+            batch = pairs[batch_start:batch_start + self.batch_size]
+            inputs = [
+                (query_texts[query_index], match["segment"].get("text", ""))
+                for query_index, match in batch
+            ]
+
+            try:
+                scores = self.model.predict(inputs, batch_size=len(inputs), show_progress_bar=False)
+            except Exception as e:
+                logger.error(f"Cross-encoder inference failed: {str(e)}")
+                break
+
+            for (query_index, match), score in zip(batch, scores):
+                match["rerank_score"] = 1.0 / (1.0 + math.exp(-float(score)))
+                match["scoring_factors"]["rerank_score"] = match["rerank_score"]
+                reranked_counts[query_index] += 1
+
+            last_batch_seconds = time.perf_counter() - now
+
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        if budget_exhausted:
+            logger.info(f"Re-ranking budget of {budget_ms}ms exhausted after {sum(reranked_counts)} candidates")
+
+        return [
+            self._build_stats(len(candidates), reranked_counts[query_index], budget_ms, elapsed_ms, budget_exhausted)
+            for query_index, candidates in enumerate(candidate_lists)
+        ]
+
+    def _build_stats(
+        self,
+        candidates: int,
+        reranked: int,
+        budget_ms: float,
+        elapsed_ms: float,
+        budget_exhausted: bool
+    ) -> Dict[str, Any]:
+        """Describe how much of a candidate list was re-ranked"""
+        return {
+            "model": self.model_name,
+            "candidates": candidates,
+            "reranked": reranked,
+            "budget_ms": budget_ms,
+            "elapsed_ms": round(elapsed_ms, 2),
+            "budget_exhausted": budget_exhausted
+        }
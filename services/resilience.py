@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Every circuit breaker by name, for the /stats endpoint
+_breakers: Dict[str, "CircuitBreaker"] = {}
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream after a spike of errors or slow calls so requests fail over
+    to local fallbacks immediately instead of queueing behind timeouts. After open_seconds
+    a single probe call is let through; its outcome closes or re-opens the circuit.
+
+    Optionally hedges: when a call has not finished after the recent p95 latency, a second
+    identical call is started and whichever finishes first wins.
+
+    Callers that do not go through call() use check() to be admitted and pass the token it
+    returns to record() or release_probe(); only the probe's outcome changes a half-open
+    circuit, so a call admitted while closed that finishes during the probe cannot close it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = Config.BREAKER_FAILURE_RATE,
+        window_size: int = Config.BREAKER_WINDOW_SIZE,
+        min_calls: int = Config.BREAKER_MIN_CALLS,
+        slow_call_ms: float = Config.BREAKER_SLOW_CALL_MS,
+        open_seconds: float = Config.BREAKER_OPEN_SECONDS,
+        hedge: bool = Config.HEDGE_ENABLED,
+        hedge_min_delay_ms: float = Config.HEDGE_MIN_DELAY_MS
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.slow_call_ms = slow_call_ms
+        self.open_seconds = open_seconds
+        self.hedge = hedge
+        self.hedge_min_delay_ms = hedge_min_delay_ms
+
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        # Token of the half-open probe in flight, if any
+        self._probe: Optional[object] = None
+
+        # Recent outcomes as (latency_ms, failed) and recent successful latencies
+        self._outcomes: Deque[Tuple[float, bool]] = deque(maxlen=window_size)
+        self._latencies: Deque[float] = deque(maxlen=max(window_size, 100))
+
+        self.stats = {
+            "calls": 0,
+            "failures": 0,
+            "slow_calls": 0,
+            "rejected": 0,
+            "opened": 0,
+            "hedged": 0,
+            "hedge_wins": 0
+        }
+        _breakers[name] = self
+
+    async def call(self, fn: Callable[[], Awaitable[Any]], hedge: bool = None) -> Any:
+        """Run fn() through the breaker, hedging it when enabled"""
+        probe = self.check()
+        hedge = self.hedge if hedge is None else hedge
+
+        started = time.perf_counter()
+        try:
+            if hedge and probe is None and self.state == self.CLOSED:
+                result = await self._hedged(fn)
+            else:
+                result = await fn()
+        except asyncio.CancelledError:
+            self.release_probe(probe)
+            raise
+        except Exception:
+            self.record((time.perf_counter() - started) * 1000, failed=True, probe=probe)
+            raise
+
+        self.record((time.perf_counter() - started) * 1000, failed=False, probe=probe)
+        return result
+
+    def check(self) -> Optional[object]:
+        """
+        Raise CircuitOpenError unless a call may go upstream now. Returns a probe token when
+        the call is the half-open probe, otherwise None.
+        """
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                self.stats["rejected"] += 1
+                raise CircuitOpenError(f"Circuit '{self.name}' is open")
+            self.state = self.HALF_OPEN
+            logger.info(f"Circuit '{self.name}' half-open, probing upstream")
+
+        if self.state == self.HALF_OPEN:
+            if self._probe is not None:
+                self.stats["rejected"] += 1
+                raise CircuitOpenError(f"Circuit '{self.name}' is probing")
+            self._probe = object()
+            return self._probe
+        return None
+
+    def record(self, latency_ms: float, failed: bool, probe: Optional[object] = None):
+        """
+        Record one upstream call outcome and trip the circuit, or for the half-open probe
+        (identified by the token check() returned) close or re-open it
+        """
+        slow = latency_ms >= self.slow_call_ms
+        self.stats["calls"] += 1
+        self.stats["failures"] += int(failed)
+        self.stats["slow_calls"] += int(slow and not failed)
+        if not failed:
+            self._latencies.append(latency_ms)
+
+        if probe is not None:
+            if probe is not self._probe:
+                return
+            self._probe = None
+            if failed or slow:
+                self._open()
+            else:
+                self.state = self.CLOSED
+                self._outcomes.clear()
+                logger.info(f"Circuit '{self.name}' closed, upstream recovered")
+            return
+
+        self._outcomes.append((latency_ms, failed or slow))
+        if self.state == self.CLOSED and len(self._outcomes) >= self.min_calls:
+            bad = sum(1 for _, is_bad in self._outcomes if is_bad)
+            if bad / len(self._outcomes) >= self.failure_rate:
+                self._open()
+
+    def latency_percentile(self, fraction: float) -> Optional[float]:
+        """Percentile of recent successful call latencies"""
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+    async def _hedged(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Start a second attempt if the first outlives the recent p95 latency; first success wins"""
+        p95 = self.latency_percentile(0.95)
+        if p95 is None or len(self._latencies) < self.min_calls:
+            return await fn()
+
+        primary = asyncio.ensure_future(fn())
+        attempts = {primary}
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=max(p95, self.hedge_min_delay_ms) / 1000.0)
+            if not done:
+                self.stats["hedged"] += 1
+                attempts.add(asyncio.ensure_future(fn()))
+
+            pending = set(attempts)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        self.stats["hedge_wins"] += int(attempt is not primary)
+                        return attempt.result()
+                    error = attempt.exception()
+            raise error
+        finally:
+            # The losing attempt (or both, if the caller was cancelled) is abandoned
+            for attempt in attempts:
+                if not attempt.done():
+                    attempt.cancel()
+
+    def _open(self):
+        """Trip the circuit"""
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self.stats["opened"] += 1
+        logger.warning(f"Circuit '{self.name}' opened, using local fallbacks for {self.open_seconds}s")
+
+    def release_probe(self, probe: Optional[object]):
+        """Let another probe through if the half-open probe was cancelled"""
+        if probe is not None and probe is self._probe:
+            self._probe = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Breaker state, outcome counters and recent latency percentiles"""
+        p50 = self.latency_percentile(0.5)
+        p95 = self.latency_percentile(0.95)
+        return {
+            **self.stats,
+            "state": self.state,
+            "p50_ms": round(p50, 3) if p50 is not None else None,
+            "p95_ms": round(p95, 3) if p95 is not None else None
+        }
+
+def get_breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """State and counters of every circuit breaker"""
+    return {name: breaker.get_stats() for name, breaker in _breakers.items()}
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class RetentionScheduler:
+    """
+    Periodically purges interactions older than the retention period. Each run deletes in
+    bounded batches with pauses (see DatabaseService.cleanup_old_interactions), so a large
+    purge never holds a long lock on the interaction table during traffic.
+    """
+
+    def __init__(
+        self,
+        db_service,
+        retention_days: int = Config.RETENTION_DAYS,
+        interval_seconds: float = Config.RETENTION_INTERVAL_SECONDS,
+        batch_size: int = Config.RETENTION_BATCH_SIZE,
+        pause_ms: float = Config.RETENTION_PAUSE_MS
+    ):
+        self.db_service = db_service
+        self.retention_days = retention_days
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.pause_ms = pause_ms
+
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {
+            "runs": 0,
+            "deleted": 0,
+            "last_run_ms": None,
+            "last_deleted": None
+        }
+
+    async def start(self):
+        """Start the scheduler unless retention is disabled"""
+        if self._task is None and self.retention_days > 0:
+            self._task = asyncio.ensure_future(self._run())
+            logger.info(f"Retention scheduler started ({self.retention_days} days, every {self.interval_seconds:.0f}s)")
+
+    async def run_once(self) -> int:
+        """Purge expired interactions now"""
+        started = time.perf_counter()
+        deleted = await self.db_service.cleanup_old_interactions(
+            days_old=self.retention_days,
+            batch_size=self.batch_size,
+            pause_ms=self.pause_ms
+        )
+        self.stats["runs"] += 1
+        self.stats["deleted"] += deleted
+        self.stats["last_deleted"] = deleted
+        self.stats["last_run_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return deleted
+
+    async def close(self):
+        """Stop the scheduler, abandoning a run in progress between batches"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval_seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Purge counters"""
+        return {**self.stats, "retention_days": self.retention_days}
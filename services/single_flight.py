@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from services.tracing import RequestTrace, attribute_shared_work, bind_trace
+
+logger = logging.getLogger(__name__)
+
+# Every SingleFlight group by name, for the /stats endpoint
+_groups: Dict[str, "SingleFlight"] = {}
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution whose result every
+    caller shares. The shared work runs in its own task, so a caller that is cancelled
+    (e.g. a disconnected client) does not cancel it for the others.
+
+    The shared work is traced on its own; its stages and LLM calls are then copied onto the
+    trace of every caller, so each request is metered for the usage it waited on. Joining
+    callers' copies are marked coalesced.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, Tuple[asyncio.Task, RequestTrace]] = {}
+        self.stats = {
+            "executions": 0,
+            "coalesced": 0,
+            "errors": 0
+        }
+        _groups[name] = self
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[Any]],
+        copy_result: Optional[Callable[[Any], Any]] = None
+    ) -> Any:
+        """
+        Run fn() unless an identical call is already in flight, in which case wait for its
+        result. copy_result gives each caller its own copy of a result it might mutate.
+        """
+        flight = self._in_flight.get(key)
+        coalesced = flight is not None
+        if coalesced:
+            task, shared_trace = flight
+            self.stats["coalesced"] += 1
+            logger.debug(f"Coalesced {self.name} call onto in-flight work")
+        else:
+            shared_trace = RequestTrace(f"single_flight:{self.name}")
+            task = asyncio.ensure_future(self._run(fn, shared_trace))
+            self._in_flight[key] = (task, shared_trace)
+            self.stats["executions"] += 1
+            task.add_done_callback(lambda finished: self._finish(key, finished))
+
+        try:
+            result = await asyncio.shield(task)
+        finally:
+            # Failed work is attributed too, since its LLM tokens were spent
+            if task.done():
+                attribute_shared_work(shared_trace, coalesced)
+        return copy_result(result) if copy_result is not None else result
+
+    async def _run(self, fn: Callable[[], Awaitable[Any]], shared_trace: RequestTrace) -> Any:
+        """Run the shared work against its own trace rather than the first caller's"""
+        bind_trace(shared_trace)
+        return await fn()
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        """Forget a completed call so later calls run fresh"""
+        flight = self._in_flight.get(key)
+        if flight is not None and flight[0] is task:
+            del self._in_flight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.stats["errors"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """How many calls ran versus joined an in-flight call"""
+        calls = self.stats["executions"] + self.stats["coalesced"]
+        return {
+            **self.stats,
+            "in_flight": len(self._in_flight),
+            "coalesced_rate": round(self.stats["coalesced"] / calls, 4) if calls else 0.0
+        }
+
+def get_coalescing_stats() -> Dict[str, Dict[str, Any]]:
+    """Coalescing metrics for every single-flight group"""
+    return {name: group.get_stats() for name, group in _groups.items()}
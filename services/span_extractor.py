@@ -0,0 +1,284 @@
+import numpy as np
+import re
+from typing import List, Dict, Any, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Sentence terminators followed by whitespace; a '.' inside "3.1" or "1.5%" is never one
+BOUNDARY_PATTERN = re.compile(r'[.!?;]+(?=\s|$)')
+# A terminator right after a bare section number ("3." in "3. TERMINATION") is numbering
+SECTION_NUMBER_PATTERN = re.compile(r'(?:^|\s)\d+(?:\.\d+)*$')
+# "3. TERMINATION " before the first numbered sub-clause of a section
+HEADING_PATTERN = r"\d+(?:\.\d+)*\.?\s+(?:[A-Z][A-Z0-9&/'\-,]*\s+)+(?=\d+(?:\.\d+)*\.?\s)"
+HEADING_PREFIX_PATTERN = re.compile(HEADING_PATTERN)
+# A heading also starts a new sentence when the text before it has no terminator
+HEADING_START_PATTERN = re.compile(r'(?<=\s)(?=' + HEADING_PATTERN + ')')
+SECTION_TOKEN_PATTERN = re.compile(r'\b\d+(?:\.\d+)*\.?')
+TOKEN_PATTERN = re.compile(r'\w+')
+# Score boost for a sentence whose section heading contains every query term
+HEADING_WEIGHT = 0.5
+# Crude suffix stripping so "terminate" and "termination" count as the same query term
+SUFFIXES = ("ations", "ation", "ating", "ated", "ates", "ate", "ions", "ion", "ings", "ing", "ed", "es", "s")
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "of", "for", "to", "in", "on",
+    "and", "or", "what", "which", "who", "how", "does", "do", "this", "that", "there",
+    "any", "under", "with", "by", "it", "its", "as", "at", "if", "can", "i", "my"
+}
+
+def sentence_bounds(text: str) -> List[Tuple[int, int, str]]:
+    """
+    (start, end, heading) of the sentences in a segment, where heading is the section
+    heading the sentence falls under, if the segment contains it. Section numbers are
+    not sentence ends, headings are trimmed off the clause that follows them, and
+    fragments that are only a heading or numbering are dropped.
+    """
+    ends = set()
+    start = 0
+    for boundary in BOUNDARY_PATTERN.finditer(text):
+        if SECTION_NUMBER_PATTERN.search(text, start, boundary.start()):
+            continue
+        ends.add(boundary.end())
+        start = boundary.end()
+    ends.update(heading.start() for heading in HEADING_START_PATTERN.finditer(text))
+    ends.add(len(text))
+
+    sentences = []
+    heading = ""
+    start = 0
+    for end in sorted(ends):
+        sentence_start, sentence_end = start, end
+        start = end
+
+        raw_text = text[sentence_start:sentence_end]
+        sentence_start += len(raw_text) - len(raw_text.lstrip())
+        sentence_end -= len(raw_text) - len(raw_text.rstrip())
+
+        prefix = HEADING_PREFIX_PATTERN.match(text, sentence_start, sentence_end)
+        if prefix:
+            heading = prefix.group(0).strip()
+            sentence_start = prefix.end()
+
+        if is_heading(text[sentence_start:sentence_end]):
+            if sentence_start < sentence_end:
+                heading = text[sentence_start:sentence_end]
+            continue
+        sentences.append((sentence_start, sentence_end, heading))
+
+    return sentences
+
+def stem(token: str) -> str:
+    """Strip the first matching suffix, keeping at least four letters"""
+    for suffix in SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+            return token[:-len(suffix)]
+    return token
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, suffix-stripped word tokens without stopwords"""
+    return [stem(token) for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+def score_lexical(query_text: str, texts: List[str]) -> np.ndarray:
+    """IDF-weighted query term coverage for every text, computed as one matrix product"""
+    query_terms = sorted(set(tokenize(query_text)))
+    if not query_terms:
+        return np.zeros(len(texts))
+
+    term_index = {term: index for index, term in enumerate(query_terms)}
+    presence = np.zeros((len(texts), len(query_terms)), dtype=np.float32)
+    lengths = np.ones(len(texts), dtype=np.float32)
+
+    for row, text in enumerate(texts):
+        tokens = tokenize(text)
+        lengths[row] = max(1, len(tokens))
+        for token in tokens:
+            column = term_index.get(token)
+            if column is not None:
+                presence[row, column] = 1.0
+
+    document_frequency = presence.sum(axis=0)
+    idf = np.log((len(texts) + 1) / (document_frequency + 1)) + 1.0
+
+    coverage = presence @ idf / idf.sum()
+
+    # Mild length penalty so a short text covering the same terms wins
+    return coverage / np.power(lengths, 0.15)
+
+def is_heading(text: str) -> bool:
+    """Whether a fragment is only numbering and an upper-case heading, with no clause text"""
+    return not any(character.islower() for character in SECTION_TOKEN_PATTERN.sub("", text))
+
+class AnswerSpanExtractor:
+    """Selects the minimal sentence span inside the top matched segments that answers a query"""
+
+    def __init__(self, embedding_service=None, max_sentences: int = 3, expansion_ratio: float = 0.8):
+        self.embedding_service = embedding_service
+        self.max_sentences = max_sentences
+        self.expansion_ratio = expansion_ratio
+
+    async def extract_span(
+        self,
+        query_text: str,
+        scored_matches: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Score every sentence of the given segments against the query and return the
+        best contiguous span with absolute document offsets
+        """
+        spans = await self.extract_spans([query_text], [scored_matches])
+        return spans[0]
+
+    async def extract_spans(
+        self,
+        query_texts: List[str],
+        scored_lists: List[List[Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Answer spans for several queries over the same document. The distinct candidate
+        sentences of all queries are embedded together with the queries in one call and
+        scored with a single Q x S matrix product.
+        """
+        try:
+            sentence_lists = [self._split_sentences(scored_matches) for scored_matches in scored_lists]
+
+            dense_lists = [None] * len(query_texts)
+            if self.embedding_service is not None:
+                dense_lists = await self._score_dense(query_texts, sentence_lists)
+
+            return [
+                self._best_span(query_text, sentences, dense_scores)
+                for query_text, sentences, dense_scores in zip(query_texts, sentence_lists, dense_lists)
+            ]
+
+        except Exception as e:
+            logger.error(f"Error extracting answer spans: {str(e)}")
+            return [{} for _ in query_texts]
+
+    def _best_span(self, query_text: str, sentences: List[Dict[str, Any]], dense_scores: np.ndarray = None) -> Dict[str, Any]:
+        """Combine the sentence scores of one query and expand the best sentence into a span"""
+        if not sentences:
+            return {}
+
+        scores = score_lexical(query_text, [sentence["text"] for sentence in sentences])
+        if dense_scores is not None:
+            scores = 0.5 * scores + 0.5 * dense_scores
+
+        # Sentences under a section heading that names the query's terms are more likely the answer
+        scores = scores * (1.0 + HEADING_WEIGHT * self._heading_coverage(query_text, sentences))
+
+        # Prefer sentences from the segments the matcher ranked highest
+        segment_weights = np.array([sentence["segment_weight"] for sentence in sentences])
+        scores = scores * segment_weights
+
+        best_index = int(np.argmax(scores))
+        start_index, end_index = self._expand_span(sentences, scores, best_index)
+
+        span_sentences = sentences[start_index:end_index + 1]
+        return {
+            "text": " ".join(sentence["text"] for sentence in span_sentences),
+            "start": span_sentences[0]["start"],
+            "end": span_sentences[-1]["end"],
+            "segment_id": span_sentences[0]["segment_id"],
+            "sentence_count": len(span_sentences),
+            "score": round(float(scores[best_index]), 4)
+        }
+
+    def _split_sentences(self, scored_matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Split segments into sentences with absolute document offsets. Overlapping segments
+        repeat sentences, often cut off at a segment edge; only the longest copy is kept,
+        with the best weight of the segments it appeared in.
+        """
+        sentences = []
+        best_confidence = max((match.get("final_confidence", 0.0) for match in scored_matches), default=0.0)
+
+        for match in scored_matches:
+            segment = match.get("segment", {})
+            segment_text = segment.get("text", "")
+            segment_start = segment.get("start_position", 0)
+            confidence = match.get("final_confidence", 0.0)
+            segment_weight = confidence / best_confidence if best_confidence > 0 else 1.0
+
+            for local_start, local_end, heading in sentence_bounds(segment_text):
+                sentences.append({
+                    "text": segment_text[local_start:local_end],
+                    "heading": heading,
+                    "start": segment_start + local_start,
+                    "end": segment_start + local_end,
+                    "segment_id": segment.get("segment_id", 0),
+                    "segment_weight": segment_weight
+                })
+
+        sentences.sort(key=lambda sentence: (sentence["start"], -sentence["end"]))
+        unique = []
+        for sentence in sentences:
+            if unique and sentence["start"] >= unique[-1]["start"] and sentence["end"] <= unique[-1]["end"]:
+                unique[-1]["segment_weight"] = max(unique[-1]["segment_weight"], sentence["segment_weight"])
+                unique[-1]["heading"] = unique[-1]["heading"] or sentence["heading"]
+                continue
+            unique.append(sentence)
+        return unique
+
+    def _heading_coverage(self, query_text: str, sentences: List[Dict[str, Any]]) -> np.ndarray:
+        """Fraction of the query terms found in each sentence's section heading"""
+        query_terms = set(tokenize(query_text))
+        if not query_terms:
+            return np.zeros(len(sentences))
+        return np.array([
+            len(query_terms & set(tokenize(sentence["heading"]))) / len(query_terms)
+            for sentence in sentences
+        ])
+
+    async def _score_dense(
+        self,
+        query_texts: List[str],
+        sentence_lists: List[List[Dict[str, Any]]]
+    ) -> List[np.ndarray]:
+        """
+        Cosine similarity between each query and its sentences, from one local embedding
+        call; sentences are only compared with their query, so no remote model is needed
+        """
+        try:
+            columns: Dict[str, int] = {}
+            for sentences in sentence_lists:
+                for sentence in sentences:
+                    columns.setdefault(sentence["text"], len(columns))
+            if not columns:
+                return [None] * len(query_texts)
+
+            vectors = await self.embedding_service.embed_local(list(query_texts) + list(columns))
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            vectors = vectors / norms
+
+            query_count = len(query_texts)
+            similarities = np.clip(vectors[:query_count] @ vectors[query_count:].T, 0.0, 1.0)
+            return [
+                similarities[row, [columns[sentence["text"]] for sentence in sentences]]
+                for row, sentences in enumerate(sentence_lists)
+            ]
+        except Exception as e:
+            logger.warning(f"Dense sentence scoring unavailable: {e}")
+            return [None] * len(query_texts)
+
+    def _expand_span(self, sentences: List[Dict[str, Any]], scores: np.ndarray, best_index: int) -> Tuple[int, int]:
+        """Grow the span over adjacent sentences of the same segment that score close to the best"""
+        threshold = scores[best_index] * self.expansion_ratio
+        segment_id = sentences[best_index]["segment_id"]
+        start_index = end_index = best_index
+
+        while end_index - start_index + 1 < self.max_sentences:
+            left = start_index - 1
+            right = end_index + 1
+            left_score = scores[left] if left >= 0 and sentences[left]["segment_id"] == segment_id else -1.0
+            right_score = scores[right] if right < len(sentences) and sentences[right]["segment_id"] == segment_id else -1.0
+
+            if max(left_score, right_score) < threshold or max(left_score, right_score) <= 0:
+                break
+            if right_score >= left_score:
+                end_index = right
+            else:
+                start_index = left
+
+        return start_index, end_index
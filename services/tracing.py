@@ -0,0 +1,176 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_current_trace: ContextVar[Optional["RequestTrace"]] = ContextVar("request_trace", default=None)
+# Names of the stages open in the current task, so a nested stage of the same name is not recorded twice
+_open_stages: ContextVar[frozenset] = ContextVar("open_stages", default=frozenset())
+
+class RequestTrace:
+    """Wall-clock and CPU timings for the stages of a single request"""
+
+    def __init__(self, name: str, tenant: str = None):
+        self.name = name
+        self.tenant = tenant
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        self.stages: List[Dict[str, Any]] = []
+
+        # LLM calls made on behalf of this request
+        self.llm_calls: List[Dict[str, Any]] = []
+
+        # Prompt tokens trimmed from this request's LLM prompts to fit the token budget
+        self.prompt_tokens_saved = 0
+
+        # Set once the request's usage has been folded into the token meter
+        self.metered = False
+
+    @contextmanager
+    def stage(self, name: str):
+        """Record the wall and CPU time spent inside the block"""
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            # CPU time is process-wide, so it includes work interleaved from concurrent requests
+            wall_end = time.perf_counter()
+            self.stages.append({
+                "stage": name,
+                "start_ms": round((wall_start - self.wall_start) * 1000, 3),
+                "end_ms": round((wall_end - self.wall_start) * 1000, 3),
+                "wall_ms": round((wall_end - wall_start) * 1000, 3),
+                "cpu_ms": round((time.process_time() - cpu_start) * 1000, 3)
+            })
+
+    def record_llm_call(
+        self,
+        model: str,
+        purpose: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        latency_ms: float,
+        estimated: bool = False
+    ):
+        """Record the token usage and latency of one LLM call"""
+        self.llm_calls.append({
+            "model": model,
+            "purpose": purpose,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "latency_ms": round(latency_ms, 3),
+            "estimated": estimated
+        })
+
+    def record_prompt_tokens_saved(self, tokens: int):
+        """Record prompt tokens trimmed to fit the token budget"""
+        self.prompt_tokens_saved += tokens
+
+    def token_usage(self) -> Dict[str, Any]:
+        """Token usage of this request alone"""
+        return {
+            "prompt_tokens": sum(call["prompt_tokens"] for call in self.llm_calls),
+            "completion_tokens": sum(call["completion_tokens"] for call in self.llm_calls),
+            "total_tokens": sum(call["total_tokens"] for call in self.llm_calls),
+            "prompt_tokens_saved": self.prompt_tokens_saved,
+            "llm_calls": len(self.llm_calls)
+        }
+
+    def stage_time_ms(self, name: str) -> float:
+        """Total wall time recorded for a stage name"""
+        return sum(stage["wall_ms"] for stage in self.stages if stage["stage"] == name)
+
+    def total_time_ms(self) -> float:
+        """Wall time since the trace started"""
+        return round((time.perf_counter() - self.wall_start) * 1000, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialise the trace for response metadata and logging"""
+        return {
+            "name": self.name,
+            "total_wall_ms": self.total_time_ms(),
+            "total_cpu_ms": round((time.process_time() - self.cpu_start) * 1000, 3),
+            "stages": list(self.stages),
+            "token_usage": self.token_usage()
+        }
+
+def start_trace(name: str, tenant: str = None) -> RequestTrace:
+    """Start a new trace bound to the current request context"""
+    trace = RequestTrace(name, tenant=tenant)
+    _current_trace.set(trace)
+    return trace
+
+def bind_trace(trace: RequestTrace):
+    """Make trace the current one for the running task, with no stages open"""
+    _current_trace.set(trace)
+    _open_stages.set(frozenset())
+
+def attribute_shared_work(shared: RequestTrace, coalesced: bool):
+    """
+    Copy the stages and LLM calls of work shared between several requests onto the current
+    request's trace. Calls are marked coalesced for requests that joined work already in
+    flight; stages of the same name as one open in the caller are not recorded twice.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return
+
+    offset_ms = (shared.wall_start - trace.wall_start) * 1000
+    open_stages = _open_stages.get()
+    for stage in shared.stages:
+        if stage["stage"] in open_stages:
+            continue
+        trace.stages.append({
+            **stage,
+            "start_ms": round(stage["start_ms"] + offset_ms, 3),
+            "end_ms": round(stage["end_ms"] + offset_ms, 3)
+        })
+    trace.llm_calls.extend({**call, "coalesced": coalesced} for call in shared.llm_calls)
+    trace.prompt_tokens_saved += shared.prompt_tokens_saved
+
+def current_trace() -> Optional[RequestTrace]:
+    """Get the trace of the current request, if any"""
+    return _current_trace.get()
+
+@contextmanager
+def trace_stage(name: str):
+    """
+    Record a stage on the current request's trace; a no-op outside a traced request or
+    inside a stage of the same name (a pipeline stage wrapping the service that does the work)
+    """
+    trace = _current_trace.get()
+    open_stages = _open_stages.get()
+    if trace is None or name in open_stages:
+        yield
+        return
+
+    token = _open_stages.set(open_stages | {name})
+    try:
+        with trace.stage(name):
+            yield
+    finally:
+        _open_stages.reset(token)
+
+def record_llm_call(
+    model: str,
+    purpose: str,
+    prompt_tokens: int,
+    completion_tokens: int,
+    latency_ms: float,
+    estimated: bool = False
+):
+    """Attribute an LLM call to the current request's trace; a no-op outside a traced request"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record_llm_call(model, purpose, prompt_tokens, completion_tokens, latency_ms, estimated)
+
+def record_prompt_tokens_saved(tokens: int):
+    """Attribute trimmed prompt tokens to the current request's trace; a no-op outside a traced request"""
+    trace = _current_trace.get()
+    if trace is not None and tokens:
+        trace.record_prompt_tokens_saved(tokens)
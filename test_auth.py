@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script for token verification: bounded cache, expiry and rate-limited failure logging
+"""
+
+import logging
+import secrets
+import sys
+import time
+
+from config import Config
+from services.auth_service import AuthService
+
+class CountingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+def test_verification():
+    """Test that the valid token is accepted and others rejected"""
+    print("🔍 Testing token verification...")
+    auth_service = AuthService()
+    results = [
+        auth_service.verify_token(Config.AUTH_TOKEN),
+        auth_service.verify_token(Config.AUTH_TOKEN),
+        auth_service.verify_token(Config.AUTH_TOKEN[:-1]),
+        auth_service.verify_token("")
+    ]
+    stats = auth_service.get_cache_stats()
+    assert results == [True, True, False, False] and stats["hits"] == 1 and Config.AUTH_TOKEN.encode() not in auth_service.token_cache, f"Unexpected verification results {results}: {stats}"
+    print(f"✅ Valid token accepted, invalid rejected, raw tokens not cached: {stats}")
+
+def test_flood():
+    """Test that a flood of invalid tokens keeps the cache bounded and logs once per interval"""
+    print("\n🔍 Testing a flood of invalid tokens...")
+    handler = CountingHandler()
+    logging.getLogger("services.auth_service").addHandler(handler)
+    try:
+        auth_service = AuthService(cache_size=100, failure_log_interval=60)
+        accepted = 0
+        for index in range(10000):
+            if index % 50 == 0:
+                accepted += auth_service.verify_token(Config.AUTH_TOKEN)
+            auth_service.verify_token(secrets.token_hex(32))
+    finally:
+        logging.getLogger("services.auth_service").removeHandler(handler)
+
+    stats = auth_service.get_cache_stats()
+    assert len(auth_service.token_cache) == 100 and accepted == 200 and handler.count == 1 and stats["failures"] == 10000, f"Cache held {len(auth_service.token_cache)} entries and logged {handler.count} records: {stats}"
+    print(f"✅ Cache stayed at 100 entries and logged {handler.count} warning for {stats['failures']} failures")
+
+def test_expiry():
+    """Test that cached results expire on the monotonic clock"""
+    print("\n🔍 Testing cache expiry...")
+    auth_service = AuthService(cache_ttl=0.05)
+    auth_service.verify_token(Config.AUTH_TOKEN)
+    auth_service.verify_token(Config.AUTH_TOKEN)
+    time.sleep(0.1)
+    auth_service.verify_token(Config.AUTH_TOKEN)
+
+    stats = auth_service.get_cache_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2, f"Unexpected cache counters: {stats}"
+    print("✅ Expired entry was verified again")
+
+def main():
+    """Run all auth tests"""
+    print("🚀 Starting Auth Service Tests")
+    print("=" * 50)
+
+    test_verification()
+    test_flood()
+    test_expiry()
+
+    print("\n" + "=" * 50)
+    print("🏁 Auth service tests completed!")
+
+if __name__ == "__main__":
+    sys.exit(main())
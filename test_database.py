@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Test script for the async DatabaseService and its connection pool (runs against a local SQLite file)
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict
+
+from sqlalchemy import text
+
+from config import Config
+from services.database import DatabaseService
+
+# A recursive CTE that keeps one connection busy for a while
+HEAVY_QUERY = text(
+    "WITH RECURSIVE counter(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM counter WHERE n < 2000000) "
+    "SELECT sum(n) FROM counter"
+)
+LIGHT_QUERIES = 20
+
+async def make_db(path: str, pool_size: int) -> DatabaseService:
+    """DatabaseService on a SQLite file with the given pool size"""
+    Config.DB_POOL_SIZE = pool_size
+    Config.DB_MAX_OVERFLOW = 0
+    db_service = DatabaseService()
+    db_service.database_url = f"sqlite:///{path}"
+    await db_service.initialize()
+    return db_service
+
+async def run_mixed_queries(db_service: DatabaseService) -> Dict[str, float]:
+    """
+    Start one heavy query, then light queries alongside it. Returns the slowest light query
+    and the longest event loop stall, both in milliseconds.
+    """
+    async def timed(query) -> float:
+        started = time.perf_counter()
+        async with db_service.SessionLocal() as db:
+            (await db.execute(query)).scalar()
+        return (time.perf_counter() - started) * 1000
+
+    stalls = []
+
+    async def ticker():
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            stalls.append((time.perf_counter() - started) * 1000 - 10)
+
+    tick_task = asyncio.ensure_future(ticker())
+    heavy = asyncio.ensure_future(timed(HEAVY_QUERY))
+    await asyncio.sleep(0.05)
+    light = await asyncio.gather(*[timed(text("SELECT count(*) FROM document_interactions")) for _ in range(LIGHT_QUERIES)])
+    heavy_ms = await heavy
+    tick_task.cancel()
+
+    return {
+        "heavy_ms": heavy_ms,
+        "slowest_light_ms": max(light),
+        "max_loop_stall_ms": max(stalls) if stalls else 0.0
+    }
+
+def test_crud(tmp_path):
+    """Test logging, reading and cleaning up interactions through the async engine"""
+    print("🔍 Testing async interaction logging...")
+    path = str(tmp_path / "crud.db")
+
+    async def run():
+        db_service = await make_db(path, pool_size=5)
+        try:
+            await db_service.log_interaction(
+                document_url="https://example.com/contract.pdf",
+                user_query="What is the termination notice period?",
+                matched_clause={"text": "Either party may terminate with 30 days notice."},
+                confidence=0.9,
+                processing_time_ms=12.5
+            )
+            written = await db_service.log_interactions([
+                {
+                    "document_url": "https://example.com/contract.pdf",
+                    "user_query": f"Query {index}",
+                    "matched_clause": {},
+                    "confidence": 0.5,
+                    "processing_time_ms": 1.0,
+                    "metadata": {}
+                }
+                for index in range(10)
+            ])
+            recent = await db_service.get_recent_interactions(limit=5)
+            stats = await db_service.get_statistics()
+            document_stats = await db_service.get_document_stats("https://example.com/contract.pdf")
+            return written, recent, stats, document_stats
+        finally:
+            await db_service.close()
+
+    written, recent, stats, document_stats = asyncio.run(run())
+    assert written and len(recent) == 5 and stats["total_queries"] == 11 and document_stats["total_interactions"] == 11, f"Unexpected results: written={written}, recent={len(recent)}, stats={stats}"
+    print("✅ Async logging and statistics passed")
+    print(f"Statistics: {stats}")
+
+def test_rollups(tmp_path):
+    """Test that incrementally maintained rollups match a rebuild from the interaction log"""
+    print("\n🔍 Testing interaction rollups...")
+    path = str(tmp_path / "rollups.db")
+
+    async def run():
+        db_service = await make_db(path, pool_size=5)
+        try:
+            rows = [
+                {
+                    "document_url": f"https://example.com/policy-{index % 3}.pdf",
+                    "user_query": f"Query {index}",
+                    "matched_clause": {},
+                    "confidence": (index % 5) / 5,
+                    "processing_time_ms": float(index),
+                    "metadata": {}
+                }
+                for index in range(300)
+            ]
+            for start in range(0, len(rows), 100):
+                await db_service.log_interactions(rows[start:start + 100])
+
+            incremental = (await db_service.get_statistics(), await db_service.get_document_stats(rows[0]["document_url"]))
+            await db_service.rebuild_rollups()
+            rebuilt = (await db_service.get_statistics(), await db_service.get_document_stats(rows[0]["document_url"]))
+
+            started = time.perf_counter()
+            await db_service.get_statistics()
+            stats_ms = (time.perf_counter() - started) * 1000
+            return incremental, rebuilt, stats_ms
+        finally:
+            await db_service.close()
+
+    incremental, rebuilt, stats_ms = asyncio.run(run())
+    stats, document_stats = incremental
+    print(f"Statistics: {stats['total_queries']} queries, {stats['queries_last_hour']} in the last hour, "
+          f"average confidence {stats['average_confidence']} ({stats_ms:.1f}ms)")
+    print(f"Document: {document_stats['total_interactions']} interactions, average confidence {document_stats['average_confidence']}")
+
+    assert incremental == rebuilt and stats["total_queries"] == 300 and document_stats["total_interactions"] == 100, f"Rollups differ from the log: {incremental} vs {rebuilt}"
+    print("✅ Incremental rollups match a rebuild from the log")
+
+def test_retention(tmp_path):
+    """Test that the chunked purge deletes only expired rows and keeps the totals consistent"""
+    print("\n🔍 Testing chunked retention purge...")
+    path = str(tmp_path / "retention.db")
+
+    async def run():
+        db_service = await make_db(path, pool_size=5)
+        try:
+            now = datetime.utcnow()
+            await db_service.log_interactions([
+                {
+                    "document_url": "https://example.com/contract.pdf",
+                    "user_query": f"Query {index}",
+                    "matched_clause": {},
+                    "confidence": 0.5,
+                    "processing_time_ms": 1.0,
+                    "created_at": now - timedelta(days=40 if index < 1200 else 1),
+                    "metadata": {}
+                }
+                for index in range(1500)
+            ])
+            deleted = await db_service.cleanup_old_interactions(days_old=30, batch_size=250, pause_ms=1)
+            return deleted, await db_service.get_statistics()
+        finally:
+            await db_service.close()
+
+    deleted, stats = asyncio.run(run())
+    assert deleted == 1200 and stats["total_queries"] == 300, f"Unexpected purge result: deleted={deleted}, stats={stats}"
+    print(f"✅ Purged {deleted} expired rows in batches, {stats['total_queries']} remain in the totals")
+
+def test_concurrent_retention(tmp_path):
+    """Test that workers purging at the same time subtract each deleted row from the totals once"""
+    print("\n🔍 Testing concurrent retention purges from several workers...")
+    path = str(tmp_path / "concurrent_retention.db")
+
+    async def run():
+        workers = [await make_db(path, pool_size=5) for _ in range(3)]
+        try:
+            now = datetime.utcnow()
+            await workers[0].log_interactions([
+                {
+                    "document_url": f"https://example.com/contract-{index % 2}.pdf",
+                    "user_query": f"Query {index}",
+                    "matched_clause": {},
+                    "confidence": 0.5,
+                    "processing_time_ms": 1.0,
+                    "created_at": now - timedelta(days=40 if index < 1200 else 1),
+                    "metadata": {}
+                }
+                for index in range(1500)
+            ])
+            deleted = await asyncio.gather(*[
+                worker.cleanup_old_interactions(days_old=30, batch_size=100, pause_ms=0) for worker in workers
+            ])
+            stats = await workers[0].get_statistics()
+            document_stats = await workers[0].get_document_stats("https://example.com/contract-0.pdf")
+            return deleted, stats, document_stats
+        finally:
+            for worker in workers:
+                await worker.close()
+
+    deleted, stats, document_stats = asyncio.run(run())
+    assert sum(deleted) == 1200 and stats["total_queries"] == 300 and document_stats["total_interactions"] == 150, f"Totals drifted: deleted={deleted}, stats={stats}, document={document_stats}"
+    print(f"✅ Workers purged {deleted} rows, {stats['total_queries']} remain in the totals")
+
+def test_concurrent_queries(tmp_path):
+    """Test that light queries are not serialised behind a heavy one on a pooled engine"""
+    print(f"\n🔍 Testing {LIGHT_QUERIES} light queries alongside a heavy query...")
+    path = str(tmp_path / "concurrency.db")
+
+    async def run(pool_size: int) -> Dict[str, float]:
+        db_service = await make_db(path, pool_size=pool_size)
+        try:
+            return await run_mixed_queries(db_service)
+        finally:
+            await db_service.close()
+
+    single = asyncio.run(run(pool_size=1))
+    pooled = asyncio.run(run(pool_size=10))
+    for label, result in (("Pool size 1", single), ("Pool size 10", pooled)):
+        print(f"{label}: heavy {result['heavy_ms']:.0f}ms, slowest light query {result['slowest_light_ms']:.0f}ms, "
+              f"longest event loop stall {result['max_loop_stall_ms']:.0f}ms")
+
+    assert pooled["slowest_light_ms"] < single["slowest_light_ms"] / 2, "Light queries still serialised behind the heavy query"
+    print("✅ Light queries no longer wait behind the heavy query")
+
+    assert pooled["max_loop_stall_ms"] < 100, "Event loop was blocked by a query"
+    print("✅ Event loop stayed responsive during queries")
+
+def main():
+    """Run all database tests"""
+    print("🚀 Starting Database Tests")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as directory:
+        test_crud(Path(directory))
+        test_rollups(Path(directory))
+        test_retention(Path(directory))
+        test_concurrent_retention(Path(directory))
+        test_concurrent_queries(Path(directory))
+
+    print("\n" + "=" * 50)
+    print("🏁 Database tests completed!")
+
+if __name__ == "__main__":
+    sys.exit(main())
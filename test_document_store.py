@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Test script for the persistent document store: a processed document saved by one worker
+is served by a restarted worker without re-extraction or re-embedding
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import event
+
+from config import Config
+from services.database import DatabaseService
+from services.document_store import DocumentStore
+from services.rationale_cache import content_hash
+
+DOCUMENT_URL = "https://example.com/policy.pdf"
+SEGMENTS = 2000
+DIMENSION = 1536
+
+def make_document():
+    """Synthetic processed document: text, segments and embeddings"""
+    rng = np.random.default_rng(1)
+    content = " ".join(f"Clause {index}: the insurer shall pay within thirty days." for index in range(SEGMENTS))
+    segments = [
+        {
+            "text": f"Clause {index}: the insurer shall pay within thirty days.",
+            "start_position": index * 50,
+            "end_position": index * 50 + 50,
+            "clause_info": {"page_number": None, "clause_number": str(index), "section_number": str(index), "clause_type": "payment"},
+            "keyword_hits": ["payment"],
+            "segment_id": index
+        }
+        for index in range(SEGMENTS)
+    ]
+    embeddings = [rng.standard_normal(DIMENSION).astype(np.float32) for _ in range(SEGMENTS)]
+    return content, segments, embeddings
+
+async def make_db(path: str) -> DatabaseService:
+    db_service = DatabaseService()
+    db_service.database_url = f"sqlite:///{path}"
+    await db_service.initialize()
+    return db_service
+
+def test_restart(tmp_path):
+    """Test that a new worker loads the document, segments and vectors in one query"""
+    print(f"🔍 Testing restart with a stored document ({SEGMENTS} segments x {DIMENSION} dims)...")
+    path = str(tmp_path / "documents.db")
+    content, segments, embeddings = make_document()
+
+    async def run():
+        # First worker processes and stores the document
+        db_service = await make_db(path)
+        store = DocumentStore(db_service)
+        store.save_in_background(DOCUMENT_URL, content, content_hash(content), segments, embeddings)
+        await store.close()
+        await db_service.close()
+
+        # Restarted worker: empty memory, same database
+        db_service = await make_db(path)
+        statements = []
+        event.listen(db_service.engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        store = DocumentStore(db_service)
+
+        started = time.perf_counter()
+        stored = await store.load(DOCUMENT_URL)
+        load_ms = (time.perf_counter() - started) * 1000
+        cached = await store.load(DOCUMENT_URL)
+        missing = await store.load("https://example.com/unknown.pdf")
+        await db_service.close()
+        return stored, cached, missing, load_ms, statements, store.get_stats()
+
+    stored, cached, missing, load_ms, statements, stats = asyncio.run(run())
+    selects = [statement for statement in statements if statement.lstrip().upper().startswith("SELECT")]
+    print(f"Loaded in {load_ms:.1f}ms with {len(selects) - 1} query for the document, stats: {stats}")
+
+    assert stored is not None and stored.content == content and stored.segments == segments, "Stored document did not round-trip"
+    assert np.array_equal(stored.embeddings, np.vstack(embeddings)), "Stored vectors did not round-trip"
+    assert cached is stored and missing is None
+    assert len(selects) == 2, f"Expected one query for the document, got {len(selects) - 1}"
+    print("✅ Restarted worker serves the document without re-extraction or re-embedding")
+
+def test_replace(tmp_path):
+    """Test that saving a document again replaces its segments and vectors"""
+    print("\n🔍 Testing replacement of a changed document...")
+    path = str(tmp_path / "replace.db")
+    content, segments, embeddings = make_document()
+
+    async def run():
+        db_service = await make_db(path)
+        try:
+            await db_service.save_document(DOCUMENT_URL, content, content_hash(content), segments, np.vstack(embeddings))
+            changed = content + " Amended."
+            await db_service.save_document(DOCUMENT_URL, changed, content_hash(changed), segments[:10], np.vstack(embeddings[:10]))
+            return await db_service.load_document(DOCUMENT_URL), changed
+        finally:
+            await db_service.close()
+
+    stored, changed = asyncio.run(run())
+    assert stored["content"] == changed and len(stored["segments"]) == 10 and stored["embeddings"].shape == (10, DIMENSION), "Stale segments survived the replacement"
+    print("✅ Only the latest version is stored")
+
+def test_expiry(tmp_path):
+    """Test that a stored document is processed again once older than the TTL"""
+    print("\n🔍 Testing expiry of stored documents...")
+    path = str(tmp_path / "expiry.db")
+    content, segments, embeddings = make_document()
+
+    async def run():
+        db_service = await make_db(path)
+        try:
+            store = DocumentStore(db_service, ttl_seconds=0.2)
+            store.save_in_background(DOCUMENT_URL, content, content_hash(content), segments[:10], embeddings[:10])
+            await store.close()
+            fresh = await DocumentStore(db_service, ttl_seconds=0.2).load(DOCUMENT_URL)
+            await asyncio.sleep(0.3)
+            expired_from_memory = await store.load(DOCUMENT_URL)
+            expired_from_database = await DocumentStore(db_service, ttl_seconds=0.2).load(DOCUMENT_URL)
+            return fresh, expired_from_memory, expired_from_database
+        finally:
+            await db_service.close()
+
+    fresh, expired_from_memory, expired_from_database = asyncio.run(run())
+    assert Config.DOCUMENT_STORE_TTL_SECONDS > 0 and fresh is not None and expired_from_memory is None and expired_from_database is None, "Stored document was served past its TTL"
+    print(f"✅ Documents expire after the TTL (default {Config.DOCUMENT_STORE_TTL_SECONDS:.0f}s)")
+
+class RecordingDatabase:
+    """Slow save_document that records every save and the most saves in flight at once"""
+
+    def __init__(self):
+        self.saved_hashes = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def save_document(self, document_url, content, document_hash, segments, embeddings):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.02)
+        self.in_flight -= 1
+        self.saved_hashes.append(document_hash)
+        return True
+
+def test_concurrent_saves_coalesced():
+    """Test that concurrent saves of one URL are written one at a time, skipping duplicates"""
+    print("\n🔍 Testing concurrent saves of the same document...")
+    content, segments, embeddings = make_document()
+    changed = content + " Amended."
+    db = RecordingDatabase()
+    store = DocumentStore(db)
+
+    async def run():
+        store.save_in_background(DOCUMENT_URL, content, content_hash(content), segments[:10], embeddings[:10])
+        await asyncio.sleep(0.005)
+        for document_content in (content, content, changed):
+            store.save_in_background(DOCUMENT_URL, document_content, content_hash(document_content), segments[:10], embeddings[:10])
+        await store.close()
+
+    asyncio.run(run())
+    assert db.max_in_flight == 1, "Saves of one URL overlapped"
+    assert db.saved_hashes == [content_hash(content), content_hash(changed)], db.saved_hashes
+    assert store.get_stats()["coalesced_saves"] == 3
+    print("✅ Saves are coalesced per URL and the latest version is stored last")
+
+def main():
+    """Run all document store tests"""
+    print("🚀 Starting Document Store Tests")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as directory:
+        test_restart(Path(directory))
+        test_replace(Path(directory))
+        test_expiry(Path(directory))
+    test_concurrent_saves_coalesced()
+
+    print("\n" + "=" * 50)
+    print("🏁 Document store tests completed!")
+
+if __name__ == "__main__":
+    sys.exit(main())
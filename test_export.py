@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Test script for the interaction export: every format round-trips the rows, filters apply,
+and peak memory stays flat as the number of exported rows grows
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from services.database import DatabaseService
+from services.interaction_export import InteractionExporter
+
+BATCH_SIZE = 1000
+START = datetime(2024, 1, 1)
+
+async def make_db(path: str, rows: int) -> DatabaseService:
+    db_service = DatabaseService()
+    db_service.database_url = f"sqlite:///{path}"
+    await db_service.initialize()
+
+    for offset in range(0, rows, 5000):
+        await db_service.log_interactions([
+            {
+                "document_url": f"https://example.com/doc-{index % 5}.pdf",
+                "user_query": f"What is the waiting period for condition {index}?",
+                "matched_clause": {"text": f"Clause {index}: waiting period of thirty days.", "similarity_score": 0.8},
+                "confidence": 0.8,
+                "processing_time_ms": float(index % 100),
+                "created_at": START + timedelta(seconds=index * 10),
+                "metadata": {"intent": "coverage", "index": index}
+            }
+            for index in range(offset, min(offset + 5000, rows))
+        ])
+    return db_service
+
+def read_export(path: str, export_format: str):
+    """Read an export back as (row count, ids, first metadata)"""
+    if export_format == "ndjson":
+        with gzip.open(path, "rt") as export:
+            records = [json.loads(line) for line in export]
+        return len(records), [record["id"] for record in records], records[0]["metadata"] if records else None
+    if export_format == "parquet":
+        table = pq.read_table(path)
+    else:
+        with pa.ipc.open_stream(path) as reader:
+            table = reader.read_all()
+    ids = table.column("id").to_pylist()
+    return len(ids), ids, json.loads(table.column("metadata")[0].as_py()) if ids else None
+
+def test_round_trip(tmp_path):
+    """Test that each format exports every row in id order, and that filters apply"""
+    print("🔍 Testing export round trip in every format...")
+    directory = str(tmp_path)
+    rows = 12345
+    path = os.path.join(directory, "round_trip.db")
+
+    async def run():
+        db_service = await make_db(path, rows)
+        exporter = InteractionExporter(db_service, batch_size=BATCH_SIZE)
+        results = {}
+        try:
+            for export_format in ("ndjson", "arrow", "parquet"):
+                output = os.path.join(directory, f"all.{export_format}")
+                await exporter.export_to_file(output, export_format)
+                results[export_format] = read_export(output, export_format)
+
+            output = os.path.join(directory, "filtered.ndjson")
+            since = START + timedelta(seconds=10 * 1000)
+            await exporter.export_to_file(output, "ndjson", since=since, document_url="https://example.com/doc-0.pdf")
+            results["filtered"] = read_export(output, "ndjson")
+        finally:
+            await db_service.close()
+        return results
+
+    results = asyncio.run(run())
+    for export_format in ("ndjson", "arrow", "parquet"):
+        count, ids, metadata = results[export_format]
+        assert count == rows and ids == sorted(ids) and len(set(ids)) == rows, f"{export_format}: exported {count} of {rows} rows"
+        assert metadata == {"intent": "coverage", "index": 0}, f"{export_format}: metadata {metadata}"
+        print(f"✅ {export_format}: {count} rows in id order")
+
+    count, _, _ = results["filtered"]
+    expected = len([index for index in range(1000, rows) if index % 5 == 0])
+    assert count == expected, f"Filtered export returned {count} rows, expected {expected}"
+    print(f"✅ Filtered export returned {count} rows")
+
+def test_flat_memory(tmp_path):
+    """Test that peak memory of an export does not grow with the number of rows"""
+    print("\n🔍 Testing export memory at increasing row counts...")
+    directory = str(tmp_path)
+    peaks = {}
+
+    for rows in (10000, 50000):
+        path = os.path.join(directory, f"memory_{rows}.db")
+
+        async def run():
+            db_service = await make_db(path, rows)
+            exporter = InteractionExporter(db_service, batch_size=BATCH_SIZE)
+            try:
+                result = {}
+                for export_format in ("ndjson", "parquet"):
+                    output = os.path.join(directory, f"memory_{rows}.{export_format}")
+                    tracemalloc.start()
+                    await exporter.export_to_file(output, export_format)
+                    result[export_format] = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                return result
+            finally:
+                await db_service.close()
+
+        peaks[rows] = asyncio.run(run())
+        print(f"{rows} rows: " + ", ".join(f"{name} peak {peak / 1024 / 1024:.1f} MB" for name, peak in peaks[rows].items()))
+
+    assert all(peaks[50000][name] < 1.5 * peaks[10000][name] for name in peaks[10000]), "Peak memory grows with the number of exported rows"
+    print("✅ Peak memory is flat for 5x the rows")
+
+def test_cli(tmp_path):
+    """Test that the export CLI fails instead of exporting an empty fallback database"""
+    print("\n🔍 Testing the export CLI against reachable and missing databases...")
+    directory = str(tmp_path)
+    path = os.path.join(directory, "cli.db")
+
+    async def populate():
+        db_service = await make_db(path, 100)
+        await db_service.close()
+
+    asyncio.run(populate())
+
+    def export(database_path: str, output: str):
+        environment = {**os.environ, "DATABASE_URL": f"sqlite:///{database_path}"}
+        return subprocess.run(
+            [sys.executable, "export_interactions.py", "--format", "ndjson", "--output", output],
+            env=environment, capture_output=True, text=True
+        )
+
+    exported = export(path, os.path.join(directory, "cli.ndjson"))
+    missing_output = os.path.join(directory, "missing.ndjson")
+    missing = export(os.path.join(directory, "missing.db"), missing_output)
+
+    assert exported.returncode == 0 and read_export(os.path.join(directory, "cli.ndjson"), "ndjson")[0] == 100, f"CLI export failed: {exported.stderr[-500:]}"
+    print("✅ CLI exported every row from the configured database")
+
+    assert missing.returncode != 0 and not os.path.exists(missing_output), "CLI reported success without a readable database"
+    print("✅ CLI exits with an error when the database cannot be read")
+
+def main():
+    """Run all export tests"""
+    print("🚀 Starting Interaction Export Tests")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as directory:
+        test_round_trip(Path(directory))
+        test_flat_memory(Path(directory))
+        test_cli(Path(directory))
+
+    print("\n" + "=" * 50)
+    print("🏁 Interaction export tests completed!")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Test script for the heavy-hitters sketch behind /stats most_common_queries
+"""
+
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+from sqlalchemy import select
+
+from services.database import DatabaseService, HeavyHitterCheckpoint
+from services.heavy_hitters import HeavyHitters, SpaceSaving
+from services.query_cache import ParsedQueryCache
+
+DOCUMENTS = [f"https://example.com/policy-{index}.pdf" for index in range(5)]
+
+def zipf_queries(count: int, distinct: int = 5000, seed: int = 7) -> list:
+    """Query stream whose frequencies follow a Zipf-like distribution"""
+    rng = random.Random(seed)
+    weights = [1.0 / rank for rank in range(1, distinct + 1)]
+    return rng.choices([f"What is covered under clause {rank}?" for rank in range(distinct)], weights=weights, k=count)
+
+def test_accuracy():
+    """Test that the sketch finds the true top queries with bounded error"""
+    print("🔍 Testing Space-Saving accuracy on a skewed stream...")
+    queries = zipf_queries(200000)
+    sketch = SpaceSaving(capacity=500)
+
+    started = time.perf_counter()
+    for query in queries:
+        sketch.offer(query)
+    per_update_us = (time.perf_counter() - started) / len(queries) * 1e6
+
+    exact = Counter(queries).most_common(10)
+    top = sketch.top(10)
+    recovered = {entry["query"] for entry in top} & {query for query, _ in exact}
+    bounded = all(entry["count"] - entry["error"] <= Counter(queries)[entry["query"]] <= entry["count"] for entry in top)
+
+    print(f"Top 10 recovered: {len(recovered)}/10, {per_update_us:.2f}µs per update")
+    assert len(recovered) == 10 and bounded, f"Sketch top 10 differs: {top} vs {exact}"
+    print("✅ Sketch matches the exact top 10 within its error bounds")
+
+def test_case_and_punctuation():
+    """Test that queries are counted by normalised text"""
+    print("\n🔍 Testing query normalisation...")
+    heavy_hitters = HeavyHitters()
+    for query in ["What is the notice period?", "what is the  notice period", "WHAT IS THE NOTICE PERIOD!"]:
+        heavy_hitters.record(DOCUMENTS[0], query)
+    heavy_hitters.record(DOCUMENTS[1], "Is dental covered?")
+
+    top = asyncio.run(heavy_hitters.top(1))
+    document_top = asyncio.run(heavy_hitters.top(5, document_url=DOCUMENTS[1]))
+    assert top and top[0]["count"] == 3 and [entry["query"] for entry in document_top] == ["is dental covered"], f"Unexpected counts: {top}, {document_top}"
+    print(f"✅ Normalised counts: {top}")
+
+async def make_db(path: str) -> DatabaseService:
+    db_service = DatabaseService()
+    db_service.database_url = f"sqlite:///{path}"
+    await db_service.initialize()
+    return db_service
+
+async def top_everywhere(heavy_hitters: HeavyHitters) -> list:
+    """The global top 10 followed by each document's top 10"""
+    return [await heavy_hitters.top(10)] + [await heavy_hitters.top(10, document) for document in DOCUMENTS]
+
+def test_checkpoint(tmp_path):
+    """Test that sketches survive a restart through the database checkpoint"""
+    print("\n🔍 Testing checkpoint and restore...")
+    path = str(tmp_path / "heavy_hitters.db")
+
+    async def run():
+        db_service = await make_db(path)
+        try:
+            heavy_hitters = HeavyHitters(db_service)
+            await heavy_hitters.start()
+            for index, query in enumerate(zipf_queries(5000)):
+                heavy_hitters.record(DOCUMENTS[index % len(DOCUMENTS)], query)
+            await heavy_hitters.close()
+            original = await top_everywhere(heavy_hitters)
+
+            restored = HeavyHitters(db_service)
+            await restored.start()
+            await restored.close()
+            return original, await top_everywhere(restored)
+        finally:
+            await db_service.close()
+
+    original, restored = asyncio.run(run())
+    assert original == restored and original[0], "Restored sketches differ from the checkpointed ones"
+    print("✅ Restarted process reports the checkpointed global and document sketches")
+
+def test_concurrent_writers(tmp_path):
+    """Test that workers checkpointing at once add up instead of overwriting each other"""
+    print("\n🔍 Testing checkpoints from several workers...")
+    path = str(tmp_path / "writers.db")
+    queries = zipf_queries(6000)
+
+    async def run():
+        db_service = await make_db(path)
+        try:
+            workers = [HeavyHitters(db_service) for _ in range(3)]
+            for index, query in enumerate(queries):
+                workers[index % len(workers)].record(DOCUMENTS[0], query)
+            await asyncio.gather(*[worker.checkpoint() for worker in workers])
+            return [await worker.top(1) for worker in workers], [await worker.top(1, DOCUMENTS[0]) for worker in workers]
+        finally:
+            await db_service.close()
+
+    global_tops, document_tops = asyncio.run(run())
+    query, count = Counter(queries).most_common(1)[0]
+    expected = [{"query": ParsedQueryCache.normalize(query), "count": count, "error": 0}]
+    assert all(top == expected for top in global_tops + document_tops), f"Workers report {global_tops} and {document_tops}, expected {expected}"
+    print(f"✅ Every worker reports the combined count {count} for the top query")
+
+def test_claim_stale_writers(tmp_path):
+    """Test that the sketches of a stopped worker are merged by exactly one live worker"""
+    print("\n🔍 Testing claims of a stopped worker's sketches...")
+    path = str(tmp_path / "claims.db")
+    queries = zipf_queries(3000)
+
+    async def run():
+        db_service = await make_db(path)
+        try:
+            stopped = HeavyHitters(db_service, checkpoint_seconds=0.05)
+            for query in queries:
+                stopped.record(DOCUMENTS[1], query)
+            await stopped.checkpoint()
+            await asyncio.sleep(0.2)
+
+            live = [HeavyHitters(db_service, checkpoint_seconds=0.05) for _ in range(3)]
+            await asyncio.gather(*[worker.checkpoint() for worker in live])
+            claims = [worker.get_stats()["writers_claimed"] for worker in live]
+            tops = [await worker.top(1, DOCUMENTS[1]) for worker in live]
+            async with db_service.SessionLocal() as db:
+                rows = (await db.execute(select(HeavyHitterCheckpoint.writer_id).distinct())).scalars().all()
+            return claims, tops, rows, stopped.writer_id
+        finally:
+            await db_service.close()
+
+    claims, tops, writers, stopped_writer = asyncio.run(run())
+    count = Counter(queries).most_common(1)[0][1]
+    assert sum(claims) == 1 and all(top[0]["count"] == count for top in tops) and stopped_writer not in writers, f"Unexpected claim result: claims={claims}, tops={tops}, writers={writers}"
+    print(f"✅ One worker claimed the stopped worker's sketches, counts unchanged at {count}")
+
+def main():
+    """Run all heavy-hitters tests"""
+    print("🚀 Starting Heavy Hitters Tests")
+    print("=" * 50)
+
+    test_accuracy()
+    test_case_and_punctuation()
+    with tempfile.TemporaryDirectory() as directory:
+        test_checkpoint(Path(directory))
+        test_concurrent_writers(Path(directory))
+        test_claim_stale_writers(Path(directory))
+
+    print("\n" + "=" * 50)
+    print("🏁 Heavy hitters tests completed!")
+
+if __name__ == "__main__":
+    sys.exit(main())
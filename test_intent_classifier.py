@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test script for the local intent classifier: confident keyword queries skip the LLM,
+the temperature is calibrated at startup from logged LLM parses, and the parse cache and
+classifier share one embedding of each query
+"""
+
+import asyncio
+import os
+import re
+import sys
+import tempfile
+import zlib
+
+import numpy as np
+
+from config import Config
+from services.database import DatabaseService
+from services.intent_classifier import GENERAL_INTENT, LocalIntentClassifier
+from services.llm_parser import LLMParser
+from services.query_cache import ParsedQueryCache
+
+DIMENSION = 128
+
+class CountingEmbedder:
+    """Deterministic bag-of-words embeddings that count calls and embedded texts"""
+
+    def __init__(self):
+        self.calls = 0
+        self.texts = 0
+
+    async def embed_queries(self, texts):
+        self.calls += 1
+        self.texts += len(texts)
+        vectors = np.zeros((len(texts), DIMENSION), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in re.findall(r"[a-z]+", text.lower()):
+                vectors[row, zlib.crc32(token.encode()) % DIMENSION] += 1.0
+        return vectors
+
+LABELLED = [
+    ("How much notice is needed to end the agreement?", "find_termination_clause"),
+    ("When does the contract terminate?", "find_termination_clause"),
+    ("When is the invoice due?", "find_payment_terms"),
+    ("What are the payment terms?", "find_payment_terms"),
+    ("Who owns the software we build?", "general_search"),
+    ("Can I bring my dog to the office?", "general_search")
+]
+
+def test_keyword_queries():
+    """A query naming a known clause is classified confidently without embeddings"""
+    classifier = LocalIntentClassifier()
+    termination = asyncio.run(classifier.classify("What is the termination notice period?"))
+    unrelated = asyncio.run(classifier.classify("Where is the cafeteria?"))
+
+    assert termination["intent"] == "find_termination_clause"
+    assert termination["confidence"] >= Config.LOCAL_PARSE_THRESHOLD, termination
+    assert unrelated["intent"] == GENERAL_INTENT
+
+def test_startup_calibration():
+    """start() fits the temperature on logged LLM parses and keeps the default with too few"""
+
+    async def run(path: str, rows: int):
+        db_service = DatabaseService()
+        db_service.database_url = f"sqlite:///{path}"
+        await db_service.initialize()
+        try:
+            await db_service.log_interactions([
+                {
+                    "document_url": "https://example.com/contract.pdf",
+                    "user_query": f"{query} ({index})",
+                    "matched_clause": {},
+                    "confidence": 0.5,
+                    "metadata": {"intent": intent, "parse_source": "llm"}
+                }
+                for index in range(rows)
+                for query, intent in [LABELLED[index % len(LABELLED)]]
+            ] + [
+                {
+                    "document_url": "https://example.com/contract.pdf",
+                    "user_query": "What is the termination notice period?",
+                    "matched_clause": {},
+                    "confidence": 0.5,
+                    "metadata": {"intent": "find_termination_clause", "parse_source": "local"}
+                }
+            ])
+            embedder = CountingEmbedder()
+            classifier = LocalIntentClassifier(embed_fn=embedder.embed_queries, db_service=db_service, calibration_min=20)
+            await classifier.start()
+            return classifier.get_stats(), embedder.calls
+        finally:
+            await db_service.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        calibrated, embed_calls = asyncio.run(run(os.path.join(directory, "calibrated.db"), 60))
+        default = asyncio.run(run(os.path.join(directory, "default.db"), 10))[0]
+
+    assert calibrated["calibrated_on"] == 60, calibrated
+    assert calibrated["temperature"] != Config.LOCAL_PARSE_TEMPERATURE, calibrated
+    # One call for the intent prototypes and one for every labelled query
+    assert embed_calls == 2, embed_calls
+    assert default == {"temperature": round(Config.LOCAL_PARSE_TEMPERATURE, 4), "calibrated_on": 0}, default
+
+def test_shared_query_embedding():
+    """Parsing embeds each new query once for both the parse cache and the classifier"""
+    embedder = CountingEmbedder()
+    parser = LLMParser(
+        client=object(),
+        query_cache=ParsedQueryCache(embed_fn=embedder.embed_queries),
+        intent_classifier=LocalIntentClassifier(embed_fn=embedder.embed_queries)
+    )
+
+    async def run():
+        await parser.parse_query("What is the termination notice period?")
+        before = embedder.texts
+        for query in ("How long is the notice period for termination?", "When are payment terms due for the invoice?"):
+            result = await parser.parse_query(query)
+            assert result["parse_source"] == "local", result
+        return embedder.texts - before
+
+    assert asyncio.run(run()) == 2
+
+def main():
+    """Run all intent classifier tests"""
+    print("🚀 Starting Intent Classifier Tests")
+    print("=" * 50)
+
+    for test in (test_keyword_queries, test_startup_calibration, test_shared_query_embedding):
+        print(f"\n🔍 {test.__doc__}...")
+        test()
+        print("✅ Passed")
+
+    print("\n" + "=" * 50)
+    print("🏁 Intent classifier tests completed!")
+
+if __name__ == "__main__":
+    sys.exit(main())
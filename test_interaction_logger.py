@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Test script for the write-behind interaction logger against a stub database: each overflow
+policy, batching by count and by time, flushing on close and rejecting rows that cannot be
+stored
+"""
+
+import asyncio
+import logging
+import sys
+
+import numpy as np
+
+from services.interaction_logger import InteractionLogger
+
+class StubDatabase:
+    """Records written batches; writes wait while the gate is closed"""
+
+    def __init__(self):
+        self.batches = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def log_interactions(self, rows):
+        await self.gate.wait()
+        self.batches.append([row["user_query"] for row in rows])
+        return True
+
+    def written(self):
+        return [query for batch in self.batches for query in batch]
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+async def log(interaction_logger: InteractionLogger, query: str, **overrides):
+    interaction = {"matched_clause": {"text": "clause"}, "confidence": 0.8, **overrides}
+    await interaction_logger.log_interaction("https://example.com/contract.pdf", query, **interaction)
+
+async def fill_while_stalled(policy: str, block_timeout_ms: float = 50):
+    """Stall the writer on row 0, fill the two-row queue with rows 1 and 2, then log row 3"""
+    db = StubDatabase()
+    interaction_logger = InteractionLogger(
+        db, max_queue=2, batch_size=1, flush_interval_ms=10,
+        overflow_policy=policy, block_timeout_ms=block_timeout_ms
+    )
+    await interaction_logger.start()
+    db.gate.clear()
+    await log(interaction_logger, "0")
+    await asyncio.sleep(0.01)
+    for query in ("1", "2"):
+        await log(interaction_logger, query)
+    return db, interaction_logger
+
+def test_drop_newest():
+    """drop_newest discards the incoming row when the queue is full"""
+    async def run():
+        db, interaction_logger = await fill_while_stalled("drop_newest")
+        await log(interaction_logger, "3")
+        db.gate.set()
+        await interaction_logger.close()
+        return db, interaction_logger.get_stats()
+
+    db, stats = asyncio.run(run())
+    assert db.written() == ["0", "1", "2"] and stats["dropped"] == 1, stats
+
+def test_drop_oldest():
+    """drop_oldest discards the oldest queued row to make room"""
+    async def run():
+        db, interaction_logger = await fill_while_stalled("drop_oldest")
+        await log(interaction_logger, "3")
+        db.gate.set()
+        await interaction_logger.close()
+        return db, interaction_logger.get_stats()
+
+    db, stats = asyncio.run(run())
+    assert db.written() == ["0", "2", "3"] and stats["dropped"] == 1, stats
+
+def test_block():
+    """block waits for room, and discards the row only when the timeout passes first"""
+    async def run():
+        db, interaction_logger = await fill_while_stalled("block", block_timeout_ms=200)
+        asyncio.get_running_loop().call_later(0.02, db.gate.set)
+        await log(interaction_logger, "3")
+
+        db.gate.clear()
+        await asyncio.sleep(0.05)
+        await log(interaction_logger, "4")
+        await asyncio.sleep(0.01)
+        await log(interaction_logger, "5")
+        await log(interaction_logger, "6")
+        interaction_logger.block_timeout = 0.02
+        await log(interaction_logger, "7")
+        db.gate.set()
+        await interaction_logger.close()
+        return db, interaction_logger.get_stats()
+
+    db, stats = asyncio.run(run())
+    assert db.written() == ["0", "1", "2", "3", "4", "5", "6"] and stats["dropped"] == 1, stats
+
+def test_batches_by_count_and_time():
+    """Full batches are written at once and a partial batch when the flush interval passes"""
+    db = StubDatabase()
+    interaction_logger = InteractionLogger(db, batch_size=3, flush_interval_ms=100)
+
+    async def run():
+        await interaction_logger.start()
+        for index in range(7):
+            await log(interaction_logger, str(index))
+        await asyncio.sleep(0.03)
+        by_count = [list(batch) for batch in db.batches]
+        await asyncio.sleep(0.15)
+        by_time = [list(batch) for batch in db.batches]
+        await interaction_logger.close()
+        return by_count, by_time
+
+    by_count, by_time = asyncio.run(run())
+    assert by_count == [["0", "1", "2"], ["3", "4", "5"]], by_count
+    assert by_time == by_count + [["6"]], by_time
+
+def test_close_flushes_queue():
+    """close() writes queued rows without waiting out the flush interval; later rows write through"""
+    db = StubDatabase()
+    interaction_logger = InteractionLogger(db, batch_size=100, flush_interval_ms=10000)
+
+    async def run():
+        await interaction_logger.start()
+        for index in range(3):
+            await log(interaction_logger, str(index))
+        await asyncio.sleep(0.01)
+        await asyncio.wait_for(interaction_logger.close(), timeout=1)
+        await log(interaction_logger, "after close")
+
+    asyncio.run(run())
+    assert db.batches == [["0", "1", "2"], ["after close"]], db.batches
+
+def test_unstorable_row_rejected_alone():
+    """Numpy values are converted when queued and a row that cannot be serialised is rejected on its own"""
+    db = StubDatabase()
+    interaction_logger = InteractionLogger(db, batch_size=3, flush_interval_ms=50)
+    circular = {}
+    circular["self"] = circular
+    rows = []
+
+    async def run():
+        await interaction_logger.start()
+        await log(interaction_logger, "numpy", matched_clause={"confidence": np.float32(0.5)}, confidence=np.float32(0.5))
+        await log(interaction_logger, "circular", metadata=circular)
+        await log(interaction_logger, "plain")
+        rows.extend(row for row in list(interaction_logger._queue._queue))
+        await interaction_logger.close()
+
+    asyncio.run(run())
+    assert db.batches == [["numpy", "plain"]], db.batches
+    assert rows[0]["matched_clause"] == {"confidence": 0.5} and type(rows[0]["confidence"]) is float
+    assert interaction_logger.get_stats()["rejected"] == 1
+
+def test_drop_warning_threshold():
+    """The overflow warning fires on the first drop and again after each further thousand"""
+    interaction_logger = InteractionLogger(StubDatabase())
+    handler = RecordingHandler()
+    logging.getLogger("services.interaction_logger").addHandler(handler)
+    try:
+        interaction_logger._drop(1)
+        interaction_logger._drop(5)
+        interaction_logger._drop(997)
+        interaction_logger._drop(2)
+    finally:
+        logging.getLogger("services.interaction_logger").removeHandler(handler)
+    assert len(handler.messages) == 2 and "1003 rows" in handler.messages[1], handler.messages
+
+def main():
+    """Run all interaction logger tests"""
+    print("🚀 Starting Interaction Logger Tests")
+    print("=" * 50)
+
+    for test in (
+        test_drop_newest,
+        test_drop_oldest,
+        test_block,
+        test_batches_by_count_and_time,
+        test_close_flushes_queue,
+        test_unstorable_row_rejected_alone,
+        test_drop_warning_threshold
+    ):
+        print(f"\n🔍 {test.__doc__}...")
+        test()
+        print("✅ Passed")
+
+    print("\n" + "=" * 50)
+    print("🏁 Interaction logger tests completed!")
+
+if __name__ == "__main__":
+    sys.exit(main())
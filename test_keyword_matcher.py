@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test script for the Aho-Corasick keyword automaton: one pass finds exactly the keyword
+occurrences a per-keyword substring search finds, including overlapping keywords
+"""
+
+import sys
+
+from services.keyword_matcher import KEYWORD_AUTOMATON, KeywordAutomaton, compile_keywords
+
+def substring_matches(patterns, text: str):
+    """Every (start offset, keyword) found by searching for each keyword separately"""
+    text = text.lower()
+    matches = set()
+    for pattern in {pattern.lower() for pattern in patterns}:
+        start = text.find(pattern)
+        while start != -1:
+            matches.add((start, pattern))
+            start = text.find(pattern, start + 1)
+    return matches
+
+def test_overlapping_keywords():
+    """Keywords that overlap or contain each other are all reported"""
+    automaton = KeywordAutomaton(["he", "she", "his", "hers"])
+    assert sorted(automaton.find_all("ushers")) == [(1, "she"), (2, "he"), (2, "hers")]
+    assert automaton.find_hits("USHERS") == {"she", "he", "hers"}
+
+def test_matches_substring_search():
+    """The shared automaton agrees with a substring search on sample_contract.txt"""
+    with open("sample_contract.txt") as contract:
+        text = contract.read()
+
+    found = KEYWORD_AUTOMATON.find_all(text)
+    assert len(found) == len(set(found))
+    assert set(found) == substring_matches(KEYWORD_AUTOMATON.patterns, text)
+    assert {"termination", "payment", "confidential", "governing law"} <= KEYWORD_AUTOMATON.find_hits(text)
+
+def test_ad_hoc_keywords_memoised():
+    """Query keyword automatons are compiled once per keyword tuple"""
+    keywords = ("notice", "period", "Notice")
+    automaton = compile_keywords(keywords)
+    assert compile_keywords(keywords) is automaton
+    assert automaton.patterns == ["notice", "period"]
+    assert automaton.find_hits("") == set()
+
+def main():
+    """Run all keyword matcher tests"""
+    print("🚀 Starting Keyword Matcher Tests")
+    print("=" * 50)
+
+    for test in (test_overlapping_keywords, test_matches_substring_search, test_ad_hoc_keywords_memoised):
+        print(f"\n🔍 {test.__doc__}...")
+        test()
+        print("✅ Passed")
+
+    print("\n" + "=" * 50)
+    print("🏁 Keyword matcher tests completed!")
+
+if __name__ == "__main__":
+    sys.exit(main())
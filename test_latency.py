@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test script for the latency sketches behind /stats latency percentiles
+"""
+
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from config import Config
+from services.database import DatabaseService
+from services.latency import LatencyRecorder, LogHistogram
+from services.tracing import RequestTrace
+
+def exact_percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(fraction * (len(ordered) - 1))]
+
+def make_trace(total_ms: float, matching_ms: float) -> RequestTrace:
+    """A finished request trace with the given total and matching-stage latency"""
+    trace = RequestTrace("hackrx_run")
+    trace.wall_start = time.perf_counter() - total_ms / 1000
+    trace.stages.append({"stage": "match", "start_ms": 0.0, "end_ms": matching_ms, "wall_ms": matching_ms, "cpu_ms": 0.0})
+    return trace
+
+def test_accuracy():
+    """Test that sketch percentiles stay within the configured relative accuracy"""
+    print("🔍 Testing sketch accuracy on log-normal latencies...")
+    rng = random.Random(3)
+    values = [rng.lognormvariate(5, 1) for _ in range(100000)]
+
+    sketch = LogHistogram()
+    for value in values:
+        sketch.add(value)
+
+    worst = 0.0
+    for fraction in (0.5, 0.95, 0.99):
+        exact = exact_percentile(values, fraction)
+        worst = max(worst, abs(sketch.percentile(fraction) - exact) / exact)
+
+    print(f"{len(sketch.bins)} buckets for {len(values)} values, worst relative error {worst:.4f}")
+    assert worst <= Config.LATENCY_RELATIVE_ACCURACY * 1.5, "Percentile error above the relative accuracy"
+    print("✅ Percentiles within the relative accuracy")
+
+def test_merge():
+    """Test that merging sketches equals sketching the combined stream"""
+    print("\n🔍 Testing sketch merging...")
+    rng = random.Random(5)
+    first, second, combined = LogHistogram(), LogHistogram(), LogHistogram()
+    for index in range(20000):
+        value = rng.expovariate(1 / 200)
+        (first if index % 2 else second).add(value)
+        combined.add(value)
+
+    restored = LogHistogram.from_state(first.to_state())
+    restored.merge(second)
+    assert restored.bins == combined.bins and restored.percentile(0.99) == combined.percentile(0.99), "Merged sketch differs from the combined stream"
+    print("✅ Merged sketch matches the combined stream")
+
+def test_rollups(tmp_path):
+    """Test window percentiles merged from two processes' stored buckets"""
+    print("\n🔍 Testing flushed latency rollups from two writers...")
+    path = str(tmp_path / "latency.db")
+
+    async def run():
+        db_service = DatabaseService()
+        db_service.database_url = f"sqlite:///{path}"
+        await db_service.initialize()
+        try:
+            writers = [LatencyRecorder(db_service), LatencyRecorder(db_service)]
+            totals = []
+            for index in range(2000):
+                total_ms = 100 + index % 400
+                totals.append(total_ms)
+                writers[index % 2].record_trace(make_trace(total_ms, total_ms / 2))
+            await writers[0].flush()
+
+            # The second writer's buckets are still in memory, the first writer's only in the database
+            latency = await writers[1].get_percentiles(window_seconds=3600)
+            long_window = await writers[1].get_percentiles(window_seconds=7 * 24 * 3600)
+            return totals, latency, long_window
+        finally:
+            await db_service.close()
+
+    totals, latency, long_window = asyncio.run(run())
+    endpoint = latency["metrics"]["endpoint:hackrx_run"]
+    stage = latency["metrics"]["stage:match"]
+    print(f"endpoint p50 {endpoint['p50']}ms p95 {endpoint['p95']}ms p99 {endpoint['p99']}ms over {endpoint['count']} requests")
+    print(f"matching stage p95 {stage['p95']}ms, long window resolution: {long_window['resolution']}")
+
+    exact_p95 = exact_percentile(totals, 0.95)
+    assert endpoint["count"] == 2000 and abs(endpoint["p95"] - exact_p95) / exact_p95 <= 0.02, \
+        f"Unexpected rollup percentiles (exact p95 {exact_p95}ms): {latency}"
+    assert long_window["metrics"]["endpoint:hackrx_run"]["count"] == 2000, f"Unexpected long window: {long_window}"
+    print("✅ Window percentiles combine stored and in-memory buckets")
+
+def main():
+    """Run all latency sketch tests"""
+    print("🚀 Starting Latency Sketch Tests")
+    print("=" * 50)
+
+    test_accuracy()
+    test_merge()
+    with tempfile.TemporaryDirectory() as directory:
+        test_rollups(Path(directory))
+
+    print("\n" + "=" * 50)
+    print("🏁 Latency sketch tests completed!")
+
+if __name__ == "__main__":
+    sys.exit(main())
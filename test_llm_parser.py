@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Test script for query parsing against a stub OpenAI client: batched parsing, per-item
+validation, JSON mode on batch calls, the LLM call counters, the concurrency cap, the
+per-call timeout and the shared pooled client
+"""
+
+import asyncio
+import json
+import sys
+from types import SimpleNamespace
+
+from services import openai_client
+from services.llm_parser import LLMParser
+
+class StubCompletions:
+    """Answers chat completions from a handler and records every request"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        content = self.handler(kwargs)
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20, total_tokens=120)
+        return SimpleNamespace(usage=usage, choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+def stub_client(handler) -> SimpleNamespace:
+    return SimpleNamespace(chat=SimpleNamespace(completions=StubCompletions(handler)))
+
+def batch_answer(request) -> str:
+    """A valid parse for every query in the batch, except one with missing keywords"""
+    items = json.loads(request["messages"][1]["content"])
+    results = [
+        {"id": item["id"], "intent": "find_payment_terms", "keywords": item["query"].split(), "clause_type": "payment", "context": ""}
+        for item in items
+    ]
+    del results[-1]["keywords"]
+    return json.dumps({"results": results})
+
+def test_batch_parse():
+    """Distinct questions share one JSON-mode call and an invalid item alone falls back"""
+    client = stub_client(batch_answer)
+    parser = LLMParser(client=client)
+    questions = ["When is payment due?", "Is interest charged on late payment?", "When is payment due?", "Who pays the invoice?"]
+
+    results = asyncio.run(parser.parse_queries(questions))
+    requests = client.chat.completions.requests
+
+    assert len(requests) == 1
+    assert requests[0]["response_format"] == {"type": "json_object"}
+    assert [result["parse_source"] for result in results] == ["llm", "llm", "llm", "fallback"]
+    assert results[0] == results[2] and results[0] is not results[2]
+
+def test_call_counters():
+    """Parse stats count LLM calls separately from the questions they carried"""
+    client = stub_client(batch_answer)
+    parser = LLMParser(client=client)
+
+    asyncio.run(parser.parse_queries([f"Is clause {index} about payment?" for index in range(6)]))
+    stats = parser.get_parse_stats()
+
+    assert stats["llm_questions"] == 6 and stats["llm_calls"] == 1, stats
+    assert stats["llm_question_rate"] == 1.0 and stats["llm_call_rate"] == round(1 / 6, 4), stats
+
+def test_single_parse_is_free_text():
+    """A single-question parse is one call without JSON mode"""
+    answer = json.dumps({"intent": "find_termination_clause", "keywords": ["notice"], "clause_type": "termination", "context": ""})
+    client = stub_client(lambda request: answer)
+    parser = LLMParser(client=client)
+
+    result = asyncio.run(parser.parse_query("What is the notice period?"))
+    requests = client.chat.completions.requests
+
+    assert result["intent"] == "find_termination_clause"
+    assert len(requests) == 1 and "response_format" not in requests[0]
+    assert parser.get_parse_stats()["llm_calls"] == 1
+
+class SlowCompletions:
+    """Completions that take delay seconds and track how many are in flight at once"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+        return SimpleNamespace(usage=usage, choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))])
+
+def test_concurrency_cap():
+    """In-flight LLM calls never exceed the concurrency cap"""
+    completions = SlowCompletions(0.02)
+    parser = LLMParser(client=SimpleNamespace(chat=SimpleNamespace(completions=completions)), max_concurrency=3)
+
+    async def run():
+        return await asyncio.gather(*(parser._call_openai("system", f"prompt {index}") for index in range(10)))
+
+    results = asyncio.run(run())
+    assert results == ["ok"] * 10
+    assert completions.max_in_flight == 3, completions.max_in_flight
+
+def test_slow_call_times_out():
+    """A call slower than the request timeout is abandoned and frees its slot"""
+    completions = SlowCompletions(1.0)
+    parser = LLMParser(client=SimpleNamespace(chat=SimpleNamespace(completions=completions)), max_concurrency=1)
+    parser.request_timeout = 0.05
+
+    async def run():
+        try:
+            await parser._call_openai("system", "prompt")
+        except asyncio.TimeoutError:
+            pass
+        else:
+            raise AssertionError("slow call did not time out")
+        return parser._get_semaphore().locked()
+
+    assert asyncio.run(run()) is False
+    assert completions.in_flight == 0 and parser.breaker.get_stats()["failures"] == 1
+
+def test_shared_pooled_client():
+    """Parsers without their own client share one pooled client until it is closed"""
+    async def run():
+        first, second = LLMParser(), LLMParser()
+        shared = first._get_client()
+        same = second._get_client() is shared
+        await first.close()
+        return shared, same, first._get_client()
+
+    shared, same, recreated = asyncio.run(run())
+    assert same and recreated is not shared
+    asyncio.run(openai_client.close_async_client())
+
+def main():
+    """Run all LLM parser tests"""
+    print("🚀 Starting LLM Parser Tests")
+    print("=" * 50)
+
+    for test in (
+        test_batch_parse,
+        test_call_counters,
+        test_single_parse_is_free_text,
+        test_concurrency_cap,
+        test_slow_call_times_out,
+        test_shared_pooled_client
+    ):
+        print(f"\n🔍 {test.__doc__}...")
+        test()
+        print("✅ Passed")
+
+    print("\n" + "=" * 50)
+    print("🏁 LLM parser tests completed!")
+
+if __name__ == "__main__":
+    sys.exit(main())
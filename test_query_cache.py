@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script for the parsed-query cache: exact hits on normalised text, semantic hits on
+near-duplicate embeddings, expiry and LRU eviction
+"""
+
+import asyncio
+import sys
+import time
+
+import numpy as np
+
+from services.query_cache import ParsedQueryCache
+
+# Fixed embeddings: the first two queries are near-duplicates, the third is unrelated
+VECTORS = {
+    "what is the notice period for termination": [1.0, 0.0, 0.0],
+    "how much notice is needed to terminate": [0.98, 0.2, 0.0],
+    "when is payment due": [0.0, 0.0, 1.0]
+}
+
+class StubEmbedder:
+    def __init__(self, vectors=VECTORS):
+        self.vectors = vectors
+        self.calls = 0
+
+    async def embed_queries(self, texts):
+        self.calls += 1
+        return np.array([self.vectors[text] for text in texts], dtype=np.float32)
+
+PARSE = {"intent": "find_termination_clause", "keywords": ["notice"], "clause_type": "termination", "context": "", "parse_source": "llm"}
+
+def test_exact_and_semantic_hits():
+    """Normalised repeats hit exactly and near-duplicates hit semantically; others miss"""
+    cache = ParsedQueryCache(embed_fn=StubEmbedder().embed_queries, similarity_threshold=0.9)
+
+    async def run():
+        missed, embedding = await cache.lookup("What is the notice period for termination?")
+        await cache.store("What is the notice period for termination?", PARSE, embedding)
+        exact, _ = await cache.lookup("  what is the NOTICE period for termination ")
+        semantic, _ = await cache.lookup("How much notice is needed to terminate?")
+        unrelated, _ = await cache.lookup("When is payment due?")
+        return missed, exact, semantic, unrelated
+
+    missed, exact, semantic, unrelated = asyncio.run(run())
+    assert missed is None and unrelated is None
+    assert exact == PARSE
+    assert semantic["intent"] == PARSE["intent"] and semantic["parse_source"] == "cache"
+    stats = cache.get_stats()
+    assert (stats["exact_hits"], stats["semantic_hits"], stats["misses"]) == (1, 1, 2), stats
+
+def test_semantic_hit_keeps_own_context():
+    """A semantic hit reuses the intent but takes its keywords and context from the new question"""
+    cache = ParsedQueryCache(embed_fn=StubEmbedder().embed_queries, similarity_threshold=0.9)
+    parse = {**PARSE, "keywords": ["notice", "period"], "context": "notice period for termination of the agreement"}
+
+    async def run():
+        await cache.store("What is the notice period for termination?", parse)
+        return await cache.lookup("How much notice is needed to terminate?")
+
+    semantic, _ = asyncio.run(run())
+    assert semantic == {
+        "intent": "find_termination_clause",
+        "keywords": ["How", "much", "notice", "is", "needed", "to", "terminate?"],
+        "clause_type": "termination",
+        "context": "How much notice is needed to terminate?",
+        "parse_source": "cache"
+    }, semantic
+
+def test_hits_are_copies():
+    """Mutating a returned parse does not change the cached one"""
+    cache = ParsedQueryCache()
+
+    async def run():
+        await cache.store("When is payment due?", PARSE)
+        first, _ = await cache.lookup("When is payment due?")
+        first["keywords"].append("mutated")
+        second, _ = await cache.lookup("When is payment due?")
+        return second
+
+    assert asyncio.run(run())["keywords"] == ["notice"]
+
+def test_expiry_and_eviction():
+    """Entries expire after the TTL and the least recently used entry is evicted when full"""
+    cache = ParsedQueryCache(max_entries=2, ttl_seconds=0.05)
+
+    async def run():
+        await cache.store("first", PARSE)
+        await cache.store("second", PARSE)
+        await cache.lookup("first")
+        await cache.store("third", PARSE)
+        evicted, _ = await cache.lookup("second")
+        kept, _ = await cache.lookup("first")
+        time.sleep(0.1)
+        expired, _ = await cache.lookup("third")
+        return evicted, kept, expired
+
+    evicted, kept, expired = asyncio.run(run())
+    assert evicted is None and kept == PARSE and expired is None
+    assert cache.get_stats()["evictions"] == 1 and cache.get_stats()["expirations"] == 1
+
+def test_mismatched_dimensions_ignored():
+    """Entries embedded by a different model are never compared with the query"""
+    vectors = {**VECTORS, "how much notice is needed to terminate": [0.98, 0.2]}
+    cache = ParsedQueryCache(embed_fn=StubEmbedder(vectors).embed_queries, similarity_threshold=0.9)
+
+    async def run():
+        await cache.store("What is the notice period for termination?", PARSE)
+        return await cache.lookup("How much notice is needed to terminate?")
+
+    result, embedding = asyncio.run(run())
+    assert result is None and embedding.shape == (2,)
+
+def main():
+    """Run all parse cache tests"""
+    print("🚀 Starting Parse Cache Tests")
+    print("=" * 50)
+
+    for test in (test_exact_and_semantic_hits, test_semantic_hit_keeps_own_context, test_hits_are_copies, test_expiry_and_eviction, test_mismatched_dimensions_ignored):
+        print(f"\n🔍 {test.__doc__}...")
+        test()
+        print("✅ Passed")
+
+    print("\n" + "=" * 50)
+    print("🏁 Parse cache tests completed!")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test script for the rationale cache: keys on intent and clause content, survives a restart
+through the database and is invalidated when the document changes
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+from services.database import DatabaseService
+from services.rationale_cache import RationaleCache, content_hash
+
+DOCUMENT_URL = "https://example.com/contract.pdf"
+CLAUSE = "3.1 Either party may terminate this Agreement with 30 days written notice to the other party."
+MODEL = "gpt-3.5-turbo"
+
+def test_keys():
+    """Wordings of one intent share a key; the clause, the model and general queries separate them"""
+    cache = RationaleCache()
+    termination = {"intent": "find_termination_clause"}
+    general = {"intent": "general_search"}
+
+    assert cache.build_key("What is the notice period?", termination, CLAUSE, MODEL) == \
+        cache.build_key("How do I end the contract?", termination, CLAUSE, MODEL)
+    assert cache.build_key("What is the notice period?", termination, CLAUSE, MODEL) != \
+        cache.build_key("What is the notice period?", termination, CLAUSE + " Amended.", MODEL)
+    assert cache.build_key("What is the notice period?", termination, CLAUSE, MODEL) != \
+        cache.build_key("What is the notice period?", termination, CLAUSE, "gpt-4")
+    assert cache.build_key("Who signs?", general, CLAUSE, MODEL) == cache.build_key("who signs", general, CLAUSE, MODEL)
+    assert cache.build_key("Who signs?", general, CLAUSE, MODEL) != cache.build_key("Who pays?", general, CLAUSE, MODEL)
+
+def test_restart_and_invalidation(tmp_path):
+    """A restarted cache reads rationales back from the database until the document changes"""
+    path = str(tmp_path / "rationales.db")
+    original_hash, changed_hash = content_hash("version 1"), content_hash("version 2")
+
+    async def run():
+        db_service = DatabaseService()
+        db_service.database_url = f"sqlite:///{path}"
+        await db_service.initialize()
+        try:
+            cache = RationaleCache(db_service=db_service)
+            key = cache.build_key("What is the notice period?", {"intent": "find_termination_clause"}, CLAUSE, MODEL)
+            await cache.register_document(DOCUMENT_URL, original_hash)
+            await cache.put(key, DOCUMENT_URL, original_hash, MODEL, "30 days written notice ends the agreement.")
+            from_memory = await cache.get(key, original_hash)
+
+            restarted = RationaleCache(db_service=db_service)
+            await restarted.register_document(DOCUMENT_URL, original_hash)
+            from_store = await restarted.get(key, original_hash)
+
+            await restarted.register_document(DOCUMENT_URL, changed_hash)
+            after_change = await restarted.get(key, changed_hash)
+            fresh = RationaleCache(db_service=db_service)
+            after_change_store = await fresh.get(key, changed_hash)
+            return from_memory, from_store, after_change, after_change_store, restarted.get_stats()
+        finally:
+            await db_service.close()
+
+    from_memory, from_store, after_change, after_change_store, stats = asyncio.run(run())
+    assert from_memory == from_store == "30 days written notice ends the agreement."
+    assert after_change is None and after_change_store is None
+    assert stats["store_hits"] == 1 and stats["invalidations"] >= 1, stats
+
+def test_document_hashes_bounded():
+    """Registered document hashes are evicted least recently used first, like cached rationales"""
+    cache = RationaleCache(max_entries=2)
+
+    async def run():
+        for index in range(3):
+            await cache.register_document(f"https://example.com/{index}.pdf", content_hash(str(index)))
+        await cache.register_document("https://example.com/1.pdf", content_hash("1"))
+        await cache.register_document("https://example.com/3.pdf", content_hash("3"))
+
+    asyncio.run(run())
+    assert list(cache._document_hashes) == ["https://example.com/1.pdf", "https://example.com/3.pdf"]
+    assert cache.get_stats()["documents"] == 2
+
+def main():
+    """Run all rationale cache tests"""
+    print("🚀 Starting Rationale Cache Tests")
+    print("=" * 50)
+
+    print(f"\n🔍 {test_keys.__doc__}...")
+    test_keys()
+    print("✅ Passed")
+
+    print(f"\n🔍 {test_document_hashes_bounded.__doc__}...")
+    test_document_hashes_bounded()
+    print("✅ Passed")
+
+    print(f"\n🔍 {test_restart_and_invalidation.__doc__}...")
+    with tempfile.TemporaryDirectory() as directory:
+        test_restart_and_invalidation(Path(directory))
+    print("✅ Passed")
+
+    print("\n" + "=" * 50)
+    print("🏁 Rationale cache tests completed!")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test script for budgeted cross-encoder re-ranking with a stub model: top-ranked candidates
+of every query are scored first and inference stops before the budget is overrun
+"""
+
+import asyncio
+import sys
+import time
+
+from services.reranker import CrossEncoderReranker
+
+class SlowCrossEncoder:
+    """Scores pairs by shared words, taking a fixed time per batch"""
+
+    def __init__(self, batch_seconds: float):
+        self.batch_seconds = batch_seconds
+        self.batches = []
+
+    def predict(self, inputs, batch_size=None, show_progress_bar=False):
+        self.batches.append(list(inputs))
+        time.sleep(self.batch_seconds)
+        return [float(len(set(query.split()) & set(text.split()))) for query, text in inputs]
+
+def candidates(query_index: int, count: int):
+    return [
+        {"segment": {"text": f"query {query_index} clause {rank}"}, "scoring_factors": {}, "final_confidence": 1.0 - rank / count}
+        for rank in range(count)
+    ]
+
+def make_reranker(model, batch_size: int = 4, budget_ms: float = 1000) -> CrossEncoderReranker:
+    reranker = CrossEncoderReranker(batch_size=batch_size, budget_ms=budget_ms)
+    reranker.model = model
+    return reranker
+
+def test_within_budget():
+    """With enough budget every candidate is scored in batches"""
+    model = SlowCrossEncoder(batch_seconds=0.001)
+    lists = [candidates(0, 5), candidates(1, 5)]
+    stats = asyncio.run(make_reranker(model).rerank(["query 0", "query 1"], lists))
+
+    assert [entry["reranked"] for entry in stats] == [5, 5]
+    assert not any(entry["budget_exhausted"] for entry in stats)
+    assert all(len(batch) <= 4 for batch in model.batches) and len(model.batches) == 3
+    assert all(0.0 < match["rerank_score"] < 1.0 for match in lists[0] + lists[1])
+
+def test_budget_exhausted():
+    """An exhausted budget leaves low-ranked candidates unscored, interleaving queries by rank"""
+    model = SlowCrossEncoder(batch_seconds=0.05)
+    lists = [candidates(0, 10), candidates(1, 10)]
+
+    started = time.perf_counter()
+    stats = asyncio.run(make_reranker(model, batch_size=2, budget_ms=120).rerank(["query 0", "query 1"], lists))
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    reranked = [entry["reranked"] for entry in stats]
+    assert stats[0]["budget_exhausted"] and 0 < reranked[0] < 10, stats
+    # Each batch pairs the same rank of both queries
+    assert reranked[0] == reranked[1]
+    for matches, count in zip(lists, reranked):
+        assert all("rerank_score" in match for match in matches[:count])
+        assert not any("rerank_score" in match for match in matches[count:])
+    assert elapsed_ms < 120 + 100, elapsed_ms
+
+def test_unavailable_model():
+    """Without a model nothing is scored and the stats say so"""
+    lists = [candidates(0, 3)]
+    stats = asyncio.run(make_reranker(None).rerank(["query 0"], lists))
+    assert stats[0]["reranked"] == 0 and stats[0]["candidates"] == 3
+    assert not any("rerank_score" in match for match in lists[0])
+
+def main():
+    """Run all re-ranker tests"""
+    print("🚀 Starting Re-ranker Tests")
+    print("=" * 50)
+
+    for test in (test_within_budget, test_budget_exhausted, test_unavailable_model):
+        print(f"\n🔍 {test.__doc__}...")
+        test()
+        print("✅ Passed")
+
+    print("\n" + "=" * 50)
+    print("🏁 Re-ranker tests completed!")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test script for the circuit breaker and hedged requests: the circuit opens on a spike of
+failures, rejects calls while open and closes after a successful probe; a slow call is
+hedged and the faster attempt wins
+"""
+
+import asyncio
+import sys
+import time
+
+from services.resilience import CircuitBreaker, CircuitOpenError
+
+def make_breaker(name: str, **overrides) -> CircuitBreaker:
+    settings = {
+        "failure_rate": 0.5,
+        "window_size": 10,
+        "min_calls": 4,
+        "slow_call_ms": 1000,
+        "open_seconds": 0.05,
+        "hedge": False,
+        "hedge_min_delay_ms": 10
+    }
+    settings.update(overrides)
+    return CircuitBreaker(name, **settings)
+
+async def succeed(delay: float = 0.0):
+    await asyncio.sleep(delay)
+    return "ok"
+
+async def fail():
+    raise RuntimeError("upstream error")
+
+def test_opens_and_recovers():
+    """Failures open the circuit, calls are rejected while open, and a good probe closes it"""
+    breaker = make_breaker("test_recovery")
+
+    async def run():
+        for _ in range(4):
+            try:
+                await breaker.call(fail)
+            except RuntimeError:
+                pass
+        opened = breaker.state
+
+        try:
+            await breaker.call(succeed)
+            rejected = False
+        except CircuitOpenError:
+            rejected = True
+
+        await asyncio.sleep(0.06)
+        probe = await breaker.call(succeed)
+        return opened, rejected, probe
+
+    opened, rejected, probe = asyncio.run(run())
+    assert opened == CircuitBreaker.OPEN and rejected
+    assert probe == "ok" and breaker.state == CircuitBreaker.CLOSED
+    stats = breaker.get_stats()
+    assert stats["opened"] == 1 and stats["rejected"] == 1 and stats["failures"] == 4, stats
+
+def test_single_probe_when_half_open():
+    """Only one probe goes upstream while half-open, and a failed probe re-opens the circuit"""
+    breaker = make_breaker("test_probe")
+
+    async def run():
+        for _ in range(4):
+            try:
+                await breaker.call(fail)
+            except RuntimeError:
+                pass
+        await asyncio.sleep(0.06)
+
+        async def failing_probe():
+            await asyncio.sleep(0.02)
+            raise RuntimeError("still down")
+
+        return await asyncio.gather(breaker.call(failing_probe), breaker.call(succeed), return_exceptions=True)
+
+    probe, concurrent = asyncio.run(run())
+    assert isinstance(probe, RuntimeError) and isinstance(concurrent, CircuitOpenError)
+    assert breaker.state == CircuitBreaker.OPEN and breaker.get_stats()["opened"] == 2
+
+def test_only_probe_changes_half_open_state():
+    """A call admitted while closed that finishes during the probe neither closes the circuit nor frees the probe slot"""
+    breaker = make_breaker("test_stale")
+
+    async def run():
+        straggler = breaker.check()
+        for _ in range(4):
+            try:
+                await breaker.call(fail)
+            except RuntimeError:
+                pass
+        await asyncio.sleep(0.06)
+
+        probe = breaker.check()
+        breaker.record(5.0, failed=False, probe=straggler)
+        state_after_straggler = breaker.state
+        try:
+            breaker.check()
+            second_probe = True
+        except CircuitOpenError:
+            second_probe = False
+
+        breaker.record(5.0, failed=False, probe=probe)
+        return straggler, probe, state_after_straggler, second_probe
+
+    straggler, probe, state_after_straggler, second_probe = asyncio.run(run())
+    assert straggler is None and probe is not None
+    assert state_after_straggler == CircuitBreaker.HALF_OPEN and not second_probe
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_slow_call_hedged():
+    """A call outliving the recent p95 is hedged and the faster second attempt wins"""
+    breaker = make_breaker("test_hedge", hedge=True)
+    attempts = []
+
+    async def upstream():
+        attempts.append(time.perf_counter())
+        # The first attempt after warm-up hangs; its hedge answers quickly
+        return await succeed(1.0 if len(attempts) == 5 else 0.005)
+
+    async def run():
+        for _ in range(4):
+            await breaker.call(upstream)
+        started = time.perf_counter()
+        result = await breaker.call(upstream)
+        return result, (time.perf_counter() - started) * 1000
+
+    result, elapsed_ms = asyncio.run(run())
+    stats = breaker.get_stats()
+    assert result == "ok" and elapsed_ms < 500, elapsed_ms
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1 and len(attempts) == 6, stats
+
+def main():
+    """Run all resilience tests"""
+    print("🚀 Starting Resilience Tests")
+    print("=" * 50)
+
+    for test in (
+        test_opens_and_recovers,
+        test_single_probe_when_half_open,
+        test_only_probe_changes_half_open_state,
+        test_slow_call_hedged
+    ):
+        print(f"\n🔍 {test.__doc__}...")
+        test()
+        print("✅ Passed")
+
+    print("\n" + "=" * 50)
+    print("🏁 Resilience tests completed!")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test script for single-flight coalescing: identical concurrent calls share one execution,
+a cancelled caller does not cancel it for the others, errors reach every caller and the
+shared usage is attributed to every caller's trace
+"""
+
+import asyncio
+import sys
+
+from services.single_flight import SingleFlight
+from services.tracing import record_llm_call, start_trace, trace_stage
+
+class SlowWork:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.executions = 0
+
+    async def __call__(self):
+        self.executions += 1
+        await asyncio.sleep(0.05)
+        if self.fail:
+            raise RuntimeError("upstream failed")
+        return {"keywords": ["notice"]}
+
+def test_identical_calls_coalesce():
+    """Concurrent calls with one key run once; each caller gets its own copy; later calls run fresh"""
+    group = SingleFlight("test_coalesce")
+    work = SlowWork()
+
+    def copy_result(result):
+        return {**result, "keywords": list(result["keywords"])}
+
+    async def run():
+        results = await asyncio.gather(*[group.do("notice", work, copy_result=copy_result) for _ in range(5)])
+        other = await group.do("payment", work)
+        again = await group.do("notice", work)
+        return results, other, again
+
+    results, other, again = asyncio.run(run())
+    assert work.executions == 3
+    assert all(result == {"keywords": ["notice"]} for result in results)
+    results[0]["keywords"].append("mutated")
+    assert results[1]["keywords"] == ["notice"]
+    stats = group.get_stats()
+    assert stats["executions"] == 3 and stats["coalesced"] == 4 and stats["in_flight"] == 0, stats
+
+def test_cancelled_caller_does_not_cancel_others():
+    """A caller cancelled mid-flight leaves the shared work running for the rest"""
+    group = SingleFlight("test_cancel")
+    work = SlowWork()
+
+    async def run():
+        first = asyncio.ensure_future(group.do("notice", work))
+        second = asyncio.ensure_future(group.do("notice", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return first, await second
+
+    first, second = asyncio.run(run())
+    assert first.cancelled() and second == {"keywords": ["notice"]} and work.executions == 1
+
+def test_errors_reach_every_caller():
+    """A failed execution raises in every waiting caller and is counted once"""
+    group = SingleFlight("test_errors")
+    work = SlowWork(fail=True)
+
+    async def run():
+        return await asyncio.gather(*[group.do("notice", work) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert work.executions == 1 and group.get_stats()["errors"] == 1
+
+def test_usage_attributed_to_every_caller():
+    """Every caller's trace gets the shared work's stages and LLM calls; joiners' calls are marked coalesced"""
+    group = SingleFlight("test_metering")
+
+    async def parse():
+        with trace_stage("parse"):
+            await asyncio.sleep(0.02)
+            record_llm_call("gpt-3.5-turbo", "parse", 100, 20, 20.0)
+        return {"intent": "find_termination_clause"}
+
+    async def request(name: str):
+        trace = start_trace(name, tenant=name)
+        await group.do("notice", parse)
+        return trace
+
+    async def run():
+        return await asyncio.gather(request("leader"), request("joiner"))
+
+    leader, joiner = asyncio.run(run())
+    assert group.get_stats()["executions"] == 1
+    assert [stage["stage"] for stage in leader.stages] == [stage["stage"] for stage in joiner.stages] == ["parse"]
+    assert leader.token_usage()["total_tokens"] == joiner.token_usage()["total_tokens"] == 120
+    assert [call["coalesced"] for call in leader.llm_calls + joiner.llm_calls] == [False, True]
+
+def main():
+    """Run all single-flight tests"""
+    print("🚀 Starting Single-Flight Tests")
+    print("=" * 50)
+
+    for test in (
+        test_identical_calls_coalesce,
+        test_cancelled_caller_does_not_cancel_others,
+        test_errors_reach_every_caller,
+        test_usage_attributed_to_every_caller
+    ):
+        print(f"\n🔍 {test.__doc__}...")
+        test()
+        print("✅ Passed")
+
+    print("\n" + "=" * 50)
+    print("🏁 Single-flight tests completed!")
+
+if __name__ == "__main__":
+    sys.exit(main())
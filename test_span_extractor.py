@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test script for answer span extraction on sample_contract.txt: numbered clauses are not
+split at their section numbers and headings are never returned as the answer
+"""
+
+import asyncio
+import re
+import sys
+import zlib
+
+import numpy as np
+
+from services.clause_matcher import ClauseMatcher
+from services.span_extractor import AnswerSpanExtractor, sentence_bounds
+
+DIMENSION = 256
+
+class HashingEmbedder:
+    """Deterministic character-trigram embeddings so matching runs without a model or API key"""
+
+    def __init__(self):
+        self.calls = 0
+        self.local_calls = 0
+
+    def get_embedding_dimension(self) -> int:
+        return DIMENSION
+
+    async def embed_local(self, texts):
+        self.local_calls += 1
+        return self.vectors(texts)
+
+    async def embed_queries(self, texts, dimension=None):
+        self.calls += 1
+        return self.vectors(texts)
+
+    def vectors(self, texts):
+        vectors = np.zeros((len(texts), DIMENSION), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in re.findall(r"[a-z]+", text.lower()):
+                padded = f" {token} "
+                for start in range(len(padded) - 2):
+                    vectors[row, zlib.crc32(padded[start:start + 3].encode()) % DIMENSION] += 1.0
+        return vectors
+
+def segment_contract():
+    """sample_contract.txt cleaned and windowed like DocumentProcessor (1000 chars, 200 overlap)"""
+    with open("sample_contract.txt") as contract:
+        text = re.sub(r"\s+", " ", contract.read()).strip()
+    return [
+        {"text": text[start:start + 1000], "start_position": start, "end_position": min(start + 1000, len(text)), "clause_info": {}, "segment_id": index}
+        for index, start in enumerate(range(0, len(text), 800))
+    ]
+
+QUERIES = [
+    {
+        "intent": "find_termination_clause",
+        "keywords": ["termination", "notice", "period"],
+        "context": "What is the termination notice period?",
+        "clause_type": "termination"
+    },
+    {
+        "intent": "find_payment_terms",
+        "keywords": ["payment", "due", "invoice"],
+        "context": "When is payment due?",
+        "clause_type": "payment"
+    }
+]
+
+def match_contract(queries):
+    # Trigram vectors are fine for retrieving segments but no stand-in for a sentence model,
+    # so sentences are scored on the lexical signal alone
+    embedder = HashingEmbedder()
+    matcher = ClauseMatcher(embedding_service=embedder, span_extractor=AnswerSpanExtractor())
+    segments = segment_contract()
+
+    async def run():
+        embeddings = await embedder.embed_queries([segment["text"] for segment in segments])
+        return await matcher.find_best_matches(queries, segments, embeddings)
+
+    return asyncio.run(run())
+
+def test_sentence_bounds_keep_numbered_clauses():
+    """Clause numbers and section headings are not sentence boundaries or answers"""
+    text = "3. TERMINATION 3.1 Either party may terminate this Agreement with 30 days written notice. 3.2 Late payments bear 1.5% interest. 12. ENTIRE AGREEMENT 12."
+    sentences = [text[start:end] for start, end, _ in sentence_bounds(text)]
+    assert sentences == [
+        "3.1 Either party may terminate this Agreement with 30 days written notice.",
+        "3.2 Late payments bear 1.5% interest."
+    ], sentences
+
+def test_sample_contract_answers():
+    """The termination and payment questions get the clause text, not a heading fragment"""
+    termination, payment = match_contract(QUERIES)
+    assert "30 days written notice" in termination["text"], termination["text"]
+    assert "TERMINATION" not in termination["text"], termination["text"]
+    assert "within 30 days of receipt of invoice" in payment["text"], payment["text"]
+    assert "span" in termination and "span" in payment
+
+def test_batch_embeds_sentences_once():
+    """A batch of questions embeds its candidate sentences in one local call and matches each question alone"""
+    embedder = HashingEmbedder()
+    extractor = AnswerSpanExtractor(embedding_service=embedder)
+    matcher = ClauseMatcher(embedding_service=embedder, span_extractor=extractor)
+    segments = segment_contract()
+    queries = (QUERIES * 10)[:20]
+
+    async def run():
+        embeddings = await embedder.embed_queries([segment["text"] for segment in segments])
+        embedder.calls = embedder.local_calls = 0
+        batch = await matcher.find_best_matches(queries, segments, embeddings)
+        batch_calls = (embedder.calls, embedder.local_calls)
+        single = [await matcher.find_best_match(query, segments, embeddings) for query in QUERIES]
+        return batch, batch_calls, single
+
+    batch, batch_calls, single = asyncio.run(run())
+    # One call for the query vectors and one local call for the span sentences
+    assert batch_calls == (1, 1), batch_calls
+    assert [match["text"] for match in batch[:2]] == [match["text"] for match in single]
+
+def main():
+    """Run all span extraction tests"""
+    print("🚀 Starting Span Extraction Tests")
+    print("=" * 50)
+
+    for test in (test_sentence_bounds_keep_numbered_clauses, test_sample_contract_answers, test_batch_embeds_sentences_once):
+        print(f"\n🔍 {test.__doc__}...")
+        test()
+        print("✅ Passed")
+
+    print("\n" + "=" * 50)
+    print("🏁 Span extraction tests completed!")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test script for streamed rationales against a stub streaming client: tokens arrive as they
+are generated, a disconnect aborts the upstream stream and still meters the call, and only
+completed rationales are cached
+"""
+
+import asyncio
+import sys
+from types import SimpleNamespace
+
+from services.llm_parser import LLMParser
+from services.rationale_cache import RationaleCache
+from services.tracing import start_trace
+
+TOKENS = ["The ", "clause ", "allows ", "termination ", "with ", "30 days notice."]
+MATCHED_CLAUSE = {"text": "Either party may terminate this Agreement with 30 days written notice.", "confidence": 0.9}
+
+class StubStream:
+    """Async iterator of completion chunks whose response records whether it was aborted"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.response = self
+        self.aborted = False
+
+    async def aclose(self):
+        self.aborted = True
+
+    async def __aiter__(self):
+        for token in self.tokens:
+            await asyncio.sleep(0)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+class StubCompletions:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.streams = []
+
+    async def create(self, **kwargs):
+        assert kwargs["stream"] is True
+        if self.fail:
+            raise RuntimeError("upstream unavailable")
+        self.streams.append(StubStream(TOKENS))
+        return self.streams[-1]
+
+def make_parser(fail: bool = False) -> LLMParser:
+    client = SimpleNamespace(chat=SimpleNamespace(completions=StubCompletions(fail)))
+    return LLMParser(client=client, rationale_cache=RationaleCache())
+
+async def collect(parser: LLMParser, limit: int = None):
+    """Read the stream like the SSE endpoint, stopping after limit tokens as a disconnect would"""
+    stream = parser.stream_rationale("What is the notice period?", MATCHED_CLAUSE, "document", {"intent": "find_termination_clause"})
+    tokens = []
+    try:
+        async for token in stream:
+            tokens.append(token)
+            if limit is not None and len(tokens) == limit:
+                break
+    finally:
+        await stream.aclose()
+    return tokens
+
+def test_completed_stream_is_cached():
+    """A completed stream yields every token and the next request is served from the cache"""
+    parser = make_parser()
+
+    async def run():
+        first = await collect(parser)
+        second = await collect(parser)
+        return first, second
+
+    first, second = asyncio.run(run())
+    streams = parser.client.chat.completions.streams
+    assert first == TOKENS
+    assert second == ["".join(TOKENS).strip()]
+    assert len(streams) == 1 and not streams[0].aborted
+
+def test_disconnect_aborts_upstream():
+    """Closing the stream early aborts the upstream call, meters it and caches nothing"""
+    parser = make_parser()
+
+    async def run():
+        trace = start_trace("hackrx_run_stream")
+        tokens = await collect(parser, limit=2)
+        return trace, tokens
+
+    trace, tokens = asyncio.run(run())
+    streams = parser.client.chat.completions.streams
+    assert tokens == TOKENS[:2]
+    assert streams[0].aborted
+    assert [call["purpose"] for call in trace.llm_calls] == ["rationale_stream"]
+    assert trace.llm_calls[0]["estimated"] and trace.llm_calls[0]["prompt_tokens"] > 0
+    assert parser.rationale_cache.get_stats()["size"] == 0
+
+def test_upstream_failure_falls_back():
+    """A failed upstream call yields the fallback rationale instead of raising"""
+    tokens = asyncio.run(collect(make_parser(fail=True)))
+    assert len(tokens) == 1 and tokens[0].startswith("Clause matched based on semantic similarity")
+
+def main():
+    """Run all streaming tests"""
+    print("🚀 Starting Rationale Streaming Tests")
+    print("=" * 50)
+
+    for test in (test_completed_stream_is_cached, test_disconnect_aborts_upstream, test_upstream_failure_falls_back):
+        print(f"\n🔍 {test.__doc__}...")
+        test()
+        print("✅ Passed")
+
+    print("\n" + "=" * 50)
+    print("🏁 Rationale streaming tests completed!")
+
+if __name__ == "__main__":
+    sys.exit(main())